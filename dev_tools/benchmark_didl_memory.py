@@ -0,0 +1,110 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+""" Measure the memory used by music library items
+
+A synthetic music library of tracks is parsed from DIDL-Lite, in pages as
+returned by a Browse request, and the memory retained by the resulting items
+is reported. Requires Python 3.4+ (for tracemalloc).
+"""
+
+from __future__ import unicode_literals, print_function
+import argparse
+import gc
+import time
+import tracemalloc
+
+from soco.data_structures import ColumnarSearchResult
+from soco.data_structures_entry import from_didl_string
+
+DIDL_START = (
+    '<DIDL-Lite xmlns:dc="http://purl.org/dc/elements/1.1/" '
+    'xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/" '
+    'xmlns:r="urn:schemas-rinconnetworks-com:metadata-1-0/" '
+    'xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/">'
+)
+DIDL_END = '</DIDL-Lite>'
+TRACK = (
+    '<item id="S://server/music/Artist%20{artist}/Album%20{album}/'
+    '{track:02d}%20Track%20{index}.mp3" parentID="A:TRACKS" '
+    'restricted="true">'
+    '<res protocolInfo="x-file-cifs:*:audio/mpeg:*">'
+    'x-file-cifs://server/music/Artist%20{artist}/Album%20{album}/'
+    '{track:02d}%20Track%20{index}.mp3</res>'
+    '<upnp:albumArtURI>/getaa?u=x-file-cifs%3a%2f%2fserver%2fmusic%2f'
+    'Artist%2520{artist}%2fAlbum%2520{album}%2f{track:02d}%2520Track%2520'
+    '{index}.mp3&amp;v=1</upnp:albumArtURI>'
+    '<dc:title>Track {index}</dc:title>'
+    '<upnp:class>object.item.audioItem.musicTrack</upnp:class>'
+    '<dc:creator>Artist {artist}</dc:creator>'
+    '<upnp:album>Album {album}</upnp:album>'
+    '<upnp:originalTrackNumber>{track}</upnp:originalTrackNumber>'
+    '<desc id="cdudn" nameSpace="urn:schemas-rinconnetworks-com:'
+    'metadata-1-0/">RINCON_AssociatedZPUDN</desc>'
+    '</item>'
+)
+
+
+def main():
+    """ Run the main script """
+    parser = argparse.ArgumentParser(
+        prog='',
+        description='Measure the memory used by music library items'
+    )
+    parser.add_argument(
+        '-n', '--number',
+        type=int, default=100000,
+        help="The number of tracks"
+    )
+    parser.add_argument(
+        '-p', '--page-size',
+        type=int, default=500,
+        help="The number of tracks in each page of DIDL-Lite"
+    )
+    parser.add_argument(
+        '-c', '--columnar',
+        action='store_true',
+        help="Store the tracks in a ColumnarSearchResult"
+    )
+
+    args = parser.parse_args()
+
+    pages = list(didl_pages(args.number, args.page_size))
+    gc.collect()
+    tracemalloc.start()
+    start = time.time()
+    if args.columnar:
+        items = ColumnarSearchResult('tracks')
+        for page in pages:
+            items.add_didl_string(page)
+    else:
+        items = []
+        for page in pages:
+            items.extend(from_didl_string(page))
+    elapsed = time.time() - start
+    gc.collect()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print("Parsed %d tracks in %.2fs" % (len(items), elapsed))
+    print("Retained: %.1f MB (%d bytes per track)" % (
+        size / 1e6, size // len(items)))
+    print("Peak: %.1f MB" % (peak / 1e6))
+
+
+def didl_pages(number, page_size):
+    """ Generate pages of DIDL-Lite for a synthetic library, with 12 tracks
+    per album and 5 albums per artist
+    """
+    for start in range(0, number, page_size):
+        tracks = []
+        for index in range(start, min(start + page_size, number)):
+            tracks.append(TRACK.format(
+                index=index, track=index % 12 + 1, album=index // 12,
+                artist=index // 60))
+        yield DIDL_START + ''.join(tracks) + DIDL_END
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+""" Benchmark the parsing of music library items
+
+Pages of DIDL-Lite, as returned by a Browse request, are generated for a
+synthetic music library (see benchmark_didl_memory.py), and the time taken to
+convert them to items is reported.
+"""
+
+from __future__ import unicode_literals, print_function, division
+import argparse
+import timeit
+
+from soco.data_structures_entry import from_didl_string
+
+from benchmark_didl_memory import didl_pages
+
+
+def main():
+    """ Run the main script """
+    parser = argparse.ArgumentParser(
+        prog='',
+        description='Benchmark the parsing of music library items'
+    )
+    parser.add_argument(
+        '-n', '--number',
+        type=int, default=5000,
+        help="The number of tracks"
+    )
+    parser.add_argument(
+        '-p', '--page-size',
+        type=int, default=500,
+        help="The number of tracks in each page of DIDL-Lite"
+    )
+    parser.add_argument(
+        '-r', '--repeat',
+        type=int, default=5,
+        help="The number of runs. The best run is reported"
+    )
+    parser.add_argument(
+        '-l', '--lazy',
+        action='store_true',
+        help="Make lazy items (see config.LAZY_DIDL_RESULTS), and read the "
+             "title and uri of each"
+    )
+
+    args = parser.parse_args()
+
+    pages = list(didl_pages(args.number, args.page_size))
+    if args.lazy:
+        def parse():
+            """ Parse the pages lazily, and read what a display would """
+            for page in pages:
+                for item in from_didl_string(page, lazy=True):
+                    item.title  # pylint: disable=pointless-statement
+                    item.resources[0].uri  # pylint: disable=W0104
+    else:
+        def parse():
+            """ Parse the pages """
+            for page in pages:
+                from_didl_string(page)
+    times = timeit.repeat(parse, number=1, repeat=args.repeat)
+    best = min(times)
+    print("Parsed %d pages of %d tracks in %.3fs" % (
+        len(pages), args.page_size, best))
+    print("%.1fms per page, %.1fus per track" % (
+        1000 * best / len(pages), 1e6 * best / args.number))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+""" Benchmark the parsing of UPnP events
+
+By default, the recorded AVTransport and RenderingControl events in the
+data directory are used. Other recorded event bodies (as received in the body
+of a NOTIFY request) can be given on the command line.
+"""
+
+from __future__ import unicode_literals, print_function
+import argparse
+import os
+import timeit
+
+from soco.events import parse_event_xml, LazyDidlMetadata
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DEFAULT_PAYLOADS = [
+    os.path.join(DATA_DIR, 'avtransport_event.xml'),
+    os.path.join(DATA_DIR, 'renderingcontrol_event.xml'),
+]
+
+
+def main():
+    """ Run the main script """
+    parser = argparse.ArgumentParser(
+        prog='',
+        description='Benchmark the parsing of UPnP events'
+    )
+    parser.add_argument(
+        'payloads', nargs='*', default=DEFAULT_PAYLOADS,
+        help="Files containing recorded event bodies"
+    )
+    parser.add_argument(
+        '-n', '--number',
+        type=int, default=2000,
+        help="The number of times to parse each event in each run"
+    )
+    parser.add_argument(
+        '-r', '--repeat',
+        type=int, default=5,
+        help="The number of runs. The best run is reported"
+    )
+
+    args = parser.parse_args()
+
+    print("{0:<30} {1:>8} {2:>14} {3:>14}".format(
+        'payload', 'bytes', 'parse (us)', '+ metadata (us)'))
+    for path in args.payloads:
+        with open(path, 'rb') as payload_file:
+            payload = payload_file.read()
+        parse_only = best_time(
+            lambda: parse_event_xml(payload), args.number, args.repeat)
+        parse_all = best_time(
+            lambda: resolve_metadata(parse_event_xml(payload)),
+            args.number, args.repeat)
+        print("{0:<30} {1:>8} {2:>14.1f} {3:>14.1f}".format(
+            os.path.basename(path), len(payload), parse_only, parse_all))
+
+
+def resolve_metadata(variables):
+    """ Parse any DIDL metadata in the variables, as a consumer which uses
+    all of an event would
+    """
+    for value in variables.values():
+        if isinstance(value, LazyDidlMetadata):
+            value.item  # pylint: disable=pointless-statement
+
+
+def best_time(func, number, repeat):
+    """ Return the best time taken to call func, in microseconds
+    """
+    times = timeit.repeat(func, number=number, repeat=repeat)
+    return min(times) / number * 1e6
+
+
+if __name__ == '__main__':
+    main()
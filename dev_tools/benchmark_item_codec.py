@@ -0,0 +1,90 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+""" Compare the item codec with pickle and JSON
+
+A synthetic music library of tracks (see benchmark_didl_memory.py) is
+encoded and decoded with soco.item_codec, with pickle, and as JSON (of the
+items' to_dict, with the resources converted to dicts too), and the size
+and time taken are reported.
+"""
+
+from __future__ import unicode_literals, print_function, division
+import argparse
+import json
+import pickle
+import timeit
+
+from soco import item_codec
+from soco.data_structures import _DIDL_CLASS_TO_CLASS
+from soco.data_structures_entry import from_didl_string
+
+from benchmark_didl_memory import didl_pages
+
+
+def main():
+    """ Run the main script """
+    parser = argparse.ArgumentParser(
+        prog='',
+        description='Compare the item codec with pickle and JSON'
+    )
+    parser.add_argument(
+        '-n', '--number',
+        type=int, default=20000,
+        help="The number of tracks"
+    )
+    parser.add_argument(
+        '-r', '--repeat',
+        type=int, default=3,
+        help="The number of runs. The best run is reported"
+    )
+
+    args = parser.parse_args()
+
+    items = []
+    for page in didl_pages(args.number, 500):
+        items.extend(from_didl_string(page))
+
+    codecs = [
+        ('item_codec', item_codec.encode,
+         lambda data: list(item_codec.decode(data))),
+        ('pickle', lambda items: pickle.dumps(items, pickle.HIGHEST_PROTOCOL),
+         pickle.loads),
+        ('json', to_json, from_json),
+    ]
+    print("{0:<12} {1:>12} {2:>14} {3:>14}".format(
+        'codec', 'bytes/item', 'encode (us)', 'decode (us)'))
+    for name, encode, decode in codecs:
+        data = encode(items)
+        assert decode(data) == items
+        encode_time = min(timeit.repeat(
+            lambda: encode(items), number=1, repeat=args.repeat))
+        decode_time = min(timeit.repeat(
+            lambda: decode(data), number=1, repeat=args.repeat))
+        print("{0:<12} {1:>12.1f} {2:>14.2f} {3:>14.2f}".format(
+            name, len(data) / len(items), 1e6 * encode_time / len(items),
+            1e6 * decode_time / len(items)))
+
+
+def to_json(items):
+    """ Convert items to JSON, by way of their to_dict """
+    dicts = []
+    for item in items:
+        content = item.to_dict()
+        content['item_class'] = item.item_class
+        dicts.append(content)
+    return json.dumps(dicts)
+
+
+def from_json(data):
+    """ Convert items from JSON """
+    items = []
+    for content in json.loads(data):
+        cls = _DIDL_CLASS_TO_CLASS[content.pop('item_class')]
+        items.append(cls.from_dict(content))
+    return items
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+""" Benchmark the local search index
+
+A synthetic library of tracks (with 12 tracks per album and 5 albums per
+artist, as in benchmark_didl_memory.py, and made up words for names) is
+indexed, and the time taken by queries typed a letter at a time is reported.
+"""
+
+from __future__ import unicode_literals, print_function, division
+import argparse
+import random
+import time
+import timeit
+
+from soco.data_structures import DidlMusicTrack
+from soco.search_index import SearchIndex
+
+SYLLABLES = ['ba', 'be', 'ka', 'lo', 'mi', 'nu', 'ra', 'so', 'ti', 'vé',
+             'ze', 'dru', 'str', 'ön', 'qua']
+QUERIES = ['beatles abbey', 'lomira', 'zesotika', 'rati', 'kamiso nu']
+
+
+def word(rand):
+    """ Make up a word """
+    return ''.join(rand.choice(SYLLABLES) for _ in range(rand.randint(2, 4)))
+
+
+def make_tracks(number):
+    """ Make a synthetic library of tracks """
+    rand = random.Random(0)
+    artists = {}
+    albums = {}
+    tracks = []
+    for index in range(number):
+        artist = artists.setdefault(
+            index // 60, ' '.join(word(rand) for _ in range(2)))
+        album = albums.setdefault(
+            index // 12, ' '.join(word(rand) for _ in range(3)))
+        tracks.append(DidlMusicTrack(
+            title=' '.join(word(rand) for _ in range(3)),
+            parent_id='A:TRACKS', item_id='S://server/{0}.mp3'.format(index),
+            creator=artist, album=album))
+    return tracks
+
+
+def main():
+    """ Run the main script """
+    parser = argparse.ArgumentParser(
+        prog='',
+        description='Benchmark the local search index'
+    )
+    parser.add_argument(
+        '-n', '--number',
+        type=int, default=100000,
+        help="The number of tracks"
+    )
+    parser.add_argument(
+        '-r', '--repeat',
+        type=int, default=5,
+        help="The number of runs. The best run is reported"
+    )
+
+    args = parser.parse_args()
+
+    tracks = make_tracks(args.number)
+    index = SearchIndex()
+    start = time.time()
+    index.index_items('tracks', tracks)
+    print("Indexed %d tracks in %.2fs" % (len(tracks), time.time() - start))
+    start = time.time()
+    index.index_items('tracks', tracks)
+    print("Re-indexed them, unchanged, in %.2fs" % (time.time() - start))
+
+    print("%-16s %10s %10s %8s" % ('query', 'cold (ms)', 'warm (ms)',
+                                   'results'))
+    for query in QUERIES:
+        typed = [query[:length] for length in range(1, len(query) + 1)]
+        for text in typed:
+            def cold():
+                """ Search with nothing cached """
+                index._prefix_cache.clear()  # pylint: disable=W0212
+                return index.search(text)
+            cold_time = min(timeit.repeat(cold, number=1, repeat=args.repeat))
+            warm_time = min(timeit.repeat(lambda: index.search(text),
+                                          number=1, repeat=args.repeat))
+            print("%-16s %10.3f %10.3f %8d" % (
+                text, 1000 * cold_time, 1000 * warm_time,
+                len(index.search(text, limit=args.number))))
+
+
+if __name__ == '__main__':
+    main()
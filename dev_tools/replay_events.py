@@ -0,0 +1,255 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+""" Record UPnP event traffic, and replay it to benchmark the event listener
+
+Record the events sent by the devices on the network for a minute:
+
+    replay_events.py record events.rec -t 60
+
+Replay them to a local event listener, 10 times faster than they were
+recorded, from 4 threads:
+
+    replay_events.py replay events.rec -s 10 -c 4
+
+A speed of 0 replays the events as fast as possible. Each replayed request is
+sent with a new sid, so that none of them is dropped as a duplicate.
+"""
+
+from __future__ import unicode_literals, print_function, division
+import argparse
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+import requests
+
+import soco
+from soco import config, events
+from soco.event_recording import EventRecorder, read_recording
+
+SERVICES = ('avTransport', 'renderingControl', 'contentDirectory',
+            'zoneGroupTopology')
+
+
+def main():
+    """ Run the main script """
+    parser = argparse.ArgumentParser(
+        prog='',
+        description='Record and replay UPnP event traffic'
+    )
+    subparsers = parser.add_subparsers(dest='command')
+
+    record_parser = subparsers.add_parser(
+        'record', help="Record the events sent by the devices on the network")
+    record_parser.add_argument('path', help="The recording to write")
+    record_parser.add_argument(
+        '-t', '--time',
+        type=float, default=60,
+        help="The number of seconds to record for"
+    )
+
+    replay_parser = subparsers.add_parser(
+        'replay', help="Replay a recording to a local event listener")
+    replay_parser.add_argument('path', help="The recording to replay")
+    replay_parser.add_argument(
+        '-s', '--speed',
+        type=float, default=1,
+        help="How much faster than recorded to replay the events. "
+             "0 means as fast as possible"
+    )
+    replay_parser.add_argument(
+        '-c', '--concurrency',
+        type=int, default=1,
+        help="The number of threads sending requests"
+    )
+    replay_parser.add_argument(
+        '-l', '--loops',
+        type=int, default=1,
+        help="The number of times to replay the recording"
+    )
+    replay_parser.add_argument(
+        '-p', '--processes',
+        type=int, default=1,
+        help="The number of event listener processes "
+             "(see config.EVENT_LISTENER_PROCESSES)"
+    )
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        record(args)
+    elif args.command == 'replay':
+        replay(args)
+    else:
+        parser.print_help()
+
+
+def record(args):
+    """ Subscribe to every device on the network, and record the events
+    """
+    recorder = EventRecorder(args.path)
+    events.EventNotifyHandler.recorder = recorder
+    services = [getattr(device, name) for device in soco.discover()
+                for name in SERVICES]
+    _, errors = events.subscribe_many(services, auto_renew=True)
+    print("Subscribed to %d services (%d failed)" % (
+        len(services) - len(errors), len(errors)))
+    try:
+        time.sleep(args.time)
+    except KeyboardInterrupt:
+        pass
+    events.unsubscribe_all()
+    recorder.close()
+    print("Recorded %d events in %s" % (recorder.count, args.path))
+
+
+class DummyService(object):
+    """ Stands in for the services whose events are replayed
+    """
+    service_id = 'Replay'
+
+    def _update_cache_on_event(self, event):
+        """ Do nothing """
+
+    def _refresh_evented_variables(self):  # pylint: disable=no-self-use
+        """ Do nothing """
+        return None
+
+
+def replay(args):
+    """ Replay a recording to a local event listener, and report the
+    throughput, latency and cpu usage
+    """
+    requests_ = list(read_recording(args.path)) * args.loops
+    print("Replaying %d events" % len(requests_))
+
+    # Register a sid for each request with the listener, all delivering to a
+    # callback which measures the time from receipt to dispatch
+    latencies = []
+    all_received = threading.Event()
+
+    def callback(event):
+        """ Measure the latency of an event """
+        latencies.append(time.time() - event.timestamp)
+        if len(latencies) == len(requests_):
+            all_received.set()
+
+    service = DummyService()
+    dispatcher = events.EventDispatcher()
+    dispatcher.add_callback(callback)
+    sids = ['uuid:replay-%d' % index for index in range(len(requests_))]
+    for sid in sids:
+        events._sid_to_service[sid] = service  # pylint: disable=W0212
+        events._sid_to_event_queue[sid] = dispatcher  # pylint: disable=W0212
+
+    config.EVENT_LISTENER_IP = '127.0.0.1'
+    config.EVENT_LISTENER_PORT = free_port()
+    config.EVENT_LISTENER_PROCESSES = args.processes
+    listener = events.event_listener
+    listener.start(None)
+    for sid in sids:
+        listener.register_sid(sid)
+    url = 'http://%s:%d/' % listener.address
+    wait_for_listener(url)
+
+    start_times = os.times()
+    start = time.time()
+    # Send the requests from another process, so that the cpu time used in
+    # this one is that of the listener
+    results = multiprocessing.Queue()
+    sender = multiprocessing.Process(
+        target=send, args=(url, requests_, sids, args.speed,
+                           args.concurrency, results))
+    sender.start()
+    sender_cpu = results.get()
+    sender.join()
+    all_received.wait(30)
+    elapsed = time.time() - start
+    listener.stop()
+    end_times = os.times()
+
+    # The shard processes (if any) and the sender have been joined, so their
+    # cpu time is included in the children's times
+    cpu = sum(end_times[:4]) - sum(start_times[:4]) - sender_cpu
+    received = len(latencies)
+    print("Received %d of %d events in %.2fs: %.0f events/s" % (
+        received, len(requests_), elapsed, received / elapsed))
+    if received:
+        latencies.sort()
+        print("Latency from receipt to dispatch (ms): " + ", ".join(
+            "p%d %.2f" % (percent, 1000 * percentile(latencies, percent))
+            for percent in (50, 90, 99, 100)))
+        print("CPU per event: %.0fus" % (1e6 * cpu / received))
+
+
+def send(url, requests_, sids, speed, concurrency, results):
+    """ Send the requests, from a number of threads, and put the cpu time
+    used on the results queue
+    """
+    start_times = os.times()
+    first = requests_[0][0]
+    start = time.time()
+    lock = threading.Lock()
+    pending = iter(range(len(requests_)))
+
+    def sender():
+        """ Send requests until there are none left """
+        session = requests.Session()
+        while True:
+            with lock:
+                index = next(pending, None)
+            if index is None:
+                return
+            timestamp, headers, body = requests_[index]
+            if speed:
+                delay = start + (timestamp - first) / speed - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            headers = dict(headers)
+            headers['SID'] = sids[index]
+            headers['SEQ'] = '0'
+            session.request('NOTIFY', url, data=body, headers=headers)
+
+    threads = [threading.Thread(target=sender) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    end_times = os.times()
+    results.put(sum(end_times[:2]) - sum(start_times[:2]))
+
+
+def free_port():
+    """ Return a free local port
+    """
+    probe = socket.socket()
+    probe.bind(('127.0.0.1', 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    return port
+
+
+def wait_for_listener(url):
+    """ Wait until the listener accepts connections
+    """
+    for _ in range(100):
+        try:
+            requests.request('NOTIFY', url, headers={
+                'SID': 'uuid:probe', 'SEQ': '0', 'Content-Length': '0'})
+            return
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.05)
+
+
+def percentile(values, percent):
+    """ Return a percentile of a sorted list
+    """
+    index = int(round(percent / 100 * (len(values) - 1)))
+    return values[index]
+
+
+if __name__ == '__main__':
+    main()
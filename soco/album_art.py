@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=not-context-manager
+
+# NOTE: The pylint not-content-manager warning is disabled pending the fix of
+# a bug in pylint: https://github.com/PyCQA/pylint/issues/782
+
+"""A cache of album art images on disk, for showing the art of many items.
+
+The album art of items in the queue and in the music library is usually
+served by the speakers themselves (from ``/getaa`` URIs), and fetching the
+same image again and again takes time on a speaker which may also be
+playing music. An `AlbumArtService` fetches images, a few at a time, and
+keeps them in a directory, up to a total size, dropping the least recently
+used first::
+
+    from soco.album_art import AlbumArtService
+
+    art = AlbumArtService(device, '/var/cache/sonos-art')
+    # Fetch the art of the next 10 items in the queue, in the background
+    art.prefetch_queue(10)
+    ...
+    for item in device.get_queue():
+        image = art.get_art(item)  # bytes, or None if there is no art
+
+Images are stored by a normalised version of their URI (see
+`normalize_uri`), in which the query parameters are sorted and the address
+of the speaker is left out of ``/getaa`` URIs, since every speaker in a
+household serves the same art for them. An image fetched from one speaker is
+therefore used for all of them.
+"""
+
+from __future__ import unicode_literals
+
+import errno
+import hashlib
+import logging
+import os
+import re
+import threading
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+import requests
+
+from . import config
+from .compat import urlparse
+from .utils import run_concurrently
+
+_LOG = logging.getLogger(__name__)
+
+# The names of the image files in a DiskLRU
+_FILE_NAME = re.compile(r'^[0-9a-f]{40}$')
+
+
+def normalize_uri(uri):
+    """Return the key under which the image at a URI is stored.
+
+    Args:
+        uri (str): An absolute or relative album art URI.
+
+    Returns:
+        str: The URI with its query parameters sorted, its scheme and host
+        in lower case, and no scheme or host at all if it is a speaker's
+        ``/getaa`` URI (or a relative one).
+    """
+    parts = urlparse(uri)
+    key = parts.path
+    query = '&'.join(sorted(param for param in parts.query.split('&')
+                            if param))
+    if query:
+        key += '?' + query
+    if parts.netloc and not parts.path.startswith('/getaa'):
+        key = '{0}://{1}{2}'.format(parts.scheme.lower(),
+                                    parts.netloc.lower(), key)
+    return key
+
+
+class DiskLRU(object):
+    """A store of byte strings in a directory, which drops the least recently
+    used when it grows past a total size.
+
+    Each value is kept in a file named after the SHA-1 of its key, and the
+    modification times of the files record when they were last used, so
+    that the order is kept when the store is opened again. It is safe to use
+    from several threads, but not from several processes at once.
+    """
+
+    def __init__(self, directory, max_bytes):
+        """
+        Args:
+            directory (str): The directory, which is created if it does not
+                exist.
+            max_bytes (int): The maximum total size of the values.
+        """
+        super(DiskLRU, self).__init__()
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        try:
+            os.makedirs(directory)
+        except OSError as error:
+            if error.errno != errno.EEXIST:
+                raise
+        # file name: size, least recently used first
+        self._sizes = OrderedDict()
+        self.total_bytes = 0
+        files = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if _FILE_NAME.match(name):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name, stat.st_size))
+            elif name.endswith('.tmp'):
+                # Left by an interrupted put
+                os.remove(path)
+        for _, name, size in sorted(files):
+            self._sizes[name] = size
+            self.total_bytes += size
+        with self._lock:
+            self._evict()
+
+    def __len__(self):
+        return len(self._sizes)
+
+    def __contains__(self, key):
+        return self._file_name(key) in self._sizes
+
+    def get(self, key):
+        """Return the value of a key, or `None` if it is not stored."""
+        name = self._file_name(key)
+        path = os.path.join(self.directory, name)
+        with self._lock:
+            if name not in self._sizes:
+                return None
+            self._sizes[name] = self._sizes.pop(name)
+            try:
+                os.utime(path, None)
+                with open(path, 'rb') as value_file:
+                    return value_file.read()
+            except (IOError, OSError):
+                # Removed behind our back
+                self.total_bytes -= self._sizes.pop(name)
+                return None
+
+    def put(self, key, value):
+        """Store the value of a key, and drop the least recently used values
+        if the total size is now too large.
+
+        Args:
+            key (str): The key.
+            value (bytes): The value.
+        """
+        name = self._file_name(key)
+        path = os.path.join(self.directory, name)
+        # Write to a temporary file first, so that a value is never read
+        # half written
+        temp_path = '{0}.{1}.tmp'.format(
+            path, threading.current_thread().ident)
+        with open(temp_path, 'wb') as value_file:
+            value_file.write(value)
+        with self._lock:
+            try:
+                os.rename(temp_path, path)
+            except OSError:
+                # Windows does not replace existing files
+                os.remove(path)
+                os.rename(temp_path, path)
+            self.total_bytes += len(value) - self._sizes.pop(name, 0)
+            self._sizes[name] = len(value)
+            self._evict()
+
+    def clear(self):
+        """Remove all the values."""
+        with self._lock:
+            for name in self._sizes:
+                self._remove(name)
+            self._sizes.clear()
+            self.total_bytes = 0
+
+    def _evict(self):
+        """Drop the least recently used values until the total size is small
+        enough. Called with the lock held."""
+        while self.total_bytes > self.max_bytes and self._sizes:
+            name, size = self._sizes.popitem(last=False)
+            self.total_bytes -= size
+            self._remove(name)
+
+    def _remove(self, name):
+        """Remove a value's file."""
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _file_name(key):
+        """Return the name of the file of a key."""
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+class AlbumArtService(object):
+    """Fetches and caches the album art of the items of a device.
+
+    At most ``max_workers`` images are fetched at once, however many
+    threads ask for them, and an image which is being fetched is not
+    fetched again by another thread, which waits for it instead.
+    """
+
+    def __init__(self, soco, directory, max_bytes=None, max_workers=None,
+                 timeout=10):
+        """
+        Args:
+            soco (`SoCo`): The device whose album art URIs are used, and
+                from which relative ones are fetched.
+            directory (str): The directory in which the images are kept.
+            max_bytes (int, optional): The maximum total size of the images.
+                Default `config.ALBUM_ART_CACHE_SIZE`.
+            max_workers (int, optional): The maximum number of images being
+                fetched at once. Default `config.ALBUM_ART_WORKERS`.
+            timeout (float): The number of seconds to wait for an image.
+                Default 10.
+        """
+        super(AlbumArtService, self).__init__()
+        self.soco = soco
+        if max_bytes is None:
+            max_bytes = config.ALBUM_ART_CACHE_SIZE
+        if max_workers is None:
+            max_workers = config.ALBUM_ART_WORKERS
+        self.max_workers = max_workers
+        self.timeout = timeout
+        #: `DiskLRU`: The store of images.
+        self.store = DiskLRU(directory, max_bytes)
+        self._fetch_slots = threading.BoundedSemaphore(max_workers)
+        self._lock = threading.Lock()
+        # key: threading.Event set when the image has been fetched
+        self._in_flight = {}
+
+    def art_uri(self, item):
+        """Return the absolute album art URI of an item.
+
+        Args:
+            item: A `DidlObject` (or any item with an ``album_art_uri``), or
+                a URI.
+
+        Returns:
+            str: The URI, or `None` if the item has no album art.
+        """
+        uri = getattr(item, 'album_art_uri', item)
+        if not uri:
+            return None
+        # pylint: disable=protected-access
+        return self.soco.music_library._build_album_art_full_uri(uri)
+
+    def get_art(self, item):
+        """Return the album art of an item, from the cache if it is there,
+        or from the device.
+
+        Args:
+            item: A `DidlObject` (or any item with an ``album_art_uri``), or
+                a URI.
+
+        Returns:
+            bytes: The image, or `None` if the item has no album art.
+
+        Raises:
+            `requests.exceptions.RequestException`: If the image cannot be
+                fetched.
+        """
+        uri = self.art_uri(item)
+        if uri is None:
+            return None
+        key = normalize_uri(uri)
+        image = self.store.get(key)
+        if image is not None:
+            return image
+        with self._lock:
+            fetched = self._in_flight.get(key)
+            fetching = fetched is None
+            if fetching:
+                fetched = self._in_flight[key] = threading.Event()
+        if not fetching:
+            # Another thread is fetching it. If that fails, try again
+            fetched.wait()
+            image = self.store.get(key)
+            return image if image is not None else self.get_art(uri)
+        try:
+            with self._fetch_slots:
+                response = requests.get(uri, timeout=self.timeout)
+            response.raise_for_status()
+            image = response.content
+            self.store.put(key, image)
+            return image
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            fetched.set()
+
+    def prefetch(self, items):
+        """Fetch the album art of items which is not in the cache, in a
+        background thread.
+
+        Images which cannot be fetched are logged and skipped.
+
+        Args:
+            items (list): Items with an ``album_art_uri``, or URIs.
+
+        Returns:
+            `threading.Thread`: The thread, which has been started, and ends
+            when all the images have been fetched.
+        """
+        uris = []
+        keys = set()
+        for item in items:
+            uri = self.art_uri(item)
+            if uri is None:
+                continue
+            key = normalize_uri(uri)
+            if key not in keys and key not in self.store:
+                keys.add(key)
+                uris.append(uri)
+
+        def fetch_all():
+            """Fetch the images, a few at a time."""
+            _, errors = run_concurrently(self.get_art, uris, self.max_workers)
+            for uri, error in errors.items():
+                _LOG.info("Unable to fetch album art %s: %s", uri, error)
+
+        thread = threading.Thread(target=fetch_all)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def prefetch_queue(self, count=10):
+        """Fetch the album art of the next items in the queue, after the
+        current track, in a background thread (see `prefetch`).
+
+        Args:
+            count (int): The number of items. Default 10.
+
+        Returns:
+            `threading.Thread`: The thread.
+        """
+        position = self.soco.get_current_track_info()['playlist_position']
+        try:
+            # playlist_position counts from 1, so it is the index of the next
+            # item
+            start = int(position)
+        except ValueError:
+            start = 0
+        return self.prefetch(self.soco.get_queue(start, count))
@@ -11,8 +11,14 @@ from __future__ import unicode_literals
 import threading
 from time import time
 
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
 from . import config
 from .compat import dumps
+from .utils import container_of, parse_container_update_ids
 
 
 class _BaseCache(object):
@@ -218,3 +224,185 @@ class Cache(NullCache):
         instance = super(Cache, cls).__new__(new_cls)
         instance.__init__(*args, **kwargs)
         return instance
+
+
+class BrowseCache(_BaseCache):
+
+    """A cache of the responses to ContentDirectory ``Browse`` requests,
+    which are kept for as long as the containers they come from are
+    unchanged.
+
+    Responses are stored by the ``ObjectID``, ``StartingIndex``,
+    ``RequestedCount``, ``Filter`` and ``SortCriteria`` of the request, with
+    the ``UpdateID`` which came with them. This is the update id of the top
+    level container of the object (eg ``A:`` for the music library, ``S:``
+    for the shares, or ``SQ:`` for the Sonos playlists), which the device
+    changes whenever anything in the container does.
+
+    A response is current if its update id is the same as the current one
+    of its container. The current update ids are taken from the
+    ``ContainerUpdateIDs`` of ContentDirectory events (see
+    `update_from_event`), when the device is subscribed to, so that `get`
+    needs no request at all. Otherwise, `peek` returns the stored response,
+    whose update id can be checked against that of a small request. The
+    update ids from events are only trusted while events are being received:
+    they are forgotten (see `forget_update_ids`) when the subscription ends,
+    expires or is replaced, and when events have been missed.
+
+    At most `config.BROWSE_CACHE_SIZE` responses are kept, and the least
+    recently used are dropped first. The cache is disabled if
+    `config.CACHE_ENABLED` is `False`.
+    """
+
+    def __init__(self, max_entries=None):
+        """
+        Args:
+            max_entries (int, optional): The maximum number of responses to
+                keep. Default `config.BROWSE_CACHE_SIZE`.
+        """
+        super(BrowseCache, self).__init__()
+        #: `int`: The maximum number of responses kept.
+        self.max_entries = config.BROWSE_CACHE_SIZE if max_entries is None \
+            else max_entries
+        self.enabled = config.CACHE_ENABLED
+        self._cache = OrderedDict()
+        # container id: update id, from events
+        self._update_ids = {}
+        self._cache_lock = threading.Lock()
+
+    def __len__(self):
+        """The number of responses in the cache."""
+        return len(self._cache)
+
+    def get(self, object_id, start, count, browse_filter='*',
+            sort_criteria=''):
+        """Get a response from the cache, if it is known to be current.
+
+        Args:
+            object_id (str): The ``ObjectID`` of the request.
+            start (int): The ``StartingIndex``.
+            count (int): The ``RequestedCount``.
+            browse_filter (str): The ``Filter``. Default ``'*'``.
+            sort_criteria (str): The ``SortCriteria``. Default ``''``.
+
+        Returns:
+            dict: The response, or `None` if there is none, or if an event
+            has not confirmed that its container is unchanged.
+        """
+        response = self.peek(object_id, start, count, browse_filter,
+                             sort_criteria)
+        if response is None:
+            return None
+        current = self._update_ids.get(container_of(object_id))
+        if current is None or current != int(response['UpdateID']):
+            return None
+        return response
+
+    def peek(self, object_id, start, count, browse_filter='*',
+             sort_criteria=''):
+        """Get a response from the cache, whether or not it is current.
+
+        Its ``UpdateID`` must be checked before it is used. The arguments
+        are the same as those of `get`.
+
+        Returns:
+            dict: The response, or `None`.
+        """
+        if not self.enabled:
+            return None
+        key = (object_id, start, count, browse_filter, sort_criteria)
+        with self._cache_lock:
+            response = self._cache.get(key)
+            if response is not None:
+                # Move it to the end, as the most recently used
+                del self._cache[key]
+                self._cache[key] = response
+        return response
+
+    def put(self, response, object_id, start, count, browse_filter='*',
+            sort_criteria=''):
+        """Put a response into the cache.
+
+        Args:
+            response (dict): The response, which must have an ``UpdateID``.
+            object_id (str): The ``ObjectID`` of the request. The other
+                arguments are the same as those of `get`.
+        """
+        if not self.enabled or self.max_entries <= 0:
+            return
+        key = (object_id, start, count, browse_filter, sort_criteria)
+        with self._cache_lock:
+            self._cache.pop(key, None)
+            self._cache[key] = response
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def delete(self, object_id, start, count, browse_filter='*',
+               sort_criteria=''):
+        """Delete a response from the cache. The arguments are the same as
+        those of `get`."""
+        key = (object_id, start, count, browse_filter, sort_criteria)
+        with self._cache_lock:
+            self._cache.pop(key, None)
+
+    def clear(self):
+        """Empty the whole cache, and forget the update ids of the
+        containers."""
+        with self._cache_lock:
+            self._cache.clear()
+            self._update_ids.clear()
+
+    def forget_update_ids(self):
+        """Forget the update ids taken from events.
+
+        `get` returns nothing until events bring them again. The responses
+        are kept, since they can still be checked with `peek`.
+        """
+        with self._cache_lock:
+            self._update_ids.clear()
+
+    def update_from_event(self, event):
+        """Take the current update ids of containers from a ContentDirectory
+        event.
+
+        Responses from containers whose update id has changed are dropped.
+
+        Args:
+            event (`soco.events.Event`): The event.
+        """
+        value = event.variables.get('container_update_i_ds')
+        if not value:
+            return
+        update_ids = parse_container_update_ids(value)
+        with self._cache_lock:
+            self._update_ids.update(update_ids)
+            for key, response in list(self._cache.items()):
+                update_id = update_ids.get(container_of(key[0]))
+                if update_id is not None and \
+                        update_id != int(response['UpdateID']):
+                    del self._cache[key]
+
+
+# ip address: the BrowseCache of the device
+_browse_caches = {}
+_browse_caches_lock = threading.Lock()
+
+
+def browse_cache(ip_address):
+    """Return the `BrowseCache` of a device.
+
+    There is one for each device, which is shared by its
+    `soco.music_library.MusicLibrary` instances and kept up to date by the
+    events of its ContentDirectory service.
+
+    Args:
+        ip_address (str): The IP address of the device.
+
+    Returns:
+        BrowseCache: The cache.
+    """
+    with _browse_caches_lock:
+        cache = _browse_caches.get(ip_address)
+        if cache is None:
+            cache = _browse_caches[ip_address] = BrowseCache()
+        return cache
@@ -14,7 +14,7 @@ try:  # python 3
     from urllib.error import URLError  # noqa
     from urllib.parse import quote_plus  # noqa
     import socketserver  # noqa
-    from queue import Queue  # noqa
+    from queue import Empty, Queue  # noqa
     StringType = bytes  # noqa
     UnicodeType = str  # noqa
     from urllib.parse import quote as quote_url  # noqa
@@ -25,7 +25,7 @@ except ImportError:  # python 2.7
     from urllib2 import urlopen, URLError  # noqa
     from urllib import quote_plus  # noqa
     import SocketServer as socketserver  # noqa
-    from Queue import Queue  # noqa
+    from Queue import Empty, Queue  # noqa
     from types import StringType, UnicodeType  # noqa
     from urllib import quote as quote_url   # noqa
     from urlparse import urlparse, parse_qs  # noqa
@@ -35,6 +35,15 @@ try:  # python 2.7 - this has to be done the other way round
 except ImportError:  # python 3
     from pickle import dumps  # noqa
 
+try:  # python 3
+    from sys import intern  # noqa
+except ImportError:  # python 2.7, where only byte strings can be interned
+    _INTERNED = {}
+
+    def intern(string):
+        """Return a canonical copy of a (unicode) string."""
+        return _INTERNED.setdefault(string, string)
+
 # Support Python 2.6
 try:  # Python 2.7+
     from logging import NullHandler  # noqa
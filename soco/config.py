@@ -31,6 +31,69 @@ See also:
 """
 
 
+LAZY_DIDL_RESULTS = False
+"""Are music library and queue results built lazily?
+
+If `True`, the items in the results of `SoCo.get_queue` and of the
+`soco.music_library.MusicLibrary` queries are
+`soco.data_structures_entry.LazyDidlObject` handles, which only build the
+full `soco.data_structures.DidlObject` when an attribute other than
+``title``, ``item_id``, ``parent_id``, ``item_class``, ``resources`` or
+``album_art_uri`` is used. This makes large results much quicker to fetch.
+The default is `False`.
+
+See also:
+    The :func:`soco.data_structures_entry.from_didl_string` function.
+"""
+
+
+BROWSE_WORKERS = 4
+"""The maximum number of music library Browse requests in progress at once
+for each device.
+
+Queries of the music library with ``complete_result=True`` fetch the pages
+after the first concurrently, up to this number at a time. The default is 4.
+
+See also:
+    The :mod:`soco.music_library` module.
+"""
+
+
+BROWSE_CACHE_SIZE = 100
+"""The maximum number of music library Browse responses kept for each
+device.
+
+The least recently used responses are dropped first. A response holds at
+most a page of results (usually 100 items). The default is 100.
+
+See also:
+    The :class:`soco.cache.BrowseCache` class.
+"""
+
+
+ALBUM_ART_CACHE_SIZE = 50 * 1024 * 1024
+"""The maximum total size, in bytes, of the images kept by an
+`soco.album_art.AlbumArtService`.
+
+The least recently used images are removed first. The default is 50MB.
+
+See also:
+    The :mod:`soco.album_art` module.
+"""
+
+
+ALBUM_ART_WORKERS = 2
+"""The maximum number of album art images fetched at once by an
+`soco.album_art.AlbumArtService`.
+
+Images are usually served by the speakers, so this is kept small. The
+default is 2.
+
+See also:
+    The :mod:`soco.album_art` module.
+"""
+
+
 EVENT_LISTENER_IP = None
 """The IP on which the event listener listens.
 
@@ -50,3 +113,103 @@ The default is 1400. You must set this before subscribing to any events.
 See also:
     The :mod:`soco.events` module.
 """
+
+
+EVENT_LISTENER_PROCESSES = 1
+"""The number of processes in which the event listener runs.
+
+The default of 1 runs the listener in a thread of the current process. On
+large systems, where parsing events may keep one core busy, a larger number
+spreads the work over several processes, which share the listening port
+using ``SO_REUSEPORT``. The events of a subscription may then be received
+by different processes, so they are put back into sequence order (waiting up
+to 0.2 seconds for any which are late) before they are delivered. This is
+not supported on all platforms (notably Windows). You must set this before
+subscribing to any events.
+
+See also:
+    The :mod:`soco.events` module.
+"""
+
+
+EVENT_RENEWAL_WORKERS = 4
+"""The number of worker threads used to renew event subscriptions.
+
+Subscriptions made with ``auto_renew=True`` are renewed by a single scheduler
+thread, which hands the actual renewal requests to a small pool of workers.
+Set this before subscribing to any events.
+
+See also:
+    The :mod:`soco.events` module.
+"""
+
+
+EVENT_RENEWAL_JITTER = 0.1
+"""The fraction of the renewal interval used to spread renewals.
+
+Each automatic renewal is scheduled a random amount of time (up to this
+fraction of the interval) earlier than strictly necessary, so that many
+subscriptions made at the same time do not all renew at the same moment.
+
+See also:
+    The :mod:`soco.events` module.
+"""
+
+
+EVENT_RESUBSCRIBE_BACKOFF_MIN = 2
+"""The initial delay, in seconds, before resubscribing after a failed renewal.
+
+If an automatic renewal fails, SoCo tries to make a new subscription in its
+place. While that keeps failing, the delay between attempts is doubled, up to
+`EVENT_RESUBSCRIBE_BACKOFF_MAX`.
+
+See also:
+    The :mod:`soco.events` module.
+"""
+
+
+EVENT_RESUBSCRIBE_BACKOFF_MAX = 300
+"""The maximum delay, in seconds, between attempts to resubscribe.
+
+See also:
+    The :mod:`soco.events` module.
+"""
+
+
+EVENT_SUBSCRIBE_WORKERS = 16
+"""The maximum number of subscription requests sent at once.
+
+Used by `soco.events.subscribe_many` and `soco.events.unsubscribe_all` to
+bound the number of requests in progress at the same time.
+
+See also:
+    The :mod:`soco.events` module.
+"""
+
+
+STATE_REFRESH_INTERVAL = 10
+"""The minimum time, in seconds, between the refreshes of the state of a
+device whose subscriptions have lapsed.
+
+While any of a device's subscriptions is not live,
+`soco.state.DeviceStateStore.get` returns the last record it has, and
+fetches the state over the network in the background, at most once in this
+time. The default is 10.
+
+See also:
+    The :mod:`soco.state` module.
+"""
+
+
+EVENT_JOURNAL_PATH = None
+"""The path of a file in which to keep a journal of event subscriptions.
+
+If set, each subscription is recorded in this file, and subscriptions are
+not unsubscribed when the program exits. On the next run,
+`soco.events.restore_subscriptions` takes them over by renewing them, which
+avoids making new subscriptions while the old ones are still live. The
+default of `None` disables the journal.
+
+See also:
+    The :mod:`soco.events` module.
+"""
@@ -27,6 +27,7 @@ from .exceptions import (
 )
 from .groups import ZoneGroup
 from .music_library import MusicLibrary
+from .page_planner import timed_browse
 from .services import (
     DeviceProperties, ContentDirectory, RenderingControl, AVTransport,
     ZoneGroupTopology, AlarmClock, SystemProperties, MusicServices,
@@ -1284,7 +1285,7 @@ class SoCo(_SocoSingletonBase):
         implementation
         """
         queue = []
-        response = self.contentDirectory.Browse([
+        response = timed_browse(self, [
             ('ObjectID', 'Q:0'),
             ('BrowseFlag', 'BrowseDirectChildren'),
             ('Filter', '*'),
@@ -1304,7 +1305,7 @@ class SoCo(_SocoSingletonBase):
             # pylint: disable=star-args
             return Queue(queue, **metadata)
 
-        items = from_didl_string(result)
+        items = from_didl_string(result, lazy=config.LAZY_DIDL_RESULTS)
         for item in items:
             # Check if the album art URI should be fully qualified
             if full_album_art_uri:
@@ -1516,7 +1517,7 @@ class SoCo(_SocoSingletonBase):
         if favorite_type != RADIO_SHOWS and favorite_type != RADIO_STATIONS:
             favorite_type = SONOS_FAVORITES
 
-        response = self.contentDirectory.Browse([
+        response = timed_browse(self, [
             ('ObjectID',
              'FV:2' if favorite_type is SONOS_FAVORITES
              else 'R:0/{0}'.format(favorite_type)),
@@ -1639,7 +1640,7 @@ class SoCo(_SocoSingletonBase):
         """
         # Get the update_id for the playlist
         response, _ = self.music_library._music_lib_search(
-            sonos_playlist.item_id, 0, 1)
+            sonos_playlist.item_id, 0, 1, cached=False)
         update_id = response['UpdateID']
 
         # Form the metadata for queueable_item
@@ -1933,7 +1934,8 @@ class SoCo(_SocoSingletonBase):
         # track_list = ','.join(track_list)
         # position_list = ','.join(position_list)
         if update_id == 0:  # retrieve the update id for the object
-            response, _ = self._music_lib_search(object_id, 0, 1)
+            response, _ = self.music_library._music_lib_search(
+                object_id, 0, 1, cached=False)
             update_id = response['UpdateID']
         change = 0
 
@@ -31,8 +31,16 @@ from __future__ import unicode_literals
 import sys
 import textwrap
 import warnings
+from array import array
+from collections import namedtuple
+from operator import attrgetter
 
-from .compat import with_metaclass
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+from .compat import intern, with_metaclass
 from .exceptions import DIDLMetadataError
 from .utils import really_unicode
 from .xml import (
@@ -44,30 +52,184 @@ from .xml import (
 # MISC HELPER FUNCTIONS                                                       #
 ###############################################################################
 
-def to_didl_string(*args):
+def _intern(value):
+    """Intern a string, which may be `None`.
+
+    Values such as ``desc``, ``parent_id`` and ``protocol_info`` are shared
+    by many items, so interning them saves memory when large numbers of items
+    are created.
+    """
+    return None if value is None else intern(value)
+
+
+def _escape_text(text):
+    """Escape the text of an element."""
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    return text
+
+
+# character: reference, for the characters which are escaped in attribute
+# values, other than those escaped in text. Whitespace is escaped so that it
+# is not normalised away when the value is parsed
+_ATTRIBUTE_ESCAPES = (
+    ('"', '&quot;'), ('\n', '&#10;'), ('\r', '&#13;'), ('\t', '&#09;'))
+
+
+def _escape_value(value):
+    """Escape the value of an attribute."""
+    value = _escape_text(value)
+    for char, reference in _ATTRIBUTE_ESCAPES:
+        if char in value:
+            value = value.replace(char, reference)
+    return value
+
+
+def _start_tag(tag, attrib):
+    """Return the start tag of an element, without the closing ``>``.
+
+    Args:
+        tag (str): The tag.
+        attrib (list): The attributes, as a list of ``(name, value)``
+            tuples, which are written in that order.
+    """
+    return '<' + tag + ''.join(
+        ' {0}="{1}"'.format(name, _escape_value(value))
+        for name, value in attrib)
+
+
+class _ElementWriter(object):
+    """Writes elements with a particular tag and attributes, and no
+    children."""
+
+    __slots__ = ('start', 'end', 'empty')
+
+    def __init__(self, tag, attrib=()):
+        """
+        Args:
+            tag (str): The tag.
+            attrib (list): The attributes, as a list of ``(name, value)``
+                tuples.
+        """
+        start = _start_tag(tag, attrib)
+        self.start = start + '>'
+        self.end = '</' + tag + '>'
+        self.empty = start + ' />'
+
+    def write(self, parts, text):
+        """Write an element.
+
+        Args:
+            parts (list): The list of strings to append to.
+            text (str): The text of the element, which may be `None`.
+        """
+        if text:
+            parts.append(self.start + _escape_text(text) + self.end)
+        else:
+            parts.append(self.empty)
+
+
+# Stands in for attributes which have not been set
+_MISSING = object()
+
+_DESC_ATTRIBUTES = [
+    ('id', 'cdudn'),
+    ('nameSpace', 'urn:schemas-rinconnetworks-com:metadata-1-0/'),
+]
+
+_DIDL_LITE_ATTRIBUTES = [
+    ('xmlns', "urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/"),
+    ('xmlns:dc', "http://purl.org/dc/elements/1.1/"),
+    ('xmlns:upnp', "urn:schemas-upnp-org:metadata-1-0/upnp/"),
+]
+
+_DIDL_LITE_START = _start_tag('DIDL-Lite', _DIDL_LITE_ATTRIBUTES)
+_TITLE_WRITER = _ElementWriter('dc:title')
+_CLASS_WRITER = _ElementWriter('upnp:class')
+_DESC_WRITER = _ElementWriter('desc', _DESC_ATTRIBUTES)
+
+
+def to_didl_string(*args, **kwargs):
     """Convert any number of `DidlObjects <DidlObject>` to a unicode xml
     string.
 
+    The string is written directly (with `write_didl_fragment`), rather
+    than by building an ElementTree and serialising it. The attributes of
+    each element are always written in the same order, the one in which
+    ``to_element`` adds them, whatever the version of Python.
+
     Args:
         *args (DidlObject): One or more `DidlObject` (or subclass) instances.
+        memo (dict, optional): A dict in which to keep the XML written for
+            each object, for reuse if the same object is converted again.
+            The objects must not be changed while the memo is in use.
 
     Returns:
         str: A unicode string representation of DIDL-Lite XML in the form
         ``'<DIDL-Lite ...>...</DIDL-Lite>'``.
     """
-    didl = XML.Element(
-        'DIDL-Lite',
-        {
-            'xmlns': "urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/",
-            'xmlns:dc': "http://purl.org/dc/elements/1.1/",
-            'xmlns:upnp': "urn:schemas-upnp-org:metadata-1-0/upnp/",
-        })
-    for arg in args:
-        didl.append(arg.to_element())
+    memo = kwargs.pop('memo', None)
+    if kwargs:
+        raise TypeError('Unexpected keyword arguments: {0}'.format(
+            ', '.join(kwargs)))
+    parts = [_DIDL_LITE_START]
+    if args:
+        parts.append('>')
+        for arg in args:
+            if memo is None:
+                write_didl_fragment(parts, arg)
+                continue
+            # The object is kept in the memo, so that its id is not reused
+            try:
+                fragment = memo[id(arg)][1]
+            except KeyError:
+                item_parts = []
+                write_didl_fragment(item_parts, arg)
+                fragment = ''.join(item_parts)
+                memo[id(arg)] = (arg, fragment)
+            parts.append(fragment)
+        parts.append('</DIDL-Lite>')
+    else:
+        parts.append(' />')
+    result = ''.join(parts)
     if sys.version_info[0] == 2:
-        return XML.tostring(didl)
+        # As ElementTree would, with references for non ASCII characters
+        return result.encode('us-ascii', 'xmlcharrefreplace')
+    return result
+
+
+def write_didl_fragment(parts, item, include_namespaces=False):
+    """Write the XML for an object, as ElementTree would serialise the
+    result of its ``to_element`` method.
+
+    Objects with a ``write_xml`` method (`DidlObject`, `DidlResource` and
+    `soco.music_services.data_structures.MusicServiceItem`) write
+    themselves. Others are converted with ``to_element`` and serialised.
+    ``include_namespaces`` is only passed to their ``to_element`` method if
+    it is True, since not every ``to_element`` method accepts it.
+
+    Args:
+        parts (list): The list of strings to append the XML to.
+        item: The object.
+        include_namespaces (bool, optional): If True, include xml
+            namespace attributes on the root element.
+    """
+    write_xml = getattr(item, 'write_xml', None)
+    if write_xml is not None:
+        write_xml(parts, include_namespaces=include_namespaces)
     else:
-        return XML.tostring(didl, encoding='unicode')
+        if include_namespaces:
+            element = item.to_element(include_namespaces=True)
+        else:
+            element = item.to_element()
+        if sys.version_info[0] == 2:
+            parts.append(XML.tostring(element).decode('us-ascii'))
+        else:
+            parts.append(XML.tostring(element, encoding='unicode'))
 
 
 ###############################################################################
@@ -85,6 +247,29 @@ class DidlResource(object):
 
     # Adapted from a class taken from the Python Brisa project - MIT licence.
 
+    # Large numbers of resources are created when browsing the music library,
+    # so they have no instance dict
+    __slots__ = (
+        'uri', 'protocol_info', 'import_uri', 'size', 'duration', 'bitrate',
+        'sample_frequency', 'bits_per_sample', 'nr_audio_channels',
+        'resolution', 'color_depth', 'protection', '__weakref__',
+    )
+
+    # The optional attributes of the <res> element, in the order in which
+    # they are written, as (XML name, attribute, conversion function) tuples
+    _optional_attributes = (
+        ('importUri', 'import_uri', lambda value: value),
+        ('size', 'size', str),
+        ('duration', 'duration', lambda value: value),
+        ('bitrate', 'bitrate', str),
+        ('sampleFrequency', 'sample_frequency', str),
+        ('bitsPerSample', 'bits_per_sample', str),
+        ('nrAudioChannels', 'nr_audio_channels', str),
+        ('resolution', 'resolution', lambda value: value),
+        ('colorDepth', 'color_depth', str),
+        ('protection', 'protection', lambda value: value),
+    )
+
     # pylint: disable=too-many-instance-attributes
     def __init__(self, uri, protocol_info, import_uri=None, size=None,
                  duration=None, bitrate=None, sample_frequency=None,
@@ -162,7 +347,7 @@ class DidlResource(object):
 
         content = {}
         # required
-        content['protocol_info'] = element.get('protocolInfo')
+        content['protocol_info'] = _intern(element.get('protocolInfo'))
         if content['protocol_info'] is None:
             raise Exception('Could not create Resource from Element: '
                             'protocolInfo not found (required).')
@@ -180,6 +365,15 @@ class DidlResource(object):
         content['uri'] = element.text
         return cls(**content)
 
+    def __getstate__(self):
+        # Needed to pickle an instance with __slots__ (with older pickle
+        # protocols)
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        for key, value in state.items():
+            setattr(self, key, value)
+
     def __repr__(self):
         return '<{0} \'{1}\' at {2}>'.format(self.__class__.__name__,
                                              self.uri,
@@ -202,30 +396,39 @@ class DidlResource(object):
         # Required
         root.attrib['protocolInfo'] = self.protocol_info
         # Optional
-        if self.import_uri is not None:
-            root.attrib['importUri'] = self.import_uri
-        if self.size is not None:
-            root.attrib['size'] = str(self.size)
-        if self.duration is not None:
-            root.attrib['duration'] = self.duration
-        if self.bitrate is not None:
-            root.attrib['bitrate'] = str(self.bitrate)
-        if self.sample_frequency is not None:
-            root.attrib['sampleFrequency'] = str(self.sample_frequency)
-        if self.bits_per_sample is not None:
-            root.attrib['bitsPerSample'] = str(self.bits_per_sample)
-        if self.nr_audio_channels is not None:
-            root.attrib['nrAudioChannels'] = str(self.nr_audio_channels)
-        if self.resolution is not None:
-            root.attrib['resolution'] = self.resolution
-        if self.color_depth is not None:
-            root.attrib['colorDepth'] = str(self.color_depth)
-        if self.protection is not None:
-            root.attrib['protection'] = self.protection
+        for name, key, convert in self._optional_attributes:
+            value = getattr(self, key)
+            if value is not None:
+                root.attrib[name] = convert(value)
 
         root.text = self.uri
         return root
 
+    def write_xml(self, parts, include_namespaces=False):
+        """Write the XML of the element returned by `to_element`, with its
+        attributes in the order in which `to_element` adds them.
+
+        Args:
+            parts (list): The list of strings to append the XML to.
+            include_namespaces (bool, optional): Accepted for compatibility
+                with `DidlObject.write_xml`. A ``<res>`` element has no
+                namespace attributes, so it is ignored.
+        """
+        # pylint: disable=unused-argument
+        if not self.protocol_info:
+            raise Exception('Could not create Element for this resource: '
+                            'protocolInfo not set (required).')
+        attrib = [('protocolInfo', self.protocol_info)]
+        for name, key, convert in self._optional_attributes:
+            value = getattr(self, key)
+            if value is not None:
+                attrib.append((name, convert(value)))
+        start = _start_tag('res', attrib)
+        if self.uri:
+            parts.append('{0}>{1}</res>'.format(start, _escape_text(self.uri)))
+        else:
+            parts.append(start + ' />')
+
     def to_dict(self, remove_nones=False):
         """Return a dict representation of the `DidlResource`.
 
@@ -279,9 +482,34 @@ class DidlResource(object):
         """
         if not isinstance(resource, DidlResource):
             return False
-        return self.to_dict() == resource.to_dict()
+        return self.uri == resource.uri and \
+            self.content_key() == resource.content_key()
+
+    def __ne__(self, resource):
+        """Compare with another ``DidlResource``.
+
+        Returns:
+            (bool): `True` if any items is unequal, else `False`.
+        """
+        return not self == resource
+
+    # Resources can be changed, and so are not hashable (on Python 2 too)
+    __hash__ = None
+
+    def content_key(self):
+        """Return the values of all the attributes of the resource.
+
+        Returns:
+            tuple: The values, which can be compared (and hashed) in place of
+            the resource.
+        """
+        return _get_resource_attributes(self)
 
 
+
+# Gets the values of all the attributes of a DidlResource, in slot order
+_get_resource_attributes = attrgetter(*DidlResource.__slots__[:-1])
+
 ###############################################################################
 # BASE OBJECTS                                                                #
 ###############################################################################
@@ -291,9 +519,104 @@ class DidlResource(object):
 _DIDL_CLASS_TO_CLASS = {}
 
 
+# The attributes of every DidlObject which are not listed in _translation
+_DIDL_OBJECT_ATTRIBUTES = (
+    'title', 'parent_id', 'item_id', 'restricted', 'resources', 'desc')
+
+# The qualified tags of the children of an <item> or <container> element
+# which are not listed in _translation
+_TITLE_TAG = ns_tag('dc', 'title')
+_CLASS_TAG = ns_tag('upnp', 'class')
+_RES_TAG = ns_tag('', 'res')
+_DESC_TAG = ns_tag('', 'desc')
+
+
+def decode_didl_element(element):
+    """Decode the children of a DIDL-Lite <item> or <container> element.
+
+    The children are examined once, in a single pass.
+
+    Args:
+        element (~xml.etree.ElementTree.Element): The element.
+
+    Returns:
+        tuple: A tuple of a dict mapping the qualified tag of each child
+        (other than <res> children) to its text (which may be `None`), and a
+        list of the <res> children. As with
+        :meth:`~xml.etree.ElementTree.Element.findtext`, only the first child
+        with each tag is used.
+    """
+    texts = {}
+    res_elements = []
+    for child in element:
+        tag = child.tag
+        if tag == _RES_TAG:
+            res_elements.append(child)
+        elif tag not in texts:
+            texts[tag] = child.text
+    return texts, res_elements
+
+
+def didl_class_from_texts(texts):
+    """Return the DIDL class from the texts of a decoded element.
+
+    Args:
+        texts (dict): The texts, as returned by `decode_didl_element`.
+
+    Returns:
+        str: The DIDL class, without any unofficial subclass (eg ``.#foo``).
+
+    Raises:
+        DIDLMetadataError: If there is no <upnp:class> element.
+    """
+    item_class = texts.get(_CLASS_TAG)
+    if item_class is None:
+        raise DIDLMetadataError("Missing upnp:class element")
+    # In case this class has an # specified unofficial
+    # subclass, ignore it by stripping it from item_class
+    if '.#' in item_class:
+        item_class = item_class[:item_class.find('.#')]
+    return item_class
+
+
+def restricted_from_element(element):
+    """Return the value of the ``restricted`` attribute of a DIDL-Lite
+    element.
+
+    Args:
+        element (~xml.etree.ElementTree.Element): The <item> or <container>
+            element.
+
+    Returns:
+        bool: `True` if the attribute is ``'1'`` or ``'true'``.
+
+    Raises:
+        DIDLMetadataError: If there is no ``restricted`` attribute.
+    """
+    restricted = element.get('restricted')
+    if restricted is None:
+        raise DIDLMetadataError("Missing restricted attribute")
+    return restricted in ('1', 'true', 'True')
+
+
+# Attributes in _translation whose values are typically shared by many items
+# (eg all the tracks on an album), and so are interned when parsed
+_INTERNED_ATTRIBUTES = frozenset(('creator', 'album', 'artist', 'genre'))
+
+
 class DidlMetaClass(type):
 
-    """Meta class for all Didl objects."""
+    """Meta class for all Didl objects.
+
+    As well as registering each class by its DIDL class, and building the
+    table used by `DidlObject.from_element` to decode elements, the meta class
+    gives each class ``__slots__`` for the attributes listed in its
+    ``_translation`` (and those common to all objects), unless the class
+    defines ``__slots__`` itself. Instances therefore store their metadata
+    without an instance dict, which matters when many thousands of them are
+    created. A ``__dict__`` slot is kept on the base class, so that other
+    attributes can still be set, in which case the dict is created.
+    """
 
     def __new__(mcs, name, bases, attrs):
         """Create a new instance.
@@ -303,7 +626,37 @@ class DidlMetaClass(type):
             bases (tuple): Base classes.
             attrs (dict): attributes defined for the class.
         """
+        if '__slots__' not in attrs:
+            inherited = set()
+            for base in bases:
+                for klass in base.__mro__:
+                    inherited.update(getattr(klass, '__slots__', ()))
+            if not any(isinstance(base, DidlMetaClass) for base in bases):
+                names = _DIDL_OBJECT_ATTRIBUTES + (
+                    '_fingerprint', '__dict__', '__weakref__')
+            else:
+                names = ()
+            translation = attrs.get('_translation')
+            if translation is None:
+                translation = getattr(bases[0], '_translation', {})
+            names += tuple(sorted(translation))
+            # A slot may not have the same name as a class attribute
+            attrs['__slots__'] = tuple(
+                slot for slot in names
+                if slot not in inherited and slot not in attrs)
         new_cls = super(DidlMetaClass, mcs).__new__(mcs, name, bases, attrs)
+        # A table of the qualified tag of each child element in
+        # _translation, to the attribute it is stored in, used by
+        # from_element
+        new_cls._tag_to_attribute = dict(
+            (ns_tag(*value), key)
+            for key, value in getattr(new_cls, '_translation', {}).items())
+        # A writer for each child element in _translation, in order, used
+        # by write_xml
+        new_cls._element_writers = [
+            (key, _ElementWriter(
+                "%s:%s" % value if value[0] else value[1]))
+            for key, value in getattr(new_cls, '_translation', {}).items()]
         # Register all subclasses with the global _DIDL_CLASS_TO_CLASS mapping
         item_class = attrs.get('item_class', None)
         if item_class is not None:
@@ -419,9 +772,8 @@ class DidlObject(with_metaclass(DidlMetaClass, object)):
             # way.
             setattr(self, key, value)
 
-    # pylint: disable=too-many-locals
     @classmethod
-    def from_element(cls, element):     # pylint: disable=R0914
+    def from_element(cls, element):
         """Create an instance of this class from an ElementTree xml Element.
 
         An alternative constructor. The element must be a DIDL-Lite <item> or
@@ -431,6 +783,26 @@ class DidlObject(with_metaclass(DidlMetaClass, object)):
             xml (~xml.etree.ElementTree.Element): An
                 :class:`~xml.etree.ElementTree.Element` object.
         """
+        texts, res_elements = decode_didl_element(element)
+        return cls.from_decoded_element(element, texts, res_elements)
+
+    # pylint: disable=too-many-locals
+    @classmethod
+    def from_decoded_element(cls, element, texts, res_elements):
+        """Create an instance of this class from an element which has been
+        decoded with `decode_didl_element`.
+
+        This allows the caller to inspect the decoded element (eg to find
+        its class) without decoding it twice.
+
+        Args:
+            element (~xml.etree.ElementTree.Element): The <item> or
+                <container> element.
+            texts (dict): The texts of its children, as returned by
+                `decode_didl_element`.
+            res_elements (list): Its <res> children, as returned by
+                `decode_didl_element`.
+        """
         # We used to check here that we have the right sort of element,
         # ie a container or an item. But Sonos seems to use both
         # indiscriminately, eg a playlistContainer can be an item or a
@@ -442,13 +814,7 @@ class DidlObject(with_metaclass(DidlMetaClass, object)):
                 " got <{0}> for class {1}'".format(
                     tag, cls.item_class))
         # and that the upnp matches what we are expecting
-        item_class = element.find(ns_tag('upnp', 'class')).text
-
-        # In case this class has an # specified unofficial
-        # subclass, ignore it by stripping it from item_class
-        if '.#' in item_class:
-            item_class = item_class[:item_class.find('.#')]
-
+        item_class = didl_class_from_texts(texts)
         if item_class != cls.item_class:
             raise DIDLMetadataError(
                 "UPnP class is incorrect. Expected '{0}',"
@@ -459,39 +825,40 @@ class DidlObject(with_metaclass(DidlMetaClass, object)):
         item_id = really_unicode(element.get('id', None))
         if item_id is None:
             raise DIDLMetadataError("Missing id attribute")
-        parent_id = really_unicode(element.get('parentID', None))
+        parent_id = _intern(really_unicode(element.get('parentID', None)))
         if parent_id is None:
             raise DIDLMetadataError("Missing parentID attribute")
-        restricted = element.get('restricted', None)
-        if restricted is None:
-            raise DIDLMetadataError("Missing restricted attribute")
-        restricted = True if restricted in [1, 'true', 'True'] else False
+        restricted = restricted_from_element(element)
 
         # There must be a title. According to spec, it should be the first
         # child, but Sonos does not abide by this
-        title_elt = element.find(ns_tag('dc', 'title'))
-        if title_elt is None:
+        if _TITLE_TAG not in texts:
             raise DIDLMetadataError(
                 "Missing title element")
-        title = really_unicode(title_elt.text)
+        title = really_unicode(texts[_TITLE_TAG])
 
         # Deal with any resource elements
-        resources = []
-        for res_elt in element.findall(ns_tag('', 'res')):
-            resources.append(
-                DidlResource.from_element(res_elt))
+        resources = [DidlResource.from_element(res_elt)
+                     for res_elt in res_elements]
 
         # and the desc element (There is only one in Sonos)
-        desc = element.findtext(ns_tag('', 'desc'))
+        desc = texts.get(_DESC_TAG)
+        if desc is None and _DESC_TAG in texts:
+            desc = ''
+        desc = _intern(desc)
 
         # Get values of the elements listed in _translation and add them to
         # the content dict
         content = {}
-        for key, value in cls._translation.items():
-            result = element.findtext(ns_tag(*value))
-            if result is not None:
+        tag_to_attribute = cls._tag_to_attribute
+        for tag, text in texts.items():
+            key = tag_to_attribute.get(tag)
+            if key is not None:
                 # We store info as unicode internally.
-                content[key] = really_unicode(result)
+                result = '' if text is None else really_unicode(text)
+                if key in _INTERNED_ATTRIBUTES:
+                    result = intern(result)
+                content[key] = result
 
         # Convert type for original track number
         if content.get('original_track_number') is not None:
@@ -522,15 +889,42 @@ class DidlObject(with_metaclass(DidlMetaClass, object)):
                                     for x in content['resources']]
         return cls(**content)
 
+    def __getstate__(self):
+        # Needed to pickle an instance with __slots__ (with older pickle
+        # protocols)
+        state = {}
+        for klass in self.__class__.__mro__:
+            for name in getattr(klass, '__slots__', ()):
+                # The fingerprint is not kept, as hashes of strings differ
+                # from one process to the next
+                if not name.startswith('_') and hasattr(self, name):
+                    state[name] = getattr(self, name)
+        state.update(getattr(self, '__dict__', {}))
+        return state
+
+    def __setstate__(self, state):
+        for key, value in state.items():
+            setattr(self, key, value)
+
     def __eq__(self, playable_item):
         """Compare with another ``playable_item``.
 
+        Items are equal if they have the same `identity`, and the rest of
+        their metadata (see `content_key`) is equal too.
+
         Returns:
             (bool): `True` if all items are equal, else `False`.
         """
+        if self is playable_item:
+            return True
         if not isinstance(playable_item, DidlObject):
             return False
-        return self.to_dict() == playable_item.to_dict()
+        # Most comparisons are between different items, which is quick to
+        # spot
+        if self.item_id != playable_item.item_id or \
+                self.item_class != playable_item.item_class:
+            return False
+        return self.content_key() == playable_item.content_key()
 
     def __ne__(self, playable_item):
         """Compare with another ``playable_item``.
@@ -538,9 +932,54 @@ class DidlObject(with_metaclass(DidlMetaClass, object)):
         Returns:
             (bool): `True` if any items is unequal, else `False`.
         """
-        if not isinstance(playable_item, DidlObject):
-            return True
-        return self.to_dict() != playable_item.to_dict()
+        return not self == playable_item
+
+    def __hash__(self):
+        """Get the hash of the item, which is that of its `identity`.
+
+        Items can therefore be put in sets, or used as dict keys, to remove
+        duplicates from, or compare, large lists of them in linear time. The
+        ``item_id`` of an item should not be changed while it is in a set or
+        dict.
+        """
+        return hash((self.item_class, self.item_id))
+
+    @property
+    def identity(self):
+        """tuple: The DIDL class and the id of the item, which identify it
+        (but not its metadata, which may change)."""
+        return (self.item_class, self.item_id)
+
+    def content_key(self):
+        """Return the metadata of the item, for comparisons.
+
+        Returns:
+            tuple: The DIDL class, the attributes compared by `__eq__` (the
+            attributes listed in ``_translation``, and those common to all
+            items), and the `DidlResource.content_key` of each resource.
+        """
+        key = [self.item_class, self.item_id, self.parent_id, self.title,
+               self.restricted, self.desc,
+               tuple(resource.content_key() for resource in self.resources)]
+        for name in self._translation:
+            key.append(getattr(self, name, _MISSING))
+        return tuple(key)
+
+    @property
+    def fingerprint(self):
+        """int: A hash of the `content_key` of the item, which can be used to
+        spot items whose metadata has changed, eg between two snapshots of
+        the queue.
+
+        It is computed the first time it is read, and kept, so it does not
+        change if the item is changed after that. Like the hash of a string,
+        it differs from one process to the next.
+        """
+        try:
+            return self._fingerprint
+        except AttributeError:
+            self._fingerprint = hash(self.content_key())
+            return self._fingerprint
 
     def __repr__(self):
         """Get the repr value for the item.
@@ -653,6 +1092,36 @@ class DidlObject(with_metaclass(DidlMetaClass, object)):
 
         return elt
 
+    def write_xml(self, parts, include_namespaces=False):
+        """Write the XML of the element returned by `to_element`, with its
+        attributes in the order in which `to_element` adds them.
+
+        This is much quicker than building the element. Subclasses which
+        override `to_element` must override this too.
+
+        Args:
+            parts (list): The list of strings to append the XML to.
+            include_namespaces (bool, optional): If True, include xml
+                namespace attributes on the root element
+        """
+        attrib = list(_DIDL_LITE_ATTRIBUTES) if include_namespaces else []
+        attrib.extend([
+            ('parentID', self.parent_id),
+            ('restricted', 'true' if self.restricted else 'false'),
+            ('id', self.item_id),
+        ])
+        parts.append(_start_tag(self.tag, attrib) + '>')
+        _TITLE_WRITER.write(parts, self.title)
+        for resource in self.resources:
+            resource.write_xml(parts)
+        for key, writer in self._element_writers:
+            value = getattr(self, key, _MISSING)
+            if value is not _MISSING:
+                writer.write(parts, "%s" % value)
+        _CLASS_WRITER.write(parts, self.item_class)
+        _DESC_WRITER.write(parts, self.desc)
+        parts.append('</{0}>'.format(self.tag))
+
     def get_uri(self, resource_nr=0):
         """Return the uri to use for playing this item.
 
@@ -1064,8 +1533,9 @@ class ListOfMusicInfoItems(list):
 
     def __init__(self, items, number_returned, total_matches, update_id):
         super(ListOfMusicInfoItems, self).__init__(items)
+        # The items are not copied into the metadata, which would keep a
+        # second reference to each of them
         self._metadata = {
-            'item_list': list(items),
             'number_returned': number_returned,
             'total_matches': total_matches,
             'update_id': update_id,
@@ -1080,7 +1550,7 @@ class ListOfMusicInfoItems(list):
             release after 0.8. The metadata can be fetched via the named
             attributes.
         """
-        if key in self._metadata:
+        if key == 'item_list' or key in self._metadata:
             if key == 'item_list':
                 message = """
                 Calling [\'item_list\'] on search results to obtain the objects
@@ -1096,6 +1566,8 @@ class ListOfMusicInfoItems(list):
                 0.8""".format(key, self.__class__.__name__)
             message = textwrap.dedent(message).replace('\n', ' ').lstrip()
             warnings.warn(message, stacklevel=2)
+            if key == 'item_list':
+                return list(self)
             return self._metadata[key]
         else:
             return super(ListOfMusicInfoItems, self).__getitem__(key)
@@ -1151,3 +1623,369 @@ class Queue(ListOfMusicInfoItems):
             self.__class__.__name__,
             super(Queue, self).__repr__(),
         )
+
+
+#: The columns of a `ColumnarSearchResult`.
+COLUMNS = (
+    'item_id', 'parent_id', 'title', 'item_class', 'uri', 'protocol_info',
+    'creator', 'album', 'album_art_uri', 'original_track_number',
+    'restricted', 'desc',
+)
+
+#: A row of a `ColumnarSearchResult`, with a field for each of the `COLUMNS`.
+ColumnarRow = namedtuple('ColumnarRow', COLUMNS)
+
+# column name: qualified tag, for the columns taken from the texts of the
+# children of an element
+_TEXT_COLUMNS = (
+    ('title', _TITLE_TAG),
+    ('creator', ns_tag('dc', 'creator')),
+    ('album', ns_tag('upnp', 'album')),
+    ('album_art_uri', ns_tag('upnp', 'albumArtURI')),
+    ('desc', _DESC_TAG),
+)
+
+_TRACK_NUMBER_TAG = ns_tag('upnp', 'originalTrackNumber')
+
+# The columns whose values are shared by many rows, and so are interned
+_INTERNED_COLUMNS = frozenset(
+    ('parent_id', 'item_class', 'protocol_info', 'creator', 'album', 'desc'))
+
+# The columns which are held in arrays, with the type code of the array.
+# Missing track numbers are stored as -1.
+_ARRAY_COLUMNS = {'original_track_number': 'l', 'restricted': 'b'}
+
+# The columns which may be passed to the constructor of a DidlObject, if its
+# class allows them
+_OPTIONAL_COLUMNS = (
+    'creator', 'album', 'album_art_uri', 'original_track_number')
+
+
+def _unicode_or_none(value):
+    """Convert a value to unicode, unless it is `None`."""
+    return None if value is None else really_unicode(value)
+
+
+class ColumnarSearchResult(object):
+
+    """A compact search or browse result, stored by column.
+
+    A `SearchResult` holds a `DidlObject` for each item, which uses a lot of
+    memory when there are tens of thousands of them. A
+    `ColumnarSearchResult` instead keeps each of the `COLUMNS` in a list (or
+    an array, for numbers), with shared values such as album and artist
+    names interned, and builds each row as a `ColumnarRow` when it is used.
+    Results can be filtered, sorted and grouped by their columns without
+    building any rows::
+
+        tracks = library.get_tracks(complete_result=True, columnar=True)
+        for album, album_tracks in tracks.filter(
+                creator='Metallica').group_by('album').items():
+            print(album, album_tracks.sort('original_track_number')[0].title)
+
+    Any item can be converted to a `DidlObject` with `didl_object`, with
+    the attributes held in the columns.
+
+    Like a `SearchResult`, it has `number_returned`, `total_matches`,
+    `update_id` and `search_type` attributes.
+    """
+
+    def __init__(self, search_type, number_returned=0, total_matches=0,
+                 update_id=None):
+        """
+        Args:
+            search_type (str): The search type.
+            number_returned (int): The number of returned matches.
+            total_matches (int): The number of total matches.
+            update_id (int): The update ID.
+        """
+        super(ColumnarSearchResult, self).__init__()
+        self._metadata = {
+            'search_type': search_type,
+            'number_returned': number_returned,
+            'total_matches': total_matches,
+            'update_id': update_id,
+        }
+        self._columns = {}
+        for name in COLUMNS:
+            if name in _ARRAY_COLUMNS:
+                self._columns[name] = array(_ARRAY_COLUMNS[name])
+            else:
+                self._columns[name] = []
+
+    def add_didl_string(self, string):
+        """Add the items in a DIDL-Lite string to the result.
+
+        Args:
+            string (str): A unicode string containing an XML representation
+                of one or more DIDL-Lite items, as returned by a Browse
+                request.
+
+        Raises:
+            DIDLMetadataError: If the string contains anything other than
+                items or containers, or an item has no or an unknown class,
+                or no ``restricted`` attribute.
+        """
+        columns = self._columns
+        root = XML.fromstring(string.encode('utf-8'))
+        for element in root:
+            tag = element.tag
+            if not (tag.endswith('item') or tag.endswith('container')):
+                raise DIDLMetadataError(
+                    "Illegal child of DIDL element: <%s>" % tag)
+            texts, res_elements = decode_didl_element(element)
+            item_class = didl_class_from_texts(texts)
+            if item_class not in _DIDL_CLASS_TO_CLASS:
+                raise DIDLMetadataError("Unknown UPnP class: %s" % item_class)
+            restricted = restricted_from_element(element)
+            row = {
+                'item_id': _unicode_or_none(element.get('id')),
+                'parent_id': _unicode_or_none(element.get('parentID')),
+                'item_class': item_class,
+                'uri': None,
+                'protocol_info': None,
+            }
+            if res_elements:
+                row['uri'] = really_unicode(res_elements[0].text or '')
+                row['protocol_info'] = _unicode_or_none(
+                    res_elements[0].get('protocolInfo'))
+            for name, text_tag in _TEXT_COLUMNS:
+                if text_tag in texts:
+                    row[name] = really_unicode(texts[text_tag] or '')
+                else:
+                    row[name] = None
+            for name in _INTERNED_COLUMNS:
+                row[name] = _intern(row[name])
+            for name, value in row.items():
+                columns[name].append(value)
+            track_number = texts.get(_TRACK_NUMBER_TAG)
+            columns['original_track_number'].append(
+                int(track_number) if track_number else -1)
+            columns['restricted'].append(restricted)
+
+    def column(self, name):
+        """Return the values in a column.
+
+        Args:
+            name (str): The name of the column, one of `COLUMNS`.
+
+        Returns:
+            list: The values, which must not be modified. Missing values are
+            `None`.
+
+        Raises:
+            ValueError: If there is no such column.
+        """
+        try:
+            column = self._columns[name]
+        except KeyError:
+            raise ValueError('No such column: {0}'.format(name))
+        if name == 'original_track_number':
+            return [None if value < 0 else value for value in column]
+        if name == 'restricted':
+            return [bool(value) for value in column]
+        return column
+
+    def apply(self, name, function):
+        """Replace each value in a column which is not empty with the result
+        of calling a function on it.
+
+        Args:
+            name (str): The name of the column.
+            function (callable): The function, which returns a string. The
+                values of columns which hold shared values (such as
+                ``album``) are interned.
+
+        Raises:
+            ValueError: If there is no such column, or it holds numbers.
+        """
+        if name in _ARRAY_COLUMNS:
+            raise ValueError('Cannot apply a function to {0}'.format(name))
+        column = [function(value) if value else value
+                  for value in self.column(name)]
+        if name in _INTERNED_COLUMNS:
+            column = [_intern(value) for value in column]
+        self._columns[name] = column
+
+    def take(self, indices):
+        """Return a result containing some of the rows of this one.
+
+        Args:
+            indices (iterable): The indices of the rows, in the order in
+                which they are wanted.
+
+        Returns:
+            ColumnarSearchResult: The rows. Its `number_returned` is the
+            number of rows, and its other attributes are those of this
+            result.
+        """
+        indices = list(indices)
+        result = ColumnarSearchResult(
+            self.search_type, len(indices), self.total_matches,
+            self.update_id)
+        for name, column in self._columns.items():
+            if name in _ARRAY_COLUMNS:
+                result._columns[name] = array(
+                    column.typecode, [column[index] for index in indices])
+            else:
+                result._columns[name] = [column[index] for index in indices]
+        return result
+
+    def filter(self, predicate=None, **conditions):
+        """Return the rows which match some conditions.
+
+        Each condition is given as a keyword argument named after a column,
+        whose value is either the value wanted in the column, or a function
+        which is passed the value in the column and returns `True` if it is
+        wanted. For example::
+
+            result.filter(creator='Metallica',
+                          title=lambda title: 'Black' in title)
+
+        Args:
+            predicate (callable, optional): A function which is passed each
+                `ColumnarRow` which matches the conditions, and returns
+                `True` if it is wanted.
+            **conditions: The conditions.
+
+        Returns:
+            ColumnarSearchResult: The rows which match.
+        """
+        indices = range(len(self))
+        for name, wanted in conditions.items():
+            column = self.column(name)
+            if callable(wanted):
+                indices = [index for index in indices
+                           if wanted(column[index])]
+            else:
+                indices = [index for index in indices
+                           if column[index] == wanted]
+        if predicate is not None:
+            indices = [index for index in indices
+                       if predicate(self.row(index))]
+        return self.take(indices)
+
+    def sort(self, *names, **kwargs):
+        """Return the rows sorted by one or more columns.
+
+        Missing values sort after all others.
+
+        Args:
+            *names (str): The names of the columns.
+            reverse (bool, optional): Whether to sort in descending order.
+
+        Returns:
+            ColumnarSearchResult: The sorted rows.
+        """
+        reverse = kwargs.pop('reverse', False)
+        if kwargs:
+            raise TypeError('Unexpected keyword arguments: {0}'.format(
+                ', '.join(kwargs)))
+        columns = [self.column(name) for name in names]
+
+        def sort_key(index):
+            """Return the key to sort a row by."""
+            return tuple((column[index] is None, column[index])
+                         for column in columns)
+
+        return self.take(sorted(range(len(self)), key=sort_key,
+                                reverse=reverse))
+
+    def group_by(self, name):
+        """Group the rows by the value of a column.
+
+        Args:
+            name (str): The name of the column.
+
+        Returns:
+            OrderedDict: A `ColumnarSearchResult` for each value in the
+            column, in the order in which the values first appear.
+        """
+        groups = OrderedDict()
+        for index, value in enumerate(self.column(name)):
+            groups.setdefault(value, []).append(index)
+        return OrderedDict((value, self.take(indices))
+                           for value, indices in groups.items())
+
+    def row(self, index):
+        """Return a row.
+
+        Args:
+            index (int): The index of the row.
+
+        Returns:
+            ColumnarRow: The row.
+        """
+        values = []
+        for name in COLUMNS:
+            value = self._columns[name][index]
+            if name == 'original_track_number':
+                value = None if value < 0 else value
+            elif name == 'restricted':
+                value = bool(value)
+            values.append(value)
+        return ColumnarRow(*values)
+
+    def didl_object(self, index):
+        """Return a row as a `DidlObject`.
+
+        The object has only the attributes held in the columns, and a
+        resource for the first resource of the item, if it had any.
+
+        Args:
+            index (int): The index of the row.
+
+        Returns:
+            DidlObject: An instance of the subclass of `DidlObject` for the
+            row's class.
+        """
+        row = self.row(index)
+        cls = _DIDL_CLASS_TO_CLASS[row.item_class]
+        resources = []
+        if row.uri is not None:
+            resources.append(DidlResource(
+                uri=row.uri, protocol_info=row.protocol_info))
+        content = {}
+        for name in _OPTIONAL_COLUMNS:
+            value = getattr(row, name)
+            if value is not None and name in cls._translation:
+                content[name] = value
+        return cls(title=row.title, parent_id=row.parent_id,
+                   item_id=row.item_id, restricted=row.restricted,
+                   resources=resources, desc=row.desc, **content)
+
+    def __len__(self):
+        return len(self._columns['item_id'])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.row(index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.take(range(*index.indices(len(self))))
+        return self.row(index)
+
+    def __repr__(self):
+        return '{0}({1} rows, search_type=\'{2}\')'.format(
+            self.__class__.__name__, len(self), self.search_type)
+
+    @property
+    def number_returned(self):
+        """int: the number of returned matches."""
+        return self._metadata['number_returned']
+
+    @property
+    def total_matches(self):
+        """int: the number of total matches."""
+        return self._metadata['total_matches']
+
+    @property
+    def update_id(self):
+        """int: the update ID."""
+        return self._metadata['update_id']
+
+    @property
+    def search_type(self):
+        """str: the search type."""
+        return self._metadata['search_type']
@@ -9,14 +9,16 @@ from __future__ import absolute_import
 import sys
 import logging
 
-from .xml import (
-    XML, ns_tag
+from .xml import XML, ns_tag
+from .data_structures import (
+    _DIDL_CLASS_TO_CLASS, DidlObject, DidlResource, decode_didl_element,
+    didl_class_from_texts
 )
-from .data_structures import _DIDL_CLASS_TO_CLASS
 from .exceptions import DIDLMetadataError
 from .compat import urlparse
 from .music_services.data_structures import get_class
 from .music_services.music_service import desc_from_uri
+from .utils import really_unicode
 
 
 _LOG = logging.getLogger(__name__)
@@ -25,13 +27,16 @@ if not (sys.version_info[0] == 2 or sys.version_info[1] == 6):
 _LOG.debug('%s imported', __name__)
 
 
-def from_didl_string(string):
+def from_didl_string(string, lazy=False):
     """Convert a unicode xml string to a list of `DIDLObjects <DidlObject>`.
 
     Args:
         string (str): A unicode string containing an XML representation of one
             or more DIDL-Lite items (in the form  ``'<DIDL-Lite ...>
             ...</DIDL-Lite>'``)
+        lazy (bool): If `True`, items are returned as `LazyDidlObject`
+            handles where possible, which only build the full object when it
+            is needed. Default `False`.
 
     Returns:
         list: A list of one or more instances of `DidlObject` or a subclass
@@ -40,19 +45,20 @@ def from_didl_string(string):
     root = XML.fromstring(string.encode('utf-8'))
     for elt in root:
         if elt.tag.endswith('item') or elt.tag.endswith('container'):
-            item_class = elt.findtext(ns_tag('upnp', 'class'))
-
-            # In case this class has an # specified unofficial
-            # subclass, ignore it by stripping it from item_class
-            if '.#' in item_class:
-                item_class = item_class[:item_class.find('.#')]
-
+            # Decode the element once, to find its class and to build the
+            # item
+            texts, res_elements = decode_didl_element(elt)
+            item_class = didl_class_from_texts(texts)
             try:
                 cls = _DIDL_CLASS_TO_CLASS[item_class]
             except KeyError:
                 raise DIDLMetadataError("Unknown UPnP class: %s" % item_class)
-            item = cls.from_element(elt)
-            item = attempt_datastructure_upgrade(item)
+            if lazy and LazyDidlObject.can_defer(
+                    cls, elt, texts, res_elements):
+                item = LazyDidlObject(cls, elt, texts, res_elements)
+            else:
+                item = cls.from_decoded_element(elt, texts, res_elements)
+                item = attempt_datastructure_upgrade(item)
             items.append(item)
         else:
             # <desc> elements are allowed as an immediate child of <DIDL-Lite>
@@ -68,6 +74,233 @@ def from_didl_string(string):
     return items
 
 
+_TITLE_TAG = ns_tag('dc', 'title')
+_ALBUM_ART_URI_TAG = ns_tag('upnp', 'albumArtURI')
+_ORIGINAL_TRACK_NUMBER_TAG = ns_tag('upnp', 'originalTrackNumber')
+
+# The attributes of a <res> element which `DidlResource.from_element`
+# converts to integers
+_RES_INT_ATTRIBUTES = ('size', 'bitrate', 'sampleFrequency', 'bitsPerSample',
+                       'nrAudioChannels', 'colorDepth')
+
+
+def _is_int(text):
+    """Check whether `int` accepts a string."""
+    try:
+        int(text)
+    except ValueError:
+        return False
+    return True
+
+
+def _lazy_title(handle):
+    """Get the title of a `LazyDidlObject`."""
+    return really_unicode(handle._texts[_TITLE_TAG])
+
+
+def _lazy_item_id(handle):
+    """Get the item id of a `LazyDidlObject`."""
+    return really_unicode(handle._element.get('id'))
+
+
+def _lazy_parent_id(handle):
+    """Get the parent id of a `LazyDidlObject`."""
+    return really_unicode(handle._element.get('parentID'))
+
+
+def _lazy_item_class(handle):
+    """Get the DIDL class of a `LazyDidlObject`."""
+    return handle._cls.item_class
+
+
+def _lazy_resources(handle):
+    """Get the resources of a `LazyDidlObject`."""
+    resources = [DidlResource.from_element(res_elt)
+                 for res_elt in handle._res_elements]
+    # Keep the list, so that changes to it are seen by the full object
+    handle._overrides['resources'] = resources
+    return resources
+
+
+def _lazy_album_art_uri(handle):
+    """Get the album art URI of a `LazyDidlObject`."""
+    if 'album_art_uri' not in handle._cls._translation or \
+            _ALBUM_ART_URI_TAG not in handle._texts:
+        raise AttributeError('album_art_uri')
+    text = handle._texts[_ALBUM_ART_URI_TAG]
+    return '' if text is None else really_unicode(text)
+
+
+# pylint: disable=protected-access
+# attribute name: function which gets it from a LazyDidlObject
+_LAZY_GETTERS = {
+    'title': _lazy_title,
+    'item_id': _lazy_item_id,
+    'parent_id': _lazy_parent_id,
+    'item_class': _lazy_item_class,
+    'resources': _lazy_resources,
+    'album_art_uri': _lazy_album_art_uri,
+}
+
+
+class LazyDidlObject(object):
+    """A handle to a DIDL-Lite item, which is only turned into a `DidlObject`
+    when it is needed.
+
+    Most users of a queue or of browse results only display the title of
+    each item, and play its first resource. A handle provides ``title``,
+    ``item_id``, ``parent_id``, ``item_class``, ``resources`` and
+    ``album_art_uri`` straight from the decoded element. Reading (or setting)
+    any other attribute, or calling a method, builds the full object (the
+    result of `DidlObject.from_element`), which is kept and used from then
+    on.
+
+    Attribute access, comparison, `hash`, `repr` and `isinstance` are passed
+    on to the full object, so a handle can be used in place of it. The object
+    itself is available as `item`.
+
+    Handles are made by `from_didl_string`, when its ``lazy`` argument is
+    `True` (see `soco.config.LAZY_DIDL_RESULTS`).
+    """
+
+    __slots__ = ('_cls', '_element', '_texts', '_res_elements', '_overrides',
+                 '_item')
+
+    def __init__(self, cls, element, texts, res_elements):
+        """
+        Args:
+            cls (type): The `DidlObject` subclass of the item.
+            element (~xml.etree.ElementTree.Element): The <item> or
+                <container> element.
+            texts (dict): The texts of its children, as returned by
+                `decode_didl_element`.
+            res_elements (list): Its <res> children, as returned by
+                `decode_didl_element`.
+        """
+        setter = super(LazyDidlObject, self).__setattr__
+        setter('_cls', cls)
+        setter('_element', element)
+        setter('_texts', texts)
+        setter('_res_elements', res_elements)
+        # attribute name: value, for attributes set before the full object
+        # is built
+        setter('_overrides', {})
+        setter('_item', None)
+
+    @staticmethod
+    def can_defer(item_cls, element, texts, res_elements):
+        """Check whether an item can be represented by a handle.
+
+        Items which `DidlObject.from_element` would reject are built
+        straight away, so that the error is raised by `from_didl_string` as
+        usual, and never by a later attribute access. So are items which
+        `attempt_datastructure_upgrade` would upgrade.
+
+        Args:
+            item_cls (type): The `DidlObject` subclass of the item.
+            element (~xml.etree.ElementTree.Element): The <item> or
+                <container> element.
+            texts (dict): The texts of its children, as returned by
+                `decode_didl_element`.
+            res_elements (list): Its <res> children, as returned by
+                `decode_didl_element`.
+
+        Returns:
+            bool: `True` if a handle can be used.
+        """
+        if _TITLE_TAG not in texts:
+            return False
+        for name in ('id', 'parentID', 'restricted'):
+            if element.get(name) is None:
+                return False
+        for res_element in res_elements:
+            if res_element.get('protocolInfo') is None:
+                return False
+            for name in _RES_INT_ATTRIBUTES:
+                value = res_element.get(name)
+                if value is not None and not _is_int(value):
+                    return False
+        if res_elements and (res_elements[0].text or '').startswith(
+                'x-sonos-http'):
+            return False
+        # The only value of the full object which is converted
+        if _ORIGINAL_TRACK_NUMBER_TAG in texts and \
+                item_cls._tag_to_attribute.get(_ORIGINAL_TRACK_NUMBER_TAG) \
+                == 'original_track_number' and \
+                not _is_int(texts[_ORIGINAL_TRACK_NUMBER_TAG] or ''):
+            return False
+        return True
+
+    @property
+    def item(self):
+        """DidlObject: the full object."""
+        if self._item is None:
+            item = self._cls.from_decoded_element(
+                self._element, self._texts, self._res_elements)
+            for name, value in self._overrides.items():
+                setattr(item, name, value)
+            setter = super(LazyDidlObject, self).__setattr__
+            setter('_item', item)
+            # The element is no longer needed
+            setter('_element', None)
+            setter('_texts', None)
+            setter('_res_elements', None)
+            setter('_overrides', None)
+        return self._item
+
+    @property
+    def is_parsed(self):
+        """bool: whether the full object has been built yet."""
+        return self._item is not None
+
+    # pylint: disable=invalid-name
+    @property
+    def __class__(self):
+        # Makes isinstance see the class of the full object
+        return self._cls
+
+    def __getattr__(self, name):
+        # Only called for attributes which are not found in the usual way.
+        # Special names are never passed on, which keeps copy and pickle
+        # (which probe for them) working
+        if name.startswith('__'):
+            raise AttributeError(name)
+        if self._item is None:
+            if name in self._overrides:
+                return self._overrides[name]
+            getter = _LAZY_GETTERS.get(name)
+            if getter is not None:
+                return getter(self)
+        return getattr(self.item, name)
+
+    def __setattr__(self, name, value):
+        if self._item is None and name in _LAZY_GETTERS:
+            self._overrides[name] = value
+        else:
+            setattr(self.item, name, value)
+
+    def __reduce_ex__(self, protocol):
+        # A handle is pickled (and copied) as the full object
+        return self.item.__reduce_ex__(protocol)
+
+    def __eq__(self, other):
+        return self.item == other
+
+    def __ne__(self, other):
+        return self.item != other
+
+    def __hash__(self):
+        # The same as that of the full object, without building it
+        return hash((self.item_class, self.item_id))
+
+    def __repr__(self):
+        # Formatted as the full object would be, without building it
+        return DidlObject.__repr__(self)
+
+    def __str__(self):
+        return self.__repr__()
+
+
 # Obviously imcomplete, but missing entries will not result in error, but just
 # a logged warning and no upgrade of the data structure
 DIDL_NAME_TO_QUALIFIED_MS_NAME = {
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=not-context-manager
+
+# NOTE: The pylint not-content-manager warning is disabled pending the fix of
+# a bug in pylint: https://github.com/PyCQA/pylint/issues/782
+
+"""Recording of the raw UPnP event traffic received by the event listener.
+
+Recordings make it possible to measure the performance of the event listener
+and parser without any Sonos devices, using the replay tool in
+``dev_tools/replay_events.py``. To record the events received by a program,
+set `EventNotifyHandler.recorder <soco.events.EventNotifyHandler.recorder>`
+before subscribing::
+
+    from soco.events import EventNotifyHandler
+    from soco.event_recording import EventRecorder
+
+    EventNotifyHandler.recorder = EventRecorder('events.rec')
+    ...
+    EventNotifyHandler.recorder.close()
+
+A recording is a gzip compressed file, starting with `MAGIC`, followed by
+one record for each ``NOTIFY`` request. Each record is a header packed with
+`RECORD_HEADER` (the time the request was received, as a double, and the
+lengths of the HTTP headers and of the body, as unsigned 32 bit integers),
+followed by the HTTP headers (encoded with utf-8, as ``Name: value`` lines
+separated by ``\\r\\n``) and the body.
+"""
+
+from __future__ import unicode_literals
+
+import gzip
+import struct
+import threading
+from contextlib import closing
+
+#: The bytes at the start of every recording.
+MAGIC = b'SoCoEvents1\n'
+
+#: The header of each record.
+RECORD_HEADER = struct.Struct('>dII')
+
+
+class EventRecorder(object):
+    """Writes the ``NOTIFY`` requests received by the event listener to a
+    recording.
+
+    Requests are handled on several threads, so writing is serialised with a
+    lock.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): The path of the recording, which is overwritten if it
+                exists.
+        """
+        super(EventRecorder, self).__init__()
+        self.path = path
+        #: `int`: The number of requests recorded.
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, 'wb')
+        self._file.write(MAGIC)
+
+    def record(self, timestamp, headers, body):
+        """Record a request.
+
+        Args:
+            timestamp (float): The time at which the request was received.
+            headers (list): The HTTP headers of the request, as a list of
+                ``(name, value)`` tuples.
+            body (bytes): The body of the request.
+        """
+        header_bytes = '\r\n'.join(
+            '{0}: {1}'.format(name, value) for name, value in headers
+        ).encode('utf-8')
+        record = RECORD_HEADER.pack(
+            timestamp, len(header_bytes), len(body)) + header_bytes + body
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(record)
+            self.count += 1
+
+    def close(self):
+        """Finish the recording. Requests received after this are not
+        recorded."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_recording(path):
+    """Read the requests in a recording.
+
+    Args:
+        path (str): The path of the recording.
+
+    Yields:
+        tuple: A ``(timestamp, headers, body)`` tuple for each request, as
+        passed to `EventRecorder.record`.
+
+    Raises:
+        ValueError: If the file is not a recording, or is truncated.
+    """
+    # GzipFile is not a context manager in Python 2.6
+    with closing(gzip.open(path, 'rb')) as recording:
+        if recording.read(len(MAGIC)) != MAGIC:
+            raise ValueError('{0} is not an event recording'.format(path))
+        while True:
+            record_header = recording.read(RECORD_HEADER.size)
+            if not record_header:
+                return
+            if len(record_header) < RECORD_HEADER.size:
+                raise ValueError('{0} is truncated'.format(path))
+            timestamp, headers_length, body_length = RECORD_HEADER.unpack(
+                record_header)
+            header_bytes = recording.read(headers_length)
+            body = recording.read(body_length)
+            if len(header_bytes) < headers_length or \
+                    len(body) < body_length:
+                raise ValueError('{0} is truncated'.format(path))
+            headers = []
+            if header_bytes:
+                for line in header_bytes.decode('utf-8').split('\r\n'):
+                    name, _, value = line.partition(': ')
+                    headers.append((name, value))
+            yield timestamp, headers, body
@@ -9,26 +9,236 @@
 from __future__ import unicode_literals
 
 import atexit
+import heapq
+import itertools
+import json
 import logging
+import multiprocessing
+import os
+import random
 import socket
 import threading
+import tempfile
 import time
 import weakref
+from collections import deque
 
 import requests
 
 from . import config
 from .compat import (
-    Queue, BaseHTTPRequestHandler, URLError, socketserver, urlopen
+    Empty, Queue, BaseHTTPRequestHandler, URLError, socketserver, urlopen
 )
 from .data_structures_entry import from_didl_string
 from .exceptions import SoCoException
-from .utils import camel_to_underscore
+from .utils import camel_to_underscore, run_concurrently
 from .xml import XML
 
 log = logging.getLogger(__name__)  # pylint: disable=C0103
 
 
+#: A cache of evented variable names, keyed by the XML tag they come from.
+#: The set of tags is small and fixed, so there is no need to bound it.
+_VARIABLE_NAMES = {}
+
+
+def _variable_name(tag):
+    """Convert an XML tag to the name of an evented variable.
+
+    Any namespace is removed, and the name is un-camel cased, eg
+    ``'{urn:schemas-upnp-org:metadata-1-0/AVT/}TransportState'`` becomes
+    ``'transport_state'``.
+    """
+    try:
+        return _VARIABLE_NAMES[tag]
+    except KeyError:
+        name = tag
+        if name.startswith('{'):
+            name = name.split('}', 1)[1]
+        name = _VARIABLE_NAMES[tag] = camel_to_underscore(name)
+        return name
+
+
+class LazyDidlMetadata(object):
+    """DIDL metadata from an event, which is parsed on first use.
+
+    Parsing DIDL metadata is by far the most expensive part of handling an
+    AVTransport event, and most consumers of an event only look at a few of
+    its variables. Instances of this class hold the DIDL-Lite string and
+    only turn it into a `DidlObject` (with `from_didl_string`) when one of
+    its attributes is first accessed. The result is cached.
+
+    Attribute access, comparison, `hash`, `str` and `isinstance` are passed
+    on to the `DidlObject`, so an instance can be used in place of it. The
+    object itself is available as `item`. If the metadata cannot be parsed,
+    accessing `item` raises the error, but other attributes raise
+    `AttributeError`, as they would for anything else without them.
+    """
+
+    def __init__(self, didl_string):
+        """
+        Args:
+            didl_string (str): The DIDL-Lite string.
+        """
+        self.didl_string = didl_string
+        self._item = None
+
+    @property
+    def item(self):
+        """DidlObject: the parsed metadata."""
+        if self._item is None:
+            self._item = from_didl_string(self.didl_string)[0]
+        return self._item
+
+    @property
+    def is_parsed(self):
+        """bool: whether the metadata has been parsed yet."""
+        return self._item is not None
+
+    def _parsed_item(self, name):
+        """Get `item`, raising `AttributeError` if it cannot be parsed.
+
+        Args:
+            name (str): The name of the attribute being looked up.
+        """
+        try:
+            return self.item
+        # The metadata comes from the device, and any error in it is reported
+        # in the same way
+        except Exception as error:  # pylint: disable=broad-except
+            raise AttributeError(
+                '{0} (the metadata could not be parsed: {1})'.format(
+                    name, error))
+
+    # pylint: disable=invalid-name
+    @property
+    def __class__(self):
+        # Makes isinstance see the class of the parsed metadata. Checks
+        # against LazyDidlMetadata itself still succeed without parsing, since
+        # the real type is tried first
+        return type(self._parsed_item('__class__'))
+
+    def __getattr__(self, name):
+        # Only called for attributes which are not found in the usual way.
+        # Private and special names are never passed on, which keeps copy
+        # and pickle (which probe for them before __init__ has run) working
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._parsed_item(name), name)
+
+    def __reduce_ex__(self, protocol):
+        # Pickled (eg to pass it between processes) with the parsed
+        # metadata, if there is any. The default would compare the real
+        # type with __class__
+        return LazyDidlMetadata, (self.didl_string,), {'_item': self._item}
+
+    def __eq__(self, other):
+        if isinstance(other, LazyDidlMetadata):
+            # Comparing the strings avoids parsing either of them
+            return self.didl_string == other.didl_string
+        return self.item == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.item)
+
+    def __repr__(self):
+        if self._item is None:
+            return '<{0} (not yet parsed) at {1}>'.format(
+                type(self).__name__, hex(id(self)))
+        return '<{0} of {1!r}>'.format(type(self).__name__, self._item)
+
+    def __str__(self):
+        return str(self.item)
+
+
+class _LastChangeParser(object):
+    """An `XMLParser` target which collects the variables in a LastChange
+    event as it is parsed.
+
+    The event is never built into a tree. Each variable is dealt with when
+    its end tag is reached, and then discarded.
+    """
+
+    def __init__(self):
+        self.result = {}
+        self._depth = 0
+        self._tag = None
+        self._attrib = None
+        self._text = []
+
+    def start(self, tag, attrib):
+        """Handle a start tag."""
+        self._depth += 1
+        # The variables are at depth 3: Event > InstanceID > Variable. We
+        # assume there is only one InstanceID tag. This is true for Sonos, as
+        # far as we know.
+        if self._depth == 3:
+            self._tag = tag
+            self._attrib = attrib
+            del self._text[:]
+
+    def data(self, data):
+        """Handle text."""
+        if self._depth == 3:
+            self._text.append(data)
+
+    def end(self, tag):  # pylint: disable=unused-argument
+        """Handle an end tag."""
+        if self._depth == 3:
+            self._add_variable()
+        self._depth -= 1
+
+    def close(self):
+        """Return the variables."""
+        return self.result
+
+    def _add_variable(self):
+        """Add the variable which has just been parsed to the result."""
+        result = self.result
+        name = _variable_name(self._tag)
+        # Now extract the relevant value for the variable. The UPnP specs
+        # suggest that the value of any variable evented via a LastChange
+        # Event will be in the 'val' attribute, but audio related variables
+        # may also have a 'channel' attribute. In addition, it seems that
+        # Sonos sometimes uses a text value instead: see
+        # http://forums.sonos.com/showthread.php?t=34663
+        value = self._attrib.get('val')
+        if value is None:
+            value = ''.join(self._text) or None
+        # If DIDL metadata is returned, arrange for it to be converted to a
+        # music library data structure when it is needed
+        if value is not None and value.startswith('<DIDL-Lite'):
+            value = LazyDidlMetadata(value)
+        channel = self._attrib.get('channel')
+        if channel is not None:
+            if result.get(name) is None:
+                result[name] = {}
+            result[name][channel] = value
+        else:
+            result[name] = value
+
+
+def parse_last_change(last_change):
+    """Parse the value of a LastChange variable.
+
+    For details on LastChange events, see
+    http://upnp.org/specs/av/UPnP-av-RenderingControl-v1-Service.pdf
+    and http://upnp.org/specs/av/UPnP-av-AVTransport-v1-Service.pdf
+
+    Args:
+        last_change (str): The value, which is itself an XML document.
+
+    Returns:
+        dict: The evented variables, as described in `parse_event_xml`.
+    """
+    parser = XML.XMLParser(target=_LastChangeParser())
+    parser.feed(last_change.encode('utf-8'))
+    return parser.close()
+
+
 def parse_event_xml(xml_event):
     """Parse the body of a UPnP event.
 
@@ -44,8 +254,9 @@ def parse_event_xml(xml_event):
             * a dict (eg when the volume changes, the value will itself be a
               dict containing the volume for each channel:
               :code:`{'Volume': {'LF': '100', 'RF': '100', 'Master': '36'}}`)
-            * an instance of a `DidlObject` subclass (eg if it represents
-              track metadata).
+            * a `LazyDidlMetadata` (eg if it represents track metadata),
+              which behaves like the `DidlObject` it describes, but only
+              parses the metadata when it is first used.
 
     Example:
 
@@ -91,56 +302,15 @@ def parse_event_xml(xml_event):
     # uses this namespace
     properties = tree.findall(
         '{urn:schemas-upnp-org:event-1-0}property')
-    for prop in properties:  # pylint: disable=too-many-nested-blocks
+    for prop in properties:
         for variable in prop:
-            # Special handling for a LastChange event specially. For details on
-            # LastChange events, see
-            # http://upnp.org/specs/av/UPnP-av-RenderingControl-v1-Service.pdf
-            # and http://upnp.org/specs/av/UPnP-av-AVTransport-v1-Service.pdf
+            # Special handling for a LastChange event specially. The
+            # variables it contains are parsed in a single pass, without
+            # building a tree
             if variable.tag == "LastChange":
-                last_change_tree = XML.fromstring(
-                    variable.text.encode('utf-8'))
-                # We assume there is only one InstanceID tag. This is true for
-                # Sonos, as far as we know.
-                # InstanceID can be in one of two namespaces, depending on
-                # whether we are looking at an avTransport event or a
-                # renderingControl event, so we need to look for both
-                instance = last_change_tree.find(
-                    "{urn:schemas-upnp-org:metadata-1-0/AVT/}InstanceID")
-                if instance is None:
-                    instance = last_change_tree.find(
-                        "{urn:schemas-upnp-org:metadata-1-0/RCS/}InstanceID")
-                # Look at each variable within the LastChange event
-                for last_change_var in instance:
-                    tag = last_change_var.tag
-                    # Remove any namespaces from the tags
-                    if tag.startswith('{'):
-                        tag = tag.split('}', 1)[1]
-                    # Un-camel case it
-                    tag = camel_to_underscore(tag)
-                    # Now extract the relevant value for the variable.
-                    # The UPnP specs suggest that the value of any variable
-                    # evented via a LastChange Event will be in the 'val'
-                    # attribute, but audio related variables may also have a
-                    # 'channel' attribute. In addition, it seems that Sonos
-                    # sometimes uses a text value instead: see
-                    # http://forums.sonos.com/showthread.php?t=34663
-                    value = last_change_var.get('val')
-                    if value is None:
-                        value = last_change_var.text
-                    # If DIDL metadata is returned, convert it to a music
-                    # library data structure
-                    if value.startswith('<DIDL-Lite'):
-                        value = from_didl_string(value)[0]
-                    channel = last_change_var.get('channel')
-                    if channel is not None:
-                        if result.get(tag) is None:
-                            result[tag] = {}
-                        result[tag][channel] = value
-                    else:
-                        result[tag] = value
+                result.update(parse_last_change(variable.text))
             else:
-                result[camel_to_underscore(variable.tag)] = variable.text
+                result[_variable_name(variable.tag)] = variable.text
     return result
 
 
@@ -199,6 +369,161 @@ class Event(object):
         raise TypeError('Event object does not support attribute assignment')
 
 
+class ResyncEvent(Event):
+    """An event signalling that a subscription has been re-established.
+
+    When an automatically renewed subscription cannot be renewed (for example
+    because the speaker has rebooted), a new subscription is made in its place
+    and one of these events is put on the subscription's queue. Events may
+    have been missed in the meantime, so consumers should refresh any state
+    they hold for the service.
+
+    One is also put on the queue of a subscription restored from the
+    `SubscriptionJournal` by renewing its old sid, since events will have been
+    missed while the program was not running. In that case ``old_sid`` is the
+    same as ``sid``.
+
+    The ``resynced`` variable is always `True`, and ``old_sid`` holds the
+    subscription id which has been replaced.
+    """
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, sid, service, timestamp, old_sid):
+        super(ResyncEvent, self).__init__(
+            sid, None, service, timestamp,
+            {'resynced': True, 'old_sid': old_sid})
+
+
+#: The result of `EventSequenceTracker.check` for an event in sequence.
+SEQ_OK = 'ok'
+#: The result of `EventSequenceTracker.check` when events have been missed.
+SEQ_GAP = 'gap'
+#: The result of `EventSequenceTracker.check` for a repeated or stale event.
+SEQ_DUPLICATE = 'duplicate'
+
+# The number of recent sequence numbers remembered for each sid, to tell
+# events which arrive late from repeated ones
+_SEQ_WINDOW = 64
+
+
+class EventSequenceTracker(object):
+    """Checks the sequence numbers of the events received for each sid.
+
+    The UPnP spec requires each event for a subscription to carry a ``SEQ``
+    header, which starts at 0 and increases by one with each event (wrapping
+    from 4294967295 to 1). A missing number means that an event has been lost,
+    and a number which has been seen before means that an event has been
+    delivered twice.
+
+    Events are handled in separate threads, so they are not always checked
+    in the order in which they were sent. An event which is checked after a
+    later one is reported as a gap when the later one is checked, but is
+    still accepted when it arrives, if it is one of the last `_SEQ_WINDOW`
+    numbers. Only numbers which have actually been seen (or are too old to
+    tell) are duplicates.
+
+    The number of gaps and duplicates found can be read from the `gaps` and
+    `duplicates` attributes, or per sid from `stats`.
+    """
+
+    def __init__(self):
+        super(EventSequenceTracker, self).__init__()
+        #: `int`: The total number of gaps found.
+        self.gaps = 0
+        #: `int`: The total number of duplicate events found.
+        self.duplicates = 0
+        self._lock = threading.Lock()
+        # sid -> [highest seq, gaps, duplicates, recent seqs]
+        self._sids = {}
+
+    def check(self, sid, seq):
+        """Record an event's sequence number, and check it against the last.
+
+        Args:
+            sid (str): The subscription id.
+            seq (str): The event sequence number.
+
+        Returns:
+            str: `SEQ_OK` if the event is the next one expected, or one
+            which arrives after later ones, `SEQ_GAP` if one or more events
+            have been missed before it, or `SEQ_DUPLICATE` if it has been
+            seen before.
+        """
+        seq = int(seq)
+        with self._lock:
+            record = self._sids.get(sid)
+            if record is None:
+                # The first event for a subscription should have seq 0
+                record = self._sids[sid] = [-1, 0, 0, deque()]
+            last, recent = record[0], record[3]
+            if seq in recent:
+                record[2] += 1
+                self.duplicates += 1
+                return SEQ_DUPLICATE
+            if last is None:
+                # Resumed (see `resume`), so accept whatever comes next
+                result = SEQ_OK
+                record[0] = seq
+            else:
+                expected = 1 if last == 4294967295 else last + 1
+                ahead = (seq - last) % 4294967296
+                if seq == expected:
+                    result = SEQ_OK
+                    record[0] = seq
+                elif last >= 0 and (ahead == 0 or ahead > 2147483647):
+                    # Behind the highest one seen (allowing for wrapping)
+                    if 4294967296 - ahead >= _SEQ_WINDOW:
+                        # Too old to tell whether it has been seen
+                        record[2] += 1
+                        self.duplicates += 1
+                        return SEQ_DUPLICATE
+                    # It was overtaken by a later event
+                    result = SEQ_OK
+                else:
+                    result = SEQ_GAP
+                    record[1] += 1
+                    self.gaps += 1
+                    record[0] = seq
+            recent.append(seq)
+            if len(recent) > _SEQ_WINDOW:
+                recent.popleft()
+            return result
+
+    def resume(self, sid):
+        """Start tracking a sid part way through its sequence.
+
+        The next event for the sid is accepted whatever its sequence number.
+        This is used for subscriptions restored from a previous run.
+
+        Args:
+            sid (str): The subscription id.
+        """
+        with self._lock:
+            self._sids[sid] = [None, 0, 0, deque()]
+
+    def forget(self, sid):
+        """Stop tracking a sid.
+
+        Args:
+            sid (str): The subscription id.
+        """
+        with self._lock:
+            self._sids.pop(sid, None)
+
+    def stats(self, sid):
+        """Return the counters for a sid.
+
+        Args:
+            sid (str): The subscription id.
+
+        Returns:
+            dict: A dict with the keys ``'gaps'`` and ``'duplicates'``.
+        """
+        with self._lock:
+            _, gaps, duplicates, _ = self._sids.get(sid, (None, 0, 0, None))
+        return {'gaps': gaps, 'duplicates': duplicates}
+
+
 class EventServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
     """A TCP server which handles each new request in a new thread."""
     allow_reuse_address = True
@@ -207,6 +532,12 @@ class EventServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
 class EventNotifyHandler(BaseHTTPRequestHandler):
     """Handles HTTP ``NOTIFY`` Verbs sent to the listener server."""
 
+    #: If not `None`, an object (usually an
+    #: `~soco.event_recording.EventRecorder`) whose ``record`` method is
+    #: called with the time of receipt, the headers (as a list of
+    #: ``(name, value)`` tuples) and the body of each request.
+    recorder = None
+
     def do_NOTIFY(self):  # pylint: disable=invalid-name
         """Serve a ``NOTIFY`` request.
 
@@ -221,32 +552,69 @@ class EventNotifyHandler(BaseHTTPRequestHandler):
         sid = headers['sid']  # Event Subscription Identifier
         content_length = int(headers['content-length'])
         content = self.rfile.read(content_length)
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.record(timestamp, list(self.headers.items()), content)
         # find the relevant service from the sid
         with _sid_to_service_lock:
             service = _sid_to_service.get(sid)
+        sequence = None
         # It might have been removed by another thread
         if service:
             log.info(
                 "Event %s received for %s service on thread %s at %s", seq,
                 service.service_id, threading.current_thread(), timestamp)
             log.debug("Event content: %s", content)
-            variables = parse_event_xml(content)
-            # Build the Event object
-            event = Event(sid, seq, service, timestamp, variables)
-            # pass the event details on to the service so it can update its
-            # cache.
-            # pylint: disable=protected-access
-            service._update_cache_on_event(event)
-            # Find the right queue, and put the event on it
-            with _sid_to_event_queue_lock:
-                try:
-                    _sid_to_event_queue[sid].put(event)
-                except KeyError:  # The key have been deleted in another thread
-                    pass
+            sequence = sequence_tracker.check(sid, seq)
+            if sequence == SEQ_DUPLICATE:
+                log.info("Dropping duplicate event %s for %s", seq, sid)
+            else:
+                if sequence == SEQ_GAP:
+                    # pylint: disable=protected-access
+                    service._on_events_lost(sid)
+                variables = parse_event_xml(content)
+                # Build the Event object
+                event = Event(sid, seq, service, timestamp, variables)
+                self._dispatch(service, event)
         else:
             log.info("No service registered for %s", sid)
         self.send_response(200)
         self.end_headers()
+        # If events have been lost, ask the service for the current values of
+        # its variables, now that the speaker is no longer waiting for us
+        if sequence == SEQ_GAP:
+            self._refresh(service, sid, seq)
+
+    @classmethod
+    def _refresh(cls, service, sid, seq):
+        """Fetch and dispatch the current values of a service's variables,
+        after events have been missed."""
+        log.warning("Event(s) missing before %s for %s", seq, sid)
+        # pylint: disable=protected-access
+        try:
+            variables = service._refresh_evented_variables()
+        except Exception:  # pylint: disable=broad-except
+            log.exception("Unable to refresh state for %s", sid)
+            variables = None
+        if variables is not None:
+            # The values were not sent in an event, so they have no sequence
+            # number
+            cls._dispatch(
+                service, Event(sid, None, service, time.time(), variables))
+
+    @staticmethod
+    def _dispatch(service, event):
+        """Pass an event to its service and put it on its queue."""
+        # pass the event details on to the service so it can update its
+        # cache.
+        # pylint: disable=protected-access
+        service._update_cache_on_event(event)
+        # Find the right queue, and put the event on it
+        with _sid_to_event_queue_lock:
+            try:
+                _sid_to_event_queue[event.sid].put(event)
+            except KeyError:  # The key have been deleted in another thread
+                pass
 
     def log_message(self, fmt, *args):  # pylint: disable=arguments-differ
         # Divert standard webserver logging to the debug log
@@ -282,12 +650,244 @@ class EventServerThread(threading.Thread):
             listener.handle_request()
 
 
+class ShardServer(EventServer):
+    """An `EventServer` which shares its port with other processes.
+
+    The socket is bound with ``SO_REUSEPORT``, so that the kernel spreads
+    incoming connections over all the processes listening on the port.
+    """
+    # Wake up regularly to check whether the server should stop
+    timeout = 0.5
+
+    def server_bind(self):
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        socketserver.TCPServer.server_bind(self)
+
+
+class ShardNotifyHandler(BaseHTTPRequestHandler):
+    """Handles ``NOTIFY`` requests in a listener shard process.
+
+    The event is parsed here, and the result is passed to the main process,
+    which does everything else (see `EventListener`).
+    """
+
+    def do_NOTIFY(self):  # pylint: disable=invalid-name
+        """Serve a ``NOTIFY`` request."""
+        timestamp = time.time()
+        headers = requests.structures.CaseInsensitiveDict(self.headers)
+        seq = headers['seq']
+        sid = headers['sid']
+        content = self.rfile.read(int(headers['content-length']))
+        # The registry is shared with the main process. Events for sids which
+        # are not registered are ignored, as they are by EventNotifyHandler
+        if sid in self.server.registry:
+            variables = parse_event_xml(content)
+            # Parse any metadata here, rather than in the main process
+            for value in variables.values():
+                if isinstance(value, LazyDidlMetadata):
+                    value.item  # pylint: disable=pointless-statement
+            self.server.event_queue.put((sid, seq, timestamp, variables))
+        else:
+            log.info("No service registered for %s", sid)
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, fmt, *args):  # pylint: disable=arguments-differ
+        # Divert standard webserver logging to the debug log
+        log.debug(fmt, *args)
+
+
+def _run_shard(address, registry, event_queue, stop_flag):
+    """Run a listener shard. This is the target of each shard process.
+
+    Args:
+        address (tuple): The (ip, port) address on which to listen.
+        registry (dict): The shared registry of sids.
+        event_queue (multiprocessing.Queue): The queue on which to pass
+            ``(sid, seq, timestamp, variables)`` tuples to the main process.
+        stop_flag (multiprocessing.Event): Set when the shard should stop.
+    """
+    server = ShardServer(address, ShardNotifyHandler)
+    server.registry = registry
+    server.event_queue = event_queue
+    log.info("Event listener shard running on %s in process %s",
+             server.server_address, os.getpid())
+    while not stop_flag.is_set():
+        server.handle_request()
+    server.server_close()
+
+
+# The longest time, in seconds, for which an event from a listener shard is
+# held back while the events before it are awaited
+_REORDER_DELAY = 0.2
+
+
+def _next_seq(seq):
+    """Return the sequence number which follows another."""
+    return 1 if seq == 4294967295 else seq + 1
+
+
+class _EventReorderer(object):
+    """Puts the events passed on by the listener shards back into sequence
+    order.
+
+    Each ``NOTIFY`` request is handled by whichever shard process accepts
+    the connection, so the events of one subscription can reach the main
+    process out of order. An event which is ahead of the next one expected is
+    held back for up to `_REORDER_DELAY` seconds, for the missing ones to
+    arrive. Events are ``(sid, seq, timestamp, variables)`` tuples.
+    """
+
+    def __init__(self, delay=_REORDER_DELAY):
+        super(_EventReorderer, self).__init__()
+        self.delay = delay
+        # sid -> the next sequence number expected
+        self._next = {}
+        # sid -> {seq: (deadline, event)}
+        self._held = {}
+
+    def add(self, event, now):
+        """Add an event.
+
+        Args:
+            event (tuple): The event.
+            now (float): The current time.
+
+        Returns:
+            list: The events which can now be delivered, in order.
+        """
+        sid, seq = event[0], int(event[1])
+        expected = self._next.get(sid, 0)
+        ahead = (seq - expected) % 4294967296
+        if 0 < ahead <= 2147483647:
+            # Wait for the events before it
+            self._held.setdefault(sid, {})[seq] = (now + self.delay, event)
+            return []
+        ready = [event]
+        if ahead == 0:
+            # The one expected, which may let held events through
+            held = self._held.get(sid, {})
+            seq = _next_seq(seq)
+            while seq in held:
+                ready.append(held.pop(seq)[1])
+                seq = _next_seq(seq)
+            self._next[sid] = seq
+            if not held:
+                self._held.pop(sid, None)
+        # Otherwise it is a late or repeated event, which is passed on for
+        # the sequence tracker to deal with
+        return ready
+
+    def expire(self, now):
+        """Give up waiting for missing events, where events have been held
+        back for too long.
+
+        Args:
+            now (float): The current time.
+
+        Returns:
+            list: The events which can now be delivered, in order.
+        """
+        ready = []
+        for sid, held in list(self._held.items()):
+            if min(deadline for deadline, _ in held.values()) > now:
+                continue
+            expected = self._next.get(sid, 0)
+            seqs = sorted(held, key=lambda seq: (seq - expected) % 4294967296)
+            ready.extend(held[seq][1] for seq in seqs)
+            self._next[sid] = _next_seq(seqs[-1])
+            del self._held[sid]
+        return ready
+
+    def flush(self):
+        """Return all the held events, in order."""
+        return self.expire(float('inf'))
+
+    def next_deadline(self):
+        """Return the time at which `expire` should next be called, or
+        `None` if no events are held."""
+        deadlines = [deadline for held in self._held.values()
+                     for deadline, _ in held.values()]
+        return min(deadlines) if deadlines else None
+
+    def forget(self, sid):
+        """Stop tracking a sid."""
+        self._next.pop(sid, None)
+        self._held.pop(sid, None)
+
+
+def _deliver_shard_event(reorderer, event):
+    """Dispatch an event from a listener shard."""
+    sid, seq, timestamp, variables = event
+    with _sid_to_service_lock:
+        service = _sid_to_service.get(sid)
+    # It might have been removed since the event was received
+    if service is None:
+        log.info("No service registered for %s", sid)
+        reorderer.forget(sid)
+        return
+    sequence = sequence_tracker.check(sid, seq)
+    if sequence == SEQ_DUPLICATE:
+        log.info("Dropping duplicate event %s for %s", seq, sid)
+        return
+    try:
+        # pylint: disable=protected-access
+        if sequence == SEQ_GAP:
+            service._on_events_lost(sid)
+        EventNotifyHandler._dispatch(
+            service, Event(sid, seq, service, timestamp, variables))
+        if sequence == SEQ_GAP:
+            EventNotifyHandler._refresh(service, sid, seq)
+    except Exception:  # pylint: disable=broad-except
+        log.exception("Error delivering event %s for %s", seq, sid)
+
+
+def _deliver_shard_events(event_queue):
+    """Dispatch the events parsed by the listener shards, in sequence order
+    (see `_EventReorderer`), until `None` is received. This runs in a thread
+    in the main process.
+
+    Args:
+        event_queue (multiprocessing.Queue): The queue on which the shards
+            put ``(sid, seq, timestamp, variables)`` tuples.
+    """
+    reorderer = _EventReorderer()
+    while True:
+        deadline = reorderer.next_deadline()
+        try:
+            if deadline is None:
+                item = event_queue.get()
+            else:
+                item = event_queue.get(
+                    timeout=max(0, deadline - time.time()))
+        except Empty:
+            ready = []
+        else:
+            if item is None:
+                for event in reorderer.flush():
+                    _deliver_shard_event(reorderer, event)
+                return
+            ready = reorderer.add(item, time.time())
+        ready.extend(reorderer.expire(time.time()))
+        for event in ready:
+            _deliver_shard_event(reorderer, event)
+
+
 class EventListener(object):
     """The Event Listener.
 
     Runs an http server in a thread which is an endpoint for ``NOTIFY``
     requests from Sonos devices.
 
+    If `config.EVENT_LISTENER_PROCESSES` is greater than 1, the server runs
+    in that number of separate processes instead, all listening on the same
+    port (using ``SO_REUSEPORT``, which must be supported by the operating
+    system), so that the parsing of events is spread over several cores. The
+    sids of the subscriptions are shared with the processes through a
+    registry held by a :class:`multiprocessing.Manager`, and the parsed
+    events are passed back over a :class:`multiprocessing.Queue` to a thread
+    in this process, which puts them on the subscriptions' queues. Note that
+    any other process run by the same user can also listen on the port.
     """
 
     def __init__(self):
@@ -296,6 +896,12 @@ class EventListener(object):
         self.is_running = False
         self._start_lock = threading.Lock()
         self._listener_thread = None
+        # Only used if the listener is sharded over several processes
+        self._manager = None
+        self._registry = None
+        self._shard_queue = None
+        self._shard_stop_flag = None
+        self._shards = []
         #: `tuple`: The address (ip, port) on which the server is
         #: configured to listen.
         # Empty for the moment. (It is set in `start`)
@@ -333,16 +939,90 @@ class EventListener(object):
                     ip_address = temp_sock.getsockname()[0]
                     temp_sock.close()
 
-                # Start the event listener server in a separate thread.
                 self.address = (ip_address, config.EVENT_LISTENER_PORT)
-                self._listener_thread = EventServerThread(self.address)
-                self._listener_thread.daemon = True
-                self._listener_thread.start()
+                if config.EVENT_LISTENER_PROCESSES > 1:
+                    self._start_shards(config.EVENT_LISTENER_PROCESSES)
+                else:
+                    # Start the event listener server in a separate thread.
+                    self._listener_thread = EventServerThread(self.address)
+                    self._listener_thread.daemon = True
+                    self._listener_thread.start()
                 self.is_running = True
                 log.info("Event listener started")
 
+    def _start_shards(self, processes):
+        """Start the listener shard processes, and the thread which
+        dispatches the events they parse."""
+        if not hasattr(socket, 'SO_REUSEPORT'):
+            raise SoCoException(
+                'Sharding the event listener requires SO_REUSEPORT, which '
+                'this platform does not support')
+        self._manager = multiprocessing.Manager()
+        self._registry = self._manager.dict()
+        # Register any sids which are already subscribed
+        with _sid_to_service_lock:
+            for sid in list(_sid_to_service.keys()):
+                self._registry[sid] = True
+        self._shard_queue = multiprocessing.Queue()
+        self._shard_stop_flag = multiprocessing.Event()
+        self._shards = []
+        for _ in range(processes):
+            shard = multiprocessing.Process(
+                target=_run_shard, args=(
+                    self.address, self._registry, self._shard_queue,
+                    self._shard_stop_flag))
+            shard.daemon = True
+            shard.start()
+            self._shards.append(shard)
+        self._listener_thread = threading.Thread(
+            target=_deliver_shard_events, args=(self._shard_queue,))
+        self._listener_thread.daemon = True
+        self._listener_thread.start()
+
+    def _stop_shards(self):
+        """Stop the listener shard processes and the dispatching thread."""
+        self._shard_stop_flag.set()
+        for shard in self._shards:
+            # Each shard checks the flag at least every ShardServer.timeout
+            shard.join(5)
+            if shard.is_alive():
+                shard.terminate()
+        self._shards = []
+        self._shard_queue.put(None)
+        self._listener_thread.join()
+        self._manager.shutdown()
+        self._manager = self._registry = None
+
+    def register_sid(self, sid):
+        """Tell the listener that events for a sid are expected.
+
+        This is only needed when the listener is sharded over several
+        processes, and is called by `Subscription`.
+
+        Args:
+            sid (str): The subscription id.
+        """
+        registry = self._registry
+        if registry is not None:
+            registry[sid] = True
+
+    def unregister_sid(self, sid):
+        """Tell the listener that events for a sid are no longer expected.
+
+        Args:
+            sid (str): The subscription id.
+        """
+        registry = self._registry
+        if registry is not None:
+            registry.pop(sid, None)
+
     def stop(self):
         """Stop the event listener."""
+        if self._shards:
+            self._stop_shards()
+            self.is_running = False
+            log.info("Event listener stopped")
+            return
         # Signal the thread to stop before handling the next request
         self._listener_thread.stop_flag.set()
         # Send a dummy request in case the http server is currently listening
@@ -359,19 +1039,412 @@ class EventListener(object):
         log.info("Event listener stopped")
 
 
+class RenewalScheduler(object):
+    """Runs periodic subscription renewals from a single thread.
+
+    Pending renewals are kept in a heap ordered by due time. A single daemon
+    thread waits for the earliest one to fall due and hands it to a small pool
+    of worker threads (see `config.EVENT_RENEWAL_WORKERS`), which make the
+    actual network request. Each scheduled item costs one heap entry, so many
+    auto-renewing subscriptions no longer need one sleeping thread each.
+
+    There is normally no need to use this class directly: subscriptions made
+    with ``auto_renew=True`` are scheduled on the module level
+    `renewal_scheduler` instance.
+    """
+
+    def __init__(self):
+        super(RenewalScheduler, self).__init__()
+        # Heap of [due_time, sequence, key, callback] entries. A cancelled
+        # entry has its callback set to None and is discarded when it
+        # reaches the top of the heap.
+        self._heap = []
+        # The current (live) heap entry for each key
+        self._entries = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._work_queue = Queue()
+        self._threads = []
+
+    def schedule(self, key, delay, callback):
+        """Schedule ``callback`` to be called after ``delay`` seconds.
+
+        Any call already scheduled for ``key`` is replaced. The callback is
+        called without arguments in one of the worker threads. If it returns a
+        number, it is scheduled again after that many seconds. If it returns
+        `None`, it is not.
+
+        Args:
+            key (object): A hashable object identifying the scheduled call,
+                typically a `Subscription`.
+            delay (float): The number of seconds to wait.
+            callback (callable): The function to call.
+        """
+        with self._condition:
+            if not self._threads:
+                self._start_threads()
+            self._cancel(key)
+            entry = [time.time() + delay, next(self._sequence), key, callback]
+            self._entries[key] = entry
+            heapq.heappush(self._heap, entry)
+            # Cancelled entries are normally discarded as they come due, but
+            # do not let them accumulate indefinitely
+            if len(self._heap) > 2 * len(self._entries) + 64:
+                self._heap = [e for e in self._heap if e[3] is not None]
+                heapq.heapify(self._heap)
+            self._condition.notify()
+
+    def cancel(self, key):
+        """Cancel any call scheduled for ``key``.
+
+        A call which is already running is not interrupted.
+
+        Args:
+            key (object): The key used to schedule the call.
+        """
+        with self._condition:
+            self._cancel(key)
+
+    def _cancel(self, key):
+        """Cancel a scheduled call. Must be called with the lock held."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry[3] = None
+
+    def _start_threads(self):
+        """Start the scheduler and worker threads."""
+        threads = [threading.Thread(target=self._run_scheduler)]
+        for _ in range(config.EVENT_RENEWAL_WORKERS):
+            threads.append(threading.Thread(target=self._run_worker))
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        self._threads = threads
+
+    def _run_scheduler(self):
+        """Pass scheduled calls to the workers as they fall due."""
+        while True:
+            with self._condition:
+                heap = self._heap
+                while heap and heap[0][3] is None:
+                    heapq.heappop(heap)
+                if not heap:
+                    self._condition.wait()
+                    continue
+                delay = heap[0][0] - time.time()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                _, _, key, callback = heapq.heappop(heap)
+                del self._entries[key]
+            self._work_queue.put((key, callback))
+
+    def _run_worker(self):
+        """Make the calls handed over by the scheduler thread."""
+        while True:
+            key, callback = self._work_queue.get()
+            try:
+                delay = callback()
+            except Exception:  # pylint: disable=broad-except
+                log.exception("Error in scheduled call for %s", key)
+                continue
+            if delay is not None:
+                self.schedule(key, delay, callback)
+
+
+#: Overflow policy for `EventQueue`: wait for space (the default).
+OVERFLOW_BLOCK = 'block'
+#: Overflow policy for `EventQueue`: discard the oldest queued event.
+OVERFLOW_DROP_OLDEST = 'drop_oldest'
+#: Overflow policy for `EventQueue`: merge the new event's variables into a
+#: queued event from the same subscription.
+OVERFLOW_COALESCE = 'coalesce'
+
+
+class EventQueue(Queue):
+    """A queue of events, with a policy for what to do when it is full.
+
+    With the `OVERFLOW_BLOCK` policy, this behaves like an ordinary bounded
+    :class:`~queue.Queue`: putting an event on a full queue waits until there
+    is space, which holds up delivery of the event to any other consumers. The
+    other policies never wait:
+
+    * `OVERFLOW_DROP_OLDEST` discards the oldest event in the queue.
+    * `OVERFLOW_COALESCE` replaces the most recent queued event from the same
+      subscription with one whose variables combine both events (the newer
+      values winning), so that the consumer still sees the latest value of
+      every variable. If there is no such event, the oldest is discarded.
+    """
+
+    def __init__(self, maxsize=0, overflow=OVERFLOW_BLOCK):
+        """
+        Args:
+            maxsize (int): The maximum number of events in the queue. If 0 (the
+                default), the queue is unbounded.
+            overflow (str): The overflow policy, one of `OVERFLOW_BLOCK`,
+                `OVERFLOW_DROP_OLDEST` or `OVERFLOW_COALESCE`.
+        """
+        # Queue is an old style class in Python 2, so super() cannot be used
+        Queue.__init__(self, maxsize)
+        if overflow not in (
+                OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_COALESCE):
+            raise ValueError('Unknown overflow policy: {0}'.format(overflow))
+        #: `str`: The overflow policy.
+        self.overflow = overflow
+        #: `int`: The number of events discarded or merged because the queue
+        #: was full.
+        self.overflowed = 0
+
+    def put(self, item, block=True, timeout=None):
+        """Put an event on the queue, applying the overflow policy."""
+        if self.overflow == OVERFLOW_BLOCK:
+            return Queue.put(self, item, block, timeout)
+        with self.not_full:
+            if 0 < self.maxsize <= self._qsize():
+                self.overflowed += 1
+                if self.overflow == OVERFLOW_COALESCE and \
+                        self._coalesce(item):
+                    return
+                self.queue.popleft()
+                self.unfinished_tasks -= 1
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def _coalesce(self, event):
+        """Merge an event into the newest queued event with the same sid.
+
+        Returns:
+            bool: `True` if the event has been merged.
+        """
+        if type(event) is not Event:  # pylint: disable=unidiomatic-typecheck
+            return False
+        queue = self.queue
+        for index in range(len(queue) - 1, -1, -1):
+            queued = queue[index]
+            # pylint: disable=unidiomatic-typecheck
+            if type(queued) is Event and queued.sid == event.sid:
+                variables = dict(queued.variables)
+                variables.update(event.variables)
+                queue[index] = Event(event.sid, event.seq, event.service,
+                                     event.timestamp, variables)
+                return True
+        return False
+
+
+class EventDispatcher(object):
+    """Delivers the events of a subscription to each of its consumers.
+
+    Consumers are queues and callbacks. Every consumer receives the same
+    `Event` instance, which must therefore be treated as read-only.
+    """
+
+    def __init__(self):
+        super(EventDispatcher, self).__init__()
+        self._lock = threading.Lock()
+        # Consumers are replaced rather than modified, so that they can be
+        # iterated over without holding the lock
+        self._queues = ()
+        self._callbacks = ()
+
+    def add_queue(self, queue):
+        """Add a queue on which events will be put."""
+        with self._lock:
+            self._queues += (queue,)
+
+    def remove_queue(self, queue):
+        """Remove a queue added with `add_queue`."""
+        with self._lock:
+            self._queues = tuple(q for q in self._queues if q is not queue)
+
+    def add_callback(self, callback):
+        """Add a function which will be called with each event."""
+        with self._lock:
+            self._callbacks += (callback,)
+
+    def remove_callback(self, callback):
+        """Remove a function added with `add_callback`."""
+        with self._lock:
+            self._callbacks = tuple(
+                c for c in self._callbacks if c != callback)
+
+    def put(self, event):
+        """Deliver an event to all the consumers.
+
+        Args:
+            event (Event): The event.
+        """
+        for callback in self._callbacks:
+            try:
+                callback(event)
+            except Exception:  # pylint: disable=broad-except
+                log.exception("Error in event callback %s", callback)
+        for queue in self._queues:
+            queue.put(event)
+
+
+class SubscriptionJournal(object):
+    """An on-disk record of the subscriptions which are subscribed.
+
+    When a program which uses events restarts, the subscriptions it had made
+    are still live on the speakers, which keep sending events to the old
+    address until the subscriptions time out. If the journal is enabled (by
+    setting `config.EVENT_JOURNAL_PATH`), each subscription is recorded in it
+    when it is made, renewed or unsubscribed, and `restore_subscriptions` can
+    be used on startup to take the old subscriptions over by renewing them.
+
+    The journal is a JSON file, which is replaced atomically on each change.
+    """
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path (str, optional): The path of the journal file. If not
+                specified, `config.EVENT_JOURNAL_PATH` is used.
+        """
+        super(SubscriptionJournal, self).__init__()
+        self._path = path
+        self._lock = threading.Lock()
+        # sid -> entry, for the file at self._loaded_path
+        self._entries = {}
+        self._loaded_path = None
+
+    @property
+    def path(self):
+        """str: the path of the journal file, or `None` if disabled."""
+        return self._path or config.EVENT_JOURNAL_PATH
+
+    @property
+    def enabled(self):
+        """bool: whether subscriptions are being journaled."""
+        return self.path is not None
+
+    def entries(self):
+        """Return the subscriptions recorded in the journal.
+
+        Returns:
+            list: A list of dicts, each with the keys ``'sid'``,
+            ``'service_type'``, ``'event_subscription_url'``,
+            ``'ip_address'`` (of the device), ``'timeout'``,
+            ``'requested_timeout'``, ``'timestamp'``, ``'auto_renew'`` and
+            ``'callback'`` (the ``[ip_address, port]`` to which events are
+            sent).
+        """
+        with self._lock:
+            return [dict(entry) for entry in self._load().values()]
+
+    def record(self, subscription, old_sid=None):
+        """Record a subscription, or update its record.
+
+        Args:
+            subscription (Subscription): The subscription.
+            old_sid (str, optional): A previous sid of the subscription,
+                whose record should be removed.
+        """
+        if not self.enabled:
+            return
+        service = subscription.service
+        entry = {
+            'sid': subscription.sid,
+            'service_type': service.service_type,
+            'event_subscription_url': service.event_subscription_url,
+            'ip_address': service.soco.ip_address,
+            'timeout': subscription.timeout,
+            'requested_timeout': subscription.requested_timeout,
+            'timestamp': subscription.timestamp,
+            'auto_renew': subscription.auto_renew,
+            'callback': list(event_listener.address),
+        }
+        with self._lock:
+            entries = self._load()
+            entries.pop(old_sid, None)
+            entries[subscription.sid] = entry
+            self._save()
+
+    def discard(self, sid):
+        """Remove the record of a subscription.
+
+        Args:
+            sid (str): The subscription id.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._load().pop(sid, None) is not None:
+                self._save()
+
+    def clear(self):
+        """Remove all records."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._load().clear()
+            self._save()
+
+    def _load(self):
+        """Return the entries, reading the file if not already read. Must be
+        called with the lock held."""
+        path = self.path
+        if path == self._loaded_path:
+            return self._entries
+        self._entries = {}
+        self._loaded_path = path
+        if path is None or not os.path.exists(path):
+            return self._entries
+        try:
+            with open(path) as journal_file:
+                data = json.load(journal_file)
+            for entry in data['subscriptions']:
+                self._entries[entry['sid']] = entry
+        except (IOError, OSError, ValueError, KeyError, TypeError) as error:
+            log.warning("Ignoring unreadable journal %s: %s", path, error)
+        return self._entries
+
+    def _save(self):
+        """Write the entries to the file atomically. Must be called with the
+        lock held."""
+        path = self._loaded_path
+        data = {'version': 1, 'subscriptions': list(self._entries.values())}
+        # Write to a temporary file in the same directory, and then move it
+        # into place, so that the journal is never left half written
+        handle, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'w') as journal_file:
+                json.dump(data, journal_file)
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+            try:
+                os.replace(temp_path, path)
+            except AttributeError:  # Py2.7, which has no os.replace
+                if os.name == 'nt' and os.path.exists(path):
+                    os.remove(path)
+                os.rename(temp_path, path)
+        except (IOError, OSError) as error:
+            log.warning("Could not write journal %s: %s", path, error)
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+
 class Subscription(object):
     """A class representing the subscription to a UPnP event."""
     # pylint: disable=too-many-instance-attributes
 
-    def __init__(self, service, event_queue=None):
+    def __init__(self, service, event_queue=None, callback=None):
         """
         Args:
             service (Service): The SoCo `Service` to which the subscription
                  should be made.
             event_queue (:class:`~queue.Queue`): A queue on which received
                 events will be put. If not specified, a queue will be
-                created and used.
+                created and used, unless a ``callback`` is given.
+            callback (callable): A function which will be called with each
+                received event.
 
+        Further queues and callbacks can be added with `add_queue` and
+        `add_callback`.
         """
         super(Subscription, self).__init__()
         self.service = service
@@ -381,8 +1454,18 @@ class Subscription(object):
         self.timeout = None
         #: `bool`: An indication of whether the subscription is subscribed.
         self.is_subscribed = False
-        #: :class:`~queue.Queue`: The queue on which events are placed.
-        self.events = Queue() if event_queue is None else event_queue
+        # Delivers events to the queues and callbacks
+        self._dispatcher = EventDispatcher()
+        if event_queue is None and callback is None:
+            event_queue = Queue()
+        #: :class:`~queue.Queue`: The queue on which events are placed. This
+        #: is `None` if the subscription was made with a callback and no
+        #: queue.
+        self.events = event_queue
+        if event_queue is not None:
+            self._dispatcher.add_queue(event_queue)
+        if callback is not None:
+            self._dispatcher.add_callback(callback)
         #: `int`: The period (seconds) for which the subscription is requested
         self.requested_timeout = None
         # A flag to make sure that an unsubscribed instance is not
@@ -390,9 +1473,11 @@ class Subscription(object):
         self._has_been_unsubscribed = False
         # The time when the subscription was made
         self._timestamp = None
-        # Used to keep track of the auto_renew thread
-        self._auto_renew_thread = None
-        self._auto_renew_thread_flag = threading.Event()
+        #: `bool`: Whether the subscription is renewed automatically.
+        self.auto_renew = False
+        # The current delay between attempts to resubscribe after a failed
+        # auto renewal, or 0 if the last renewal succeeded
+        self._resubscribe_delay = 0
 
     def subscribe(self, requested_timeout=None, auto_renew=False):
         """Subscribe to the service.
@@ -404,37 +1489,19 @@ class Subscription(object):
 
         Note:
             SoCo will try to unsubscribe any subscriptions which are still
-            subscribed on program termination, but it is good practice for
+            subscribed on program termination (unless they are being kept
+            in a `SubscriptionJournal`), but it is good practice for
             you to clean up by making sure that you call :meth:`unsubscribe`
             yourself.
 
         Args:
             requested_timeout(int, optional): The timeout to be requested.
             auto_renew (bool, optional): If `True`, renew the subscription
-                automatically shortly before timeout. Default `False`.
+                automatically shortly before timeout. If a renewal fails, a
+                new subscription is made in its place (see `ResyncEvent`).
+                Default `False`.
         """
 
-        class AutoRenewThread(threading.Thread):
-            """Used by the auto_renew code to renew a subscription from within
-            a thread.
-
-            """
-
-            def __init__(self, interval, stop_flag, sub, *args, **kwargs):
-                super(AutoRenewThread, self).__init__(*args, **kwargs)
-                self.interval = interval
-                self.sub = sub
-                self.stop_flag = stop_flag
-                self.daemon = True
-
-            def run(self):
-                sub = self.sub
-                stop_flag = self.stop_flag
-                interval = self.interval
-                while not stop_flag.wait(interval):
-                    log.info("Autorenewing subscription %s", sub.sid)
-                    sub.renew()
-
         # TIMEOUT is provided for in the UPnP spec, but it is not clear if
         # Sonos pays any attention to it. A timeout of 86400 secs always seems
         # to be allocated
@@ -446,6 +1513,155 @@ class Subscription(object):
         # The event listener must be running, so start it if not
         if not event_listener.is_running:
             event_listener.start(service.soco)
+        self._request_subscription()
+        log.info(
+            "Subscribed to %s, sid: %s",
+            service.base_url + service.event_subscription_url, self.sid)
+        self._register(auto_renew)
+
+    def restore(self, entry):
+        """Take over a subscription recorded in a `SubscriptionJournal`.
+
+        The recorded sid is renewed if possible, in which case a
+        `ResyncEvent` is put on the queue, since events will have been missed
+        since the journal was written. If the sid cannot be renewed, for
+        example because it has expired or the speaker has restarted, a new
+        subscription is made instead.
+
+        Args:
+            entry (dict): The record of the subscription, as returned by
+                `SubscriptionJournal.entries`.
+        """
+        if self._has_been_unsubscribed:
+            raise SoCoException(
+                'Cannot resubscribe instance once unsubscribed')
+        service = self.service
+        if not event_listener.is_running:
+            event_listener.start(service.soco)
+        self.requested_timeout = entry['requested_timeout']
+        renewed = False
+        if tuple(entry['callback']) != tuple(event_listener.address):
+            # Events for the old sid would go to the wrong address, and
+            # renewing cannot change that
+            log.info("Not renewing %s, since its callback has changed",
+                     entry['sid'])
+        else:
+            self.sid = entry['sid']
+            self.timeout = entry['timeout']
+            self._timestamp = entry['timestamp']
+            self.is_subscribed = True
+            try:
+                self.renew()
+                renewed = True
+            except Exception as error:  # pylint: disable=broad-except
+                log.info("Could not renew %s (%s), resubscribing",
+                         entry['sid'], error)
+        if renewed:
+            # Events may arrive before the registration below is complete,
+            # but they would be ignored in any case, since the sid was not
+            # registered when they were sent. The ResyncEvent covers them.
+            sequence_tracker.resume(self.sid)
+        else:
+            self.is_subscribed = False
+            self._request_subscription()
+        log.info(
+            "Restored subscription to %s, sid: %s",
+            service.base_url + service.event_subscription_url, self.sid)
+        self._register(entry['auto_renew'])
+        if renewed:
+            # pylint: disable=protected-access
+            service._on_events_lost(self.sid)
+            self._dispatcher.put(
+                ResyncEvent(self.sid, service, time.time(), self.sid))
+
+    def _register(self, auto_renew):
+        """Register a new subscription with the event listener, and start
+        renewing it if required."""
+        # Add the queue to the master dict of queues so it can be looked up
+        # by sid
+        with _sid_to_event_queue_lock:
+            _sid_to_event_queue[self.sid] = self._dispatcher
+        # And do the same for the sid to service mapping
+        with _sid_to_service_lock:
+            _sid_to_service[self.sid] = self.service
+        event_listener.register_sid(self.sid)
+        # Register this subscription to be unsubscribed at exit if still alive
+        # (see `unsubscribe_all`)
+        with _live_subscriptions_lock:
+            _live_subscriptions.add(self)
+        self.auto_renew = auto_renew
+        subscription_journal.record(self)
+
+        # Set up auto_renew. There is nothing to renew if the subscription
+        # never expires
+        if self.timeout is not None:
+            if auto_renew:
+                renewal_scheduler.schedule(
+                    self, self._auto_renew_interval(), self._auto_renew)
+            else:
+                renewal_scheduler.schedule(
+                    self, self.timeout, self._check_expiry)
+
+    def add_queue(self, queue=None, maxsize=0, overflow=OVERFLOW_BLOCK):
+        """Add a queue on which this subscription's events will be put.
+
+        Each queue receives every event, so several consumers can share one
+        subscription.
+
+        Args:
+            queue (:class:`~queue.Queue`, optional): The queue. If not
+                specified, an `EventQueue` is created with the given
+                ``maxsize`` and ``overflow`` policy.
+            maxsize (int): The maximum size of the queue to create. If 0 (the
+                default), the queue is unbounded.
+            overflow (str): What to do when the queue is full. See
+                `EventQueue`.
+
+        Returns:
+            :class:`~queue.Queue`: the queue.
+        """
+        if queue is None:
+            queue = EventQueue(maxsize, overflow)
+        self._dispatcher.add_queue(queue)
+        return queue
+
+    def remove_queue(self, queue):
+        """Stop putting events on a queue.
+
+        Args:
+            queue (:class:`~queue.Queue`): The queue.
+        """
+        self._dispatcher.remove_queue(queue)
+
+    def add_callback(self, callback):
+        """Add a function to be called with each of this subscription's
+        events.
+
+        Callbacks are called, in the order in which they were added, from the
+        thread which handles the event, before the event is put on any queue.
+        They should return quickly. Exceptions are logged and ignored.
+
+        Args:
+            callback (callable): A function taking the `Event` as its only
+                argument.
+        """
+        self._dispatcher.add_callback(callback)
+
+    def remove_callback(self, callback):
+        """Stop calling a callback added with `add_callback`.
+
+        Args:
+            callback (callable): The function.
+        """
+        self._dispatcher.remove_callback(callback)
+
+    def _request_subscription(self):
+        """Send a request for a new subscription to the service.
+
+        On success, `sid`, `timeout` and `is_subscribed` are updated, but the
+        subscription is not registered with the event listener.
+        """
+        service = self.service
         # an event subscription looks like this:
         # SUBSCRIBE publisher path HTTP/1.1
         # HOST: publisher host:publisher port
@@ -459,8 +1675,8 @@ class Subscription(object):
             'Callback': '<http://{0}:{1}>'.format(ip_address, port),
             'NT': 'upnp:event'
         }
-        if requested_timeout is not None:
-            headers["TIMEOUT"] = "Second-{0}".format(requested_timeout)
+        if self.requested_timeout is not None:
+            headers["TIMEOUT"] = "Second-{0}".format(self.requested_timeout)
         response = requests.request(
             'SUBSCRIBE', service.base_url + service.event_subscription_url,
             headers=headers)
@@ -476,29 +1692,99 @@ class Subscription(object):
             self.timeout = int(timeout.lstrip('Second-'))
         self._timestamp = time.time()
         self.is_subscribed = True
+
+    def _resubscribe(self):
+        """Replace this subscription with a new one from the service.
+
+        This is used when a subscription cannot be renewed, eg because the
+        speaker has rebooted and no longer recognises the sid. The new sid is
+        swapped in for the old one, so that events continue to be put on the
+        same queue, and a `ResyncEvent` is put on the queue to tell consumers
+        that events may have been missed.
+        """
+        old_sid = self.sid
+        self._request_subscription()
         log.info(
-            "Subscribed to %s, sid: %s",
-            service.base_url + service.event_subscription_url, self.sid)
-        # Add the queue to the master dict of queues so it can be looked up
-        # by sid
+            "Resubscribed to %s, sid: %s (was %s)",
+            self.service.base_url + self.service.event_subscription_url,
+            self.sid, old_sid)
+        # Swap the sids while holding both locks, so that no event for the
+        # new sid can be looked up before both mappings are in place
         with _sid_to_event_queue_lock:
-            _sid_to_event_queue[self.sid] = self.events
-        # And do the same for the sid to service mapping
-        with _sid_to_service_lock:
-            _sid_to_service[self.sid] = self.service
-        # Register this subscription to be unsubscribed at exit if still alive
-        # This will not happen if exit is abnormal (eg in response to a
-        # signal or fatal interpreter error - see the docs for `atexit`).
-        atexit.register(self.unsubscribe)
-
-        # Set up auto_renew
-        if not auto_renew:
-            return
-        # Autorenew just before expiry, say at 85% of self.timeout seconds
+            with _sid_to_service_lock:
+                _sid_to_event_queue.pop(old_sid, None)
+                _sid_to_service.pop(old_sid, None)
+                _sid_to_event_queue[self.sid] = self._dispatcher
+                _sid_to_service[self.sid] = self.service
+        event_listener.register_sid(self.sid)
+        event_listener.unregister_sid(old_sid)
+        sequence_tracker.forget(old_sid)
+        subscription_journal.record(self, old_sid)
+        # pylint: disable=protected-access
+        self.service._on_events_lost(old_sid)
+        self._dispatcher.put(
+            ResyncEvent(self.sid, self.service, time.time(), old_sid))
+
+    def _auto_renew_interval(self):
+        """Return the number of seconds to wait before auto-renewing."""
+        # Autorenew just before expiry, say at 85% of self.timeout seconds,
+        # less a little jitter so that subscriptions made together do not all
+        # renew at the same moment
         interval = self.timeout * 85 / 100
-        auto_renew_thread = AutoRenewThread(
-            interval, self._auto_renew_thread_flag, self)
-        auto_renew_thread.start()
+        return interval - random.uniform(
+            0, interval * config.EVENT_RENEWAL_JITTER)
+
+    def _auto_renew(self):
+        """Renew the subscription. Called by the `renewal_scheduler`.
+
+        Returns:
+            float: the number of seconds until the next renewal, or `None` if
+            no further renewal is required.
+        """
+        if self._has_been_unsubscribed or not self.is_subscribed:
+            return None
+        log.info("Autorenewing subscription %s", self.sid)
+        try:
+            if self._resubscribe_delay:
+                self._resubscribe()
+            else:
+                self.renew()
+        except Exception as error:  # pylint: disable=broad-except
+            # Events will not be received until a fresh subscription is
+            # made, so retry with one, backing off exponentially while the
+            # service remains unreachable
+            # pylint: disable=protected-access
+            self.service._on_events_lost(self.sid)
+            self._resubscribe_delay = min(
+                2 * self._resubscribe_delay or
+                config.EVENT_RESUBSCRIBE_BACKOFF_MIN,
+                config.EVENT_RESUBSCRIBE_BACKOFF_MAX)
+            log.warning(
+                "Failed to renew subscription %s (%s), resubscribing in %ss",
+                self.sid, error, self._resubscribe_delay)
+            return self._resubscribe_delay
+        self._resubscribe_delay = 0
+        if self.timeout is None:
+            return None
+        return self._auto_renew_interval()
+
+    def _check_expiry(self):
+        """Tell the service when a subscription which is not renewed
+        automatically has expired. Called by the `renewal_scheduler`.
+
+        Returns:
+            float: the number of seconds until the subscription expires, if
+            it has been renewed, or `None` once it has expired.
+        """
+        if self._has_been_unsubscribed or self.auto_renew:
+            return None
+        time_left = self.time_left
+        if time_left > 0:
+            return time_left
+        log.info("Subscription %s has expired", self.sid)
+        # pylint: disable=protected-access
+        self.service._on_events_lost(self.sid)
+        return None
 
     def renew(self, requested_timeout=None):
         """Renew the event subscription.
@@ -550,6 +1836,7 @@ class Subscription(object):
             self.timeout = int(timeout.lstrip('Second-'))
         self._timestamp = time.time()
         self.is_subscribed = True
+        subscription_journal.record(self)
         log.info(
             "Renewed subscription to %s, sid: %s",
             self.service.base_url + self.service.event_subscription_url,
@@ -566,7 +1853,11 @@ class Subscription(object):
             return
 
         # Cancel any auto renew
-        self._auto_renew_thread_flag.set()
+        renewal_scheduler.cancel(self)
+        # No more events will be received, whether or not the request below
+        # succeeds
+        # pylint: disable=protected-access
+        self.service._on_events_lost(self.sid)
         # Send an unsubscribe request like this:
         # UNSUBSCRIBE publisher path HTTP/1.1
         # HOST: publisher host:publisher port
@@ -596,8 +1887,19 @@ class Subscription(object):
                 del _sid_to_service[self.sid]
             except KeyError:
                 pass
+        event_listener.unregister_sid(self.sid)
+        sequence_tracker.forget(self.sid)
+        with _live_subscriptions_lock:
+            _live_subscriptions.discard(self)
+        subscription_journal.discard(self.sid)
         self._has_been_unsubscribed = True
 
+    @property
+    def timestamp(self):
+        """`float`: The time at which the subscription was made or last
+        renewed, or `None` if it is not subscribed."""
+        return self._timestamp
+
     @property
     def time_left(self):
         """
@@ -613,11 +1915,167 @@ class Subscription(object):
             return time_left if time_left > 0 else 0
 
 
+def subscribe_many(services, requested_timeout=None, auto_renew=False,
+                   event_queue=None, callback=None, max_workers=None):
+    """Subscribe to the events of a number of services at once.
+
+    The subscription requests are sent concurrently, which is much quicker
+    than subscribing to each service in turn when there are many of them, eg
+    several services on each of a large number of devices.
+
+    Args:
+        services (iterable): The `Service` instances to subscribe to.
+        requested_timeout (int, optional): The timeout to be requested for
+            each subscription.
+        auto_renew (bool, optional): If `True`, renew the subscriptions
+            automatically. Default `False`.
+        event_queue (:class:`~queue.Queue`, optional): A queue on which the
+            events of all the subscriptions will be put. If neither this nor
+            ``callback`` is given, each subscription has its own queue.
+        callback (callable, optional): A function which will be called with
+            each event received by any of the subscriptions.
+        max_workers (int, optional): The maximum number of requests to send
+            at once. Defaults to `config.EVENT_SUBSCRIBE_WORKERS`.
+
+    Returns:
+        tuple: A tuple of two dicts. The first maps each service which was
+        subscribed to its `Subscription`, and the second maps each service
+        which could not be subscribed to the exception raised.
+
+    Example:
+
+        >>> services = [getattr(device, name) for device in soco.discover()
+        ...             for name in ('avTransport', 'renderingControl')]
+        >>> subscriptions, errors = subscribe_many(services, auto_renew=True)
+    """
+    services = list(services)
+    if max_workers is None:
+        max_workers = config.EVENT_SUBSCRIBE_WORKERS
+    # Start the event listener now, rather than letting the first few
+    # subscriptions race to do it
+    if services and not event_listener.is_running:
+        event_listener.start(services[0].soco)
+
+    def subscribe(service):
+        """Subscribe to one service."""
+        return service.subscribe(
+            requested_timeout=requested_timeout, auto_renew=auto_renew,
+            event_queue=event_queue, callback=callback)
+
+    subscriptions, errors = run_concurrently(subscribe, services, max_workers)
+    for service, error in errors.items():
+        log.warning(
+            "Failed to subscribe to %s: %s",
+            service.base_url + service.event_subscription_url, error)
+    return subscriptions, errors
+
+
+def unsubscribe_all(max_workers=None):
+    """Unsubscribe all the subscriptions which are still subscribed.
+
+    The unsubscribe requests are sent concurrently. This is called
+    automatically when the program exits, unless the subscriptions are being
+    kept in a `SubscriptionJournal`, but not if exit is abnormal (eg in
+    response to a signal or fatal interpreter error - see the docs for
+    `atexit`).
+
+    Args:
+        max_workers (int, optional): The maximum number of requests to send
+            at once. Defaults to `config.EVENT_SUBSCRIBE_WORKERS`.
+
+    Returns:
+        dict: A dict mapping each `Subscription` which could not be
+        unsubscribed to the exception raised.
+    """
+    if max_workers is None:
+        max_workers = config.EVENT_SUBSCRIBE_WORKERS
+    with _live_subscriptions_lock:
+        subscriptions = list(_live_subscriptions)
+
+    def unsubscribe(subscription):
+        """Unsubscribe one subscription."""
+        subscription.unsubscribe()
+
+    _, errors = run_concurrently(unsubscribe, subscriptions, max_workers)
+    for subscription, error in errors.items():
+        log.warning("Failed to unsubscribe %s: %s", subscription.sid, error)
+    return errors
+
+
+def restore_subscriptions(event_queue=None, callback=None, max_workers=None):
+    """Take over the subscriptions recorded in the `subscription_journal`.
+
+    This is intended to be called when a program starts, to pick up the
+    subscriptions made by its previous run (see `SubscriptionJournal`). Each
+    recorded subscription is renewed if possible, or replaced by a new
+    subscription to the same service if not. The requests are sent
+    concurrently.
+
+    Args:
+        event_queue (:class:`~queue.Queue`, optional): A queue on which the
+            events of all the subscriptions will be put. If neither this nor
+            ``callback`` is given, each subscription has its own queue.
+        callback (callable, optional): A function which will be called with
+            each event received by any of the subscriptions.
+        max_workers (int, optional): The maximum number of requests to send
+            at once. Defaults to `config.EVENT_SUBSCRIBE_WORKERS`.
+
+    Returns:
+        tuple: A tuple of two dicts. The first maps each restored service to
+        its `Subscription`, and the second maps the sid of each recorded
+        subscription which could not be restored to the exception raised.
+    """
+    # Imported here to avoid a circular import
+    from .core import SoCo
+    if max_workers is None:
+        max_workers = config.EVENT_SUBSCRIBE_WORKERS
+    entries = dict((entry['sid'], entry)
+                   for entry in subscription_journal.entries())
+
+    def restore(sid):
+        """Restore one subscription."""
+        entry = entries[sid]
+        device = SoCo(entry['ip_address'])
+        for service in vars(device).values():
+            if getattr(service, 'event_subscription_url', None) == \
+                    entry['event_subscription_url']:
+                break
+        else:
+            # Should never happen, unless the journal is from a different
+            # version of SoCo
+            subscription_journal.discard(sid)
+            raise SoCoException(
+                'No {0} service on {1}'.format(
+                    entry['service_type'], entry['ip_address']))
+        subscription = Subscription(service, event_queue, callback)
+        subscription.restore(entry)
+        # The old sid has been replaced if it could not be renewed
+        if subscription.sid != sid:
+            subscription_journal.discard(sid)
+        return service, subscription
+
+    results, errors = run_concurrently(restore, list(entries), max_workers)
+    for sid, error in errors.items():
+        log.warning("Failed to restore subscription %s: %s", sid, error)
+    return dict(results.values()), errors
+
+
+def _unsubscribe_at_exit():
+    """Unsubscribe all subscriptions, unless they are being journaled."""
+    if subscription_journal.enabled:
+        # Leave them for restore_subscriptions in the next run
+        return
+    unsubscribe_all()
+
+
 # pylint: disable=C0103
 event_listener = EventListener()
+renewal_scheduler = RenewalScheduler()
+sequence_tracker = EventSequenceTracker()
+subscription_journal = SubscriptionJournal()
 
 # Thread safe mappings.
-# Used to store a mapping of sids to event queues
+# Used to store a mapping of sids to the EventDispatcher of each subscription
 _sid_to_event_queue = weakref.WeakValueDictionary()
 # Used to store a mapping of sids to service instances
 _sid_to_service = weakref.WeakValueDictionary()
@@ -628,3 +2086,9 @@ _sid_to_service = weakref.WeakValueDictionary()
 #       queue = _sid_to_event_queue[sid]
 _sid_to_event_queue_lock = threading.Lock()
 _sid_to_service_lock = threading.Lock()
+
+# The subscriptions which are subscribed, and which will be unsubscribed at
+# exit if they still are. Guarded by _live_subscriptions_lock
+_live_subscriptions = set()
+_live_subscriptions_lock = threading.Lock()
+atexit.register(_unsubscribe_at_exit)
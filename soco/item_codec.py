@@ -0,0 +1,476 @@
+# -*- coding: utf-8 -*-
+
+"""A compact binary encoding of music library and music service items.
+
+Pickling a large number of `DidlObject` instances, or converting them to
+dicts and then JSON, is slow and produces large files. This module encodes
+the items registered in `soco.data_structures` (and their resources), and
+the `soco.music_services.data_structures` items, in a much more compact
+form, which is quicker to write and to read::
+
+    from soco import item_codec
+
+    data = item_codec.encode(tracks)
+    ...
+    tracks = list(item_codec.decode(data))
+
+Items can also be written to a file one at a time with an `ItemEncoder`, and
+read back one at a time, without copying, from a `mmap.mmap` or any other
+buffer::
+
+    with open('tracks.bin', 'wb') as items_file:
+        encoder = item_codec.ItemEncoder(items_file)
+        for track in tracks:
+            encoder.write(track)
+
+    with open('tracks.bin', 'rb') as items_file:
+        data = mmap.mmap(items_file.fileno(), 0, access=mmap.ACCESS_READ)
+        for track in item_codec.ItemDecoder(data):
+            ...
+
+The format
+----------
+
+An encoding starts with `MAGIC`, which includes the version of the format,
+followed by one value for each item. Each value starts with a type byte,
+which is followed by:
+
+* nothing, for `None`, `True` and `False`
+* a string reference, for strings
+* a zigzag encoded varint, for integers
+* an 8 byte IEEE 754 double, for floats
+* a varint count and the values, for lists (and tuples)
+* a varint count and a string reference and value for each item, for dicts
+  with string keys
+* a schema reference, a varint bit mask of the fields which are set (bit
+  n for the nth field of the schema), and the value of each field which is
+  set, for objects
+
+All varints are unsigned LEB128. A string reference is a varint: 0 means a
+new string follows (as a varint length and utf-8 bytes), which is added to
+the end of the string table, and n means the (n-1)th string in the table.
+Repeated values, such as album and artist names, are therefore only written
+once. Schemas are written in the same way: 0 is followed by the string
+reference of the class's key and the string references of the names of its
+fields.
+
+Objects are decoded without calling their ``__init__`` method. The
+``music_service`` of a music service item is not encoded, and is `None` when
+it is decoded.
+"""
+
+from __future__ import unicode_literals
+
+import io
+import struct
+import sys
+
+from .compat import StringType, UnicodeType
+from .data_structures import (
+    _DIDL_CLASS_TO_CLASS, DidlObject, DidlResource
+)
+from .music_services import data_structures as ms_data_structures
+
+#: The bytes at the start of every encoding, which end with the version of
+#: the format.
+MAGIC = b'SoCoItems\x01'
+
+# Value types
+_NONE = 1
+_FALSE = 2
+_TRUE = 3
+_STRING = 4
+_INTEGER = 5
+_FLOAT = 6
+_LIST = 7
+_DICT = 8
+_OBJECT = 9
+
+_DOUBLE = struct.Struct('>d')
+
+# Stands in for fields which are not set
+_MISSING = object()
+
+if sys.version_info[0] == 2:
+    _INTEGER_TYPES = (int, long)  # noqa pylint: disable=undefined-variable
+    _STRING_TYPES = (StringType, UnicodeType)
+else:
+    _INTEGER_TYPES = (int,)
+    _STRING_TYPES = (UnicodeType,)
+
+# The classes of the music service items which are not made by get_class
+_MS_BASE_CLASSES = dict(
+    (cls.__name__, cls) for cls in (
+        ms_data_structures.MusicServiceItem,
+        ms_data_structures.MediaMetadata,
+        ms_data_structures.MediaCollection,
+    ))
+
+# The classes of music service metadata values
+_MS_METADATA_CLASSES = dict(
+    (cls.__name__, cls) for cls in (
+        ms_data_structures.MetadataDictBase,
+        ms_data_structures.TrackMetadata,
+        ms_data_structures.StreamMetadata,
+    ))
+
+_MS_ITEM_FIELDS = ('item_id', 'desc', 'resources', 'uri', 'metadata')
+
+
+def _didl_fields(cls):
+    """Return the names of the fields of a `DidlObject` class: its public
+    slots, and its instance dict."""
+    fields = []
+    for klass in reversed(cls.__mro__):
+        for name in klass.__dict__.get('__slots__', ()):
+            if not name.startswith('_'):
+                fields.append(name)
+    fields.append('__dict__')
+    return tuple(fields)
+
+
+def _class_key(cls):
+    """Return the key by which a class is identified in an encoding.
+
+    Raises:
+        TypeError: If instances of the class cannot be encoded.
+    """
+    if issubclass(cls, DidlObject):
+        if _DIDL_CLASS_TO_CLASS.get(cls.item_class) is cls:
+            return 'didl:' + cls.item_class
+    elif cls is DidlResource:
+        return 'res'
+    elif issubclass(cls, ms_data_structures.MusicServiceItem):
+        if _MS_BASE_CLASSES.get(cls.__name__) is cls:
+            return 'ms:' + cls.__name__
+        for key, klass in ms_data_structures.CLASSES.items():
+            if klass is cls:
+                return 'ms:' + key
+    elif _MS_METADATA_CLASSES.get(cls.__name__) is cls:
+        return 'msmeta:' + cls.__name__
+    raise TypeError('Cannot encode instances of {0}'.format(cls.__name__))
+
+
+def _class_from_key(key):
+    """Return the class identified by a key from `_class_key`.
+
+    Raises:
+        ValueError: If there is no such class.
+    """
+    kind, _, name = key.partition(':')
+    try:
+        if kind == 'didl':
+            return _DIDL_CLASS_TO_CLASS[name]
+        elif kind == 'res':
+            return DidlResource
+        elif kind == 'ms':
+            if name in _MS_BASE_CLASSES:
+                return _MS_BASE_CLASSES[name]
+            return ms_data_structures.get_class(name)
+        elif kind == 'msmeta':
+            return _MS_METADATA_CLASSES[name]
+    except KeyError:
+        pass
+    raise ValueError('Unknown class in encoding: {0}'.format(key))
+
+
+def _fields(cls):
+    """Return the names of the fields encoded for instances of a class."""
+    if issubclass(cls, DidlObject):
+        return _didl_fields(cls)
+    elif cls is DidlResource:
+        return tuple(name for name in DidlResource.__slots__
+                     if name != '__weakref__')
+    elif issubclass(cls, ms_data_structures.MusicServiceItem):
+        return _MS_ITEM_FIELDS
+    return ('metadata',)
+
+
+class ItemEncoder(object):
+    """Encodes items, and writes them to a file one at a time."""
+
+    def __init__(self, file_):
+        """
+        Args:
+            file_: A binary file, or any object with a ``write`` method which
+                accepts bytes. `MAGIC` is written to it straight away.
+        """
+        super(ItemEncoder, self).__init__()
+        self._file = file_
+        # string: reference
+        self._strings = {}
+        # class: (reference, field names)
+        self._schemas = {}
+        self._file.write(MAGIC)
+
+    def write(self, item):
+        """Encode an item, and write it to the file.
+
+        Args:
+            item: A `DidlObject`, a `DidlResource`, a music service item, or
+                `None`, a bool, a number, a string, or a list or dict of
+                these.
+
+        Raises:
+            TypeError: If the item (or a value in it) cannot be encoded.
+        """
+        buf = bytearray()
+        self._encode(buf, item)
+        self._file.write(bytes(buf))
+
+    def _encode(self, buf, value):
+        """Append the encoding of a value to a buffer."""
+        # pylint: disable=too-many-branches
+        if value is None:
+            buf.append(_NONE)
+        elif value is True:
+            buf.append(_TRUE)
+        elif value is False:
+            buf.append(_FALSE)
+        elif isinstance(value, _STRING_TYPES):
+            buf.append(_STRING)
+            self._encode_string(buf, value)
+        elif isinstance(value, _INTEGER_TYPES):
+            buf.append(_INTEGER)
+            _encode_varint(buf, (value << 1) if value >= 0 else
+                           ((-value << 1) - 1))
+        elif isinstance(value, float):
+            buf.append(_FLOAT)
+            buf.extend(_DOUBLE.pack(value))
+        elif isinstance(value, (list, tuple)):
+            buf.append(_LIST)
+            _encode_varint(buf, len(value))
+            for element in value:
+                self._encode(buf, element)
+        elif isinstance(value, dict):
+            buf.append(_DICT)
+            _encode_varint(buf, len(value))
+            for key, element in value.items():
+                if not isinstance(key, _STRING_TYPES):
+                    raise TypeError('Cannot encode dict key {0!r}'.format(key))
+                self._encode_string(buf, key)
+                self._encode(buf, element)
+        else:
+            buf.append(_OBJECT)
+            # A LazyDidlObject reports the class of the object it stands for
+            fields = self._encode_schema(buf, value.__class__)
+            mask = 0
+            elements = []
+            for index, name in enumerate(fields):
+                if name == '__dict__':
+                    element = getattr(value, '__dict__', None) or _MISSING
+                else:
+                    element = getattr(value, name, _MISSING)
+                if element is not _MISSING:
+                    mask |= 1 << index
+                    elements.append(element)
+            _encode_varint(buf, mask)
+            for element in elements:
+                self._encode(buf, element)
+
+    def _encode_string(self, buf, string):
+        """Append a string reference to a buffer."""
+        if isinstance(string, StringType):
+            string = string.decode('utf-8')
+        reference = self._strings.get(string)
+        if reference is not None:
+            _encode_varint(buf, reference)
+            return
+        self._strings[string] = len(self._strings) + 1
+        data = string.encode('utf-8')
+        buf.append(0)
+        _encode_varint(buf, len(data))
+        buf.extend(data)
+
+    def _encode_schema(self, buf, cls):
+        """Append a schema reference to a buffer, and return the fields of
+        the schema."""
+        try:
+            reference, fields = self._schemas[cls]
+        except KeyError:
+            pass
+        else:
+            _encode_varint(buf, reference)
+            return fields
+        key = _class_key(cls)
+        fields = _fields(cls)
+        self._schemas[cls] = (len(self._schemas) + 1, fields)
+        buf.append(0)
+        self._encode_string(buf, key)
+        _encode_varint(buf, len(fields))
+        for name in fields:
+            self._encode_string(buf, name)
+        return fields
+
+
+class ItemDecoder(object):
+    """Decodes items from a buffer, one at a time.
+
+    Iterating over a decoder yields the items. Strings are decoded straight
+    from the buffer (on Python 3), so a `mmap.mmap` of a large file can be
+    decoded without reading it into memory first.
+    """
+
+    def __init__(self, buffer_):
+        """
+        Args:
+            buffer_: The encoding, as `bytes`, a `bytearray`, a `memoryview`,
+                a `mmap.mmap` or any other object which supports the buffer
+                protocol.
+
+        Raises:
+            ValueError: If the buffer does not start with `MAGIC`.
+        """
+        super(ItemDecoder, self).__init__()
+        if sys.version_info[0] == 2:
+            self._view = bytearray(buffer_)
+        else:
+            self._view = memoryview(buffer_).cast('B')
+        if bytes(self._view[:len(MAGIC)]) != MAGIC:
+            if bytes(self._view[:len(MAGIC) - 1]) == MAGIC[:-1]:
+                raise ValueError('Unsupported item encoding version')
+            raise ValueError('Not an item encoding')
+        self._position = len(MAGIC)
+        self._strings = []
+        # A list of (class, field names)
+        self._schemas = []
+
+    def __iter__(self):
+        length = len(self._view)
+        while self._position < length:
+            yield self._decode()
+
+    def _read_varint(self):
+        """Read a varint."""
+        view = self._view
+        position = self._position
+        result = view[position]
+        if result < 0x80:
+            self._position = position + 1
+            return result
+        result &= 0x7f
+        shift = 7
+        position += 1
+        while True:
+            byte = view[position]
+            position += 1
+            result |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                self._position = position
+                return result
+            shift += 7
+
+    def _read_string(self):
+        """Read a string reference, and return the string."""
+        reference = self._read_varint()
+        if reference:
+            return self._strings[reference - 1]
+        length = self._read_varint()
+        start = self._position
+        self._position = start + length
+        if sys.version_info[0] == 2:
+            string = bytes(self._view[start:start + length]).decode('utf-8')
+        else:
+            string = str(self._view[start:start + length], 'utf-8')
+        self._strings.append(string)
+        return string
+
+    def _read_schema(self):
+        """Read a schema reference, and return the class and field names."""
+        reference = self._read_varint()
+        if reference:
+            return self._schemas[reference - 1]
+        cls = _class_from_key(self._read_string())
+        fields = tuple(self._read_string()
+                       for _ in range(self._read_varint()))
+        self._schemas.append((cls, fields))
+        return cls, fields
+
+    def _decode(self):
+        """Read a value."""
+        # pylint: disable=too-many-return-statements
+        value_type = self._view[self._position]
+        self._position += 1
+        if value_type == _STRING:
+            return self._read_string()
+        elif value_type == _OBJECT:
+            return self._decode_object()
+        elif value_type == _NONE:
+            return None
+        elif value_type == _INTEGER:
+            value = self._read_varint()
+            return (value >> 1) if not value & 1 else -((value + 1) >> 1)
+        elif value_type == _TRUE:
+            return True
+        elif value_type == _FALSE:
+            return False
+        elif value_type == _LIST:
+            return [self._decode() for _ in range(self._read_varint())]
+        elif value_type == _DICT:
+            result = {}
+            for _ in range(self._read_varint()):
+                key = self._read_string()
+                result[key] = self._decode()
+            return result
+        elif value_type == _FLOAT:
+            start = self._position
+            self._position += _DOUBLE.size
+            return _DOUBLE.unpack(bytes(self._view[start:self._position]))[0]
+        raise ValueError('Invalid value type {0} at {1}'.format(
+            value_type, self._position - 1))
+
+    def _decode_object(self):
+        """Read an object."""
+        cls, fields = self._read_schema()
+        obj = cls.__new__(cls)
+        mask = self._read_varint()
+        for name in fields:
+            present = mask & 1
+            mask >>= 1
+            if not present:
+                continue
+            value = self._decode()
+            if name == '__dict__':
+                obj.__dict__.update(value)
+            else:
+                setattr(obj, name, value)
+        if issubclass(cls, ms_data_structures.MusicServiceItem):
+            obj.music_service = None
+        return obj
+
+
+def _encode_varint(buf, value):
+    """Append an unsigned LEB128 varint to a buffer."""
+    while value > 0x7f:
+        buf.append((value & 0x7f) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def encode(items):
+    """Encode a sequence of items.
+
+    Args:
+        items (iterable): The items. See `ItemEncoder.write` for what may be
+            encoded.
+
+    Returns:
+        bytes: The encoding.
+    """
+    output = io.BytesIO()
+    encoder = ItemEncoder(output)
+    for item in items:
+        encoder.write(item)
+    return output.getvalue()
+
+
+def decode(buffer_):
+    """Decode the items in an encoding.
+
+    Args:
+        buffer_: The encoding. See `ItemDecoder`.
+
+    Returns:
+        iterator: The items, which are decoded as they are iterated over.
+    """
+    return iter(ItemDecoder(buffer_))
@@ -0,0 +1,402 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=not-context-manager
+
+# NOTE: The pylint not-content-manager warning is disabled pending the fix of
+# a bug in pylint: https://github.com/PyCQA/pylint/issues/782
+
+"""A local copy of the music library, which is kept in step with the device.
+
+Browsing a large music library is slow, and every call to
+`MusicLibrary.get_music_library_information` makes at least one request to a
+device. A `LibraryMirror` fetches each category of the library (the tracks,
+albums, artists and so on, see `MIRRORED_SEARCH_TYPES`) in full the first
+time it is needed, and answers queries from its copy after that::
+
+    from soco.library_mirror import LibraryMirror
+
+    mirror = LibraryMirror(device.music_library)
+    mirror.subscribe()
+    ...
+    albums = mirror.get_albums(search_term='black')
+
+A category is fetched again only when the device says that it has changed:
+every Browse response carries the ``UpdateID`` of the container which was
+browsed (eg ``A:`` for the categories of the music library, or ``S:`` for
+the shares), and the device's ContentDirectory events carry the new update
+ids of containers which have changed, in ``ContainerUpdateIDs``. Without a
+subscription, `check_for_changes` compares the update ids with one small
+request for each category.
+
+A mirror can be saved to a file with `save`, and loaded again with `load`
+(without fetching anything) when the program starts again. The file is
+written with `soco.item_codec`.
+"""
+
+from __future__ import unicode_literals
+
+import copy
+import logging
+import threading
+
+from . import item_codec
+from .data_structures import SearchResult
+from .events import ResyncEvent
+from .exceptions import SoCoUPnPException
+from .utils import (
+    container_of, parse_container_update_ids, really_unicode
+)
+
+_LOG = logging.getLogger(__name__)
+
+#: The search types (see `MusicLibrary.SEARCH_TRANSLATION`) which are
+#: mirrored.
+MIRRORED_SEARCH_TYPES = (
+    'tracks', 'albums', 'artists', 'album_artists', 'genres', 'composers',
+    'playlists', 'share', 'sonos_playlists', 'categories',
+)
+
+# The number of times a category is fetched, while events say that it has
+# changed during the fetch, before giving up on keeping it
+_FETCH_ATTEMPTS = 3
+
+
+class LibraryMirror(object):
+    """A local copy of the categories of a music library.
+
+    `get_music_library_information` (and the ``get_artists`` style methods)
+    take the same arguments as those of `MusicLibrary`, and return a
+    `SearchResult` in the same way, from the mirror. The first query for a
+    category, and the first after it has changed, fetches the whole category
+    from the device. Queries with ``subcategories`` (eg the albums of an
+    artist) are not mirrored, and are passed on to the music library.
+
+    A ``search_term`` is matched against the titles of the items, ignoring
+    case, which is close to, but not quite the same as, the fuzzy search of
+    the device.
+
+    The items in the results are shared with the mirror, and must not be
+    changed, with the exception of those returned with
+    ``full_album_art_uri=True``, which are copies.
+    """
+
+    def __init__(self, music_library):
+        """
+        Args:
+            music_library (MusicLibrary): The music library to mirror.
+        """
+        super(LibraryMirror, self).__init__()
+        self.music_library = music_library
+        self._lock = threading.Lock()
+        # Serialises fetches, so that a category is not fetched twice at once
+        self._sync_lock = threading.Lock()
+        # search type: (update id, list of items)
+        self._categories = {}
+        # search type: the update ids evented for its container while it is
+        # being fetched (None for a resync)
+        self._fetching = {}
+        self._subscription = None
+        # Whether check_for_changes is running (or about to) in a thread,
+        # and whether it must run again, after events have been missed
+        self._checking = False
+        self._check_again = False
+
+    def get_music_library_information(self, search_type, start=0,
+                                      max_items=100, full_album_art_uri=False,
+                                      search_term=None, subcategories=None,
+                                      complete_result=False):
+        """Retrieve music information objects from the mirror.
+
+        See `MusicLibrary.get_music_library_information` for a description
+        of the arguments.
+
+        Returns:
+            `SearchResult`: The items.
+        """
+        # pylint: disable=too-many-arguments
+        if subcategories is not None or \
+                search_type not in MIRRORED_SEARCH_TYPES:
+            return self.music_library.get_music_library_information(
+                search_type, start=start, max_items=max_items,
+                full_album_art_uri=full_album_art_uri,
+                search_term=search_term, subcategories=subcategories,
+                complete_result=complete_result)
+        update_id, items = self.sync(search_type)
+        if search_term is not None:
+            term = really_unicode(search_term).lower()
+            items = [item for item in items
+                     if term in (item.title or '').lower()]
+        total_matches = len(items)
+        if not complete_result:
+            items = items[start:start + max_items]
+        if full_album_art_uri:
+            items = [copy.copy(item) for item in items]
+            for item in items:
+                # pylint: disable=protected-access
+                self.music_library.soco._update_album_art_to_full_uri(item)
+        return SearchResult(items, search_type, len(items), total_matches,
+                            update_id)
+
+    def get_artists(self, *args, **kwargs):
+        """`get_music_library_information` with
+        ``search_type='artists'``."""
+        return self.get_music_library_information('artists', *args, **kwargs)
+
+    def get_album_artists(self, *args, **kwargs):
+        """`get_music_library_information` with
+        ``search_type='album_artists'``."""
+        return self.get_music_library_information(
+            'album_artists', *args, **kwargs)
+
+    def get_albums(self, *args, **kwargs):
+        """`get_music_library_information` with
+        ``search_type='albums'``."""
+        return self.get_music_library_information('albums', *args, **kwargs)
+
+    def get_genres(self, *args, **kwargs):
+        """`get_music_library_information` with
+        ``search_type='genres'``."""
+        return self.get_music_library_information('genres', *args, **kwargs)
+
+    def get_composers(self, *args, **kwargs):
+        """`get_music_library_information` with
+        ``search_type='composers'``."""
+        return self.get_music_library_information(
+            'composers', *args, **kwargs)
+
+    def get_tracks(self, *args, **kwargs):
+        """`get_music_library_information` with
+        ``search_type='tracks'``."""
+        return self.get_music_library_information('tracks', *args, **kwargs)
+
+    def get_playlists(self, *args, **kwargs):
+        """`get_music_library_information` with
+        ``search_type='playlists'``."""
+        return self.get_music_library_information(
+            'playlists', *args, **kwargs)
+
+    def sync(self, search_type=None):
+        """Fetch a category (or every category) from the device, unless the
+        mirror of it is up to date.
+
+        Args:
+            search_type (str, optional): The category. If `None`, all of the
+                `MIRRORED_SEARCH_TYPES` are synced.
+
+        If events show that the category changed while it was being
+        fetched, it is fetched again (up to three times in all, after which
+        the result is returned, but not kept).
+
+        Returns:
+            tuple: The update id and the list of items of the category, or
+            `None` if ``search_type`` is `None`.
+        """
+        if search_type is None:
+            for name in MIRRORED_SEARCH_TYPES:
+                self.sync(name)
+            return None
+        category = self._categories.get(search_type)
+        if category is not None:
+            return category
+        with self._sync_lock:
+            # It may have been fetched while waiting for the lock
+            category = self._categories.get(search_type)
+            if category is not None:
+                return category
+            for _ in range(_FETCH_ATTEMPTS):
+                _LOG.debug('Fetching %s for the library mirror', search_type)
+                with self._lock:
+                    self._fetching[search_type] = seen = []
+                try:
+                    result = self.music_library.get_music_library_information(
+                        search_type, complete_result=True)
+                except Exception:
+                    with self._lock:
+                        del self._fetching[search_type]
+                    raise
+                category = (result.update_id, list(result))
+                with self._lock:
+                    del self._fetching[search_type]
+                    if all(update_id == result.update_id
+                           for update_id in seen):
+                        self._categories[search_type] = category
+                        return category
+                _LOG.debug('%s changed while it was fetched', search_type)
+            return category
+
+    def is_current(self, search_type):
+        """Check whether the mirror of a category is up to date, as far as
+        is known, so that a query for it will not touch the network.
+
+        Args:
+            search_type (str): The category.
+
+        Returns:
+            bool: `True` if it is up to date.
+        """
+        return search_type in self._categories
+
+    def invalidate(self, search_type=None):
+        """Forget a category (or every category), so that it is fetched again
+        when it is next needed.
+
+        Args:
+            search_type (str, optional): The category. If `None`, all
+                categories are forgotten.
+        """
+        with self._lock:
+            if search_type is None:
+                self._categories.clear()
+            else:
+                self._categories.pop(search_type, None)
+
+    def check_for_changes(self):
+        """Find out from the device which categories have changed since they
+        were fetched, and forget them.
+
+        This makes one small Browse request for each category in the mirror,
+        and is not needed if the mirror is subscribed to events.
+
+        Returns:
+            list: The search types of the categories which have changed.
+        """
+        changed = []
+        with self._lock:
+            categories = list(self._categories.items())
+        for search_type, (update_id, _) in categories:
+            search = self.music_library.SEARCH_TRANSLATION[search_type]
+            try:
+                # pylint: disable=protected-access
+                _, metadata = self.music_library._music_lib_search(
+                    search, 0, 1, cached=False)
+                current = metadata['update_id']
+            except SoCoUPnPException as exception:
+                # The category has gone, or is empty
+                if exception.error_code != '701':
+                    raise
+                current = None
+            if current != update_id:
+                changed.append(search_type)
+                self.invalidate(search_type)
+        return changed
+
+    def subscribe(self, requested_timeout=None):
+        """Subscribe to the ContentDirectory events of the device, so that
+        changed categories are noticed without any requests.
+
+        Args:
+            requested_timeout (int, optional): The subscription timeout to
+                request. The subscription is renewed automatically.
+        """
+        if self._subscription is None:
+            self._subscription = \
+                self.music_library.contentDirectory.subscribe(
+                    requested_timeout=requested_timeout, auto_renew=True,
+                    callback=self._handle_event)
+
+    def unsubscribe(self):
+        """Stop listening for ContentDirectory events."""
+        subscription, self._subscription = self._subscription, None
+        if subscription is not None:
+            subscription.unsubscribe()
+
+    def save(self, path):
+        """Write the categories in the mirror to a file.
+
+        Args:
+            path (str): The path of the file, which is overwritten if it
+                exists.
+        """
+        with self._lock:
+            categories = list(self._categories.items())
+        with open(path, 'wb') as mirror_file:
+            encoder = item_codec.ItemEncoder(mirror_file)
+            for search_type, (update_id, items) in categories:
+                encoder.write({'search_type': search_type,
+                               'update_id': update_id, 'count': len(items)})
+                for item in items:
+                    encoder.write(item)
+
+    def load(self, path):
+        """Read categories written by `save` into the mirror.
+
+        Each category is used until the device says that it has changed
+        (which `check_for_changes` can be used to find out straight away).
+
+        Args:
+            path (str): The path of the file.
+
+        Raises:
+            ValueError: If the file was not written by `save`.
+        """
+        with open(path, 'rb') as mirror_file:
+            decoder = iter(item_codec.ItemDecoder(mirror_file.read()))
+        categories = {}
+        for header in decoder:
+            try:
+                items = [next(decoder) for _ in range(header['count'])]
+                categories[header['search_type']] = (
+                    header['update_id'], items)
+            except (KeyError, TypeError, StopIteration):
+                raise ValueError('{0} is not a library mirror'.format(path))
+        with self._lock:
+            self._categories.update(categories)
+
+    def _handle_event(self, event):
+        """Forget the categories in containers which have changed. Called for
+        each ContentDirectory event."""
+        if isinstance(event, ResyncEvent):
+            # Events may have been missed. Categories being fetched are
+            # fetched again, and the others are checked with the device in
+            # a thread, since this one must return quickly
+            with self._lock:
+                for seen in self._fetching.values():
+                    seen.append(None)
+            self._check_later()
+            return
+        value = event.variables.get('container_update_i_ds')
+        if not value:
+            return
+        update_ids = parse_container_update_ids(value)
+        translation = self.music_library.SEARCH_TRANSLATION
+        with self._lock:
+            for search_type, seen in self._fetching.items():
+                container = container_of(translation[search_type])
+                if container in update_ids:
+                    seen.append(update_ids[container])
+            for search_type, (update_id, _) in list(self._categories.items()):
+                container = container_of(translation[search_type])
+                if update_ids.get(container, update_id) != update_id:
+                    _LOG.debug('%s has changed', search_type)
+                    del self._categories[search_type]
+
+    def _check_later(self):
+        """Run `check_for_changes` in a thread.
+
+        Returns:
+            `threading.Thread`: The thread, or `None` if a check is already
+            running, in which case it runs again when it has finished.
+        """
+        with self._lock:
+            self._check_again = True
+            if self._checking:
+                return None
+            self._checking = True
+        thread = threading.Thread(target=self._run_checks)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def _run_checks(self):
+        """Call `check_for_changes` until it is not needed again."""
+        while True:
+            with self._lock:
+                if not self._check_again:
+                    self._checking = False
+                    return
+                self._check_again = False
+            try:
+                self.check_for_changes()
+            except Exception:  # pylint: disable=broad-except
+                _LOG.exception('Unable to check the library mirror, so '
+                               'forgetting everything in it')
+                self.invalidate()
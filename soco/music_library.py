@@ -9,9 +9,17 @@ For access to third party music streaming services, see the
 from __future__ import unicode_literals
 
 import logging
+import threading
 
-from . import discovery
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+from . import config, discovery
+from .cache import browse_cache
 from .data_structures import (
+    ColumnarSearchResult,
     SearchResult,
     DidlResource,
     DidlObject,
@@ -19,10 +27,67 @@ from .data_structures import (
 )
 from .data_structures_entry import from_didl_string
 from .exceptions import SoCoUPnPException
-from .utils import url_escape_path, really_unicode, camel_to_underscore
+from .page_planner import page_planner, timed_browse
+from .utils import (
+    url_escape_path, really_unicode, camel_to_underscore, run_concurrently
+)
 
 _LOG = logging.getLogger(__name__)
 
+# ip address: semaphore which bounds the number of Browse requests in
+# progress for the device (see config.BROWSE_WORKERS)
+_browse_semaphores = {}
+_browse_semaphores_lock = threading.Lock()
+
+
+def _build_search(search, subcategories, search_term):
+    """Add subcategories and a fuzzy search term to the ID to search."""
+    if subcategories is not None:
+        for category in subcategories:
+            search += '/' + url_escape_path(really_unicode(category))
+    if search_term is not None:
+        search += ':' + url_escape_path(really_unicode(search_term))
+    return search
+
+
+class _Prefetch(object):
+    """Calls a function in a background thread, and returns the result
+    when asked for it."""
+
+    def __init__(self, function, *args):
+        super(_Prefetch, self).__init__()
+        self._function = function
+        self._args = args
+        self._result = None
+        self._error = None
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self._result = self._function(*self._args)
+        except Exception as error:  # pylint: disable=broad-except
+            self._error = error
+
+    def result(self):
+        """Wait for the function to return, and return its result (or raise
+        its exception)."""
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+def _browse_semaphore(ip_address):
+    """Return the semaphore which bounds the Browse requests to a device."""
+    with _browse_semaphores_lock:
+        semaphore = _browse_semaphores.get(ip_address)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(config.BROWSE_WORKERS)
+            _browse_semaphores[ip_address] = semaphore
+        return semaphore
+
 
 class MusicLibrary(object):
     """The Music Library."""
@@ -145,7 +210,7 @@ class MusicLibrary(object):
     def get_music_library_information(self, search_type, start=0,
                                       max_items=100, full_album_art_uri=False,
                                       search_term=None, subcategories=None,
-                                      complete_result=False):
+                                      complete_result=False, columnar=False):
         """Retrieve music information objects from the music library.
 
         This method is the main method to get music information items, like
@@ -220,6 +285,9 @@ class MusicLibrary(object):
             complete_result (bool): if `True`, will disable
                 paging (ignore ``start`` and ``max_items``) and return all
                 results for the search.
+            columnar (bool): if `True`, return a `ColumnarSearchResult`,
+                which takes much less memory for large results. Default
+                `False`.
 
         Warning:
             Getting e.g. all the tracks in a large collection might
@@ -227,7 +295,8 @@ class MusicLibrary(object):
 
 
         Returns:
-             `SearchResult`: an instance of `SearchResult`.
+             `SearchResult`: an instance of `SearchResult`, or of
+             `ColumnarSearchResult` if ``columnar`` is `True`.
 
         Note:
             * The maximum numer of results may be restricted by the unit,
@@ -241,55 +310,186 @@ class MusicLibrary(object):
         Raises:
              `SoCoException` upon errors.
         """
-        search = self.SEARCH_TRANSLATION[search_type]
-
-        # Add sub categories
-        if subcategories is not None:
-            for category in subcategories:
-                search += '/' + url_escape_path(really_unicode(category))
-        # Add fuzzy search
-        if search_term is not None:
-            search += ':' + url_escape_path(really_unicode(search_term))
+        search = _build_search(self.SEARCH_TRANSLATION[search_type],
+                               subcategories, search_term)
 
-        item_list = []
-        metadata = {'total_matches': 100000}
-        while len(item_list) < metadata['total_matches']:
-            # Change start and max for complete searches
+        if columnar:
+            item_list = ColumnarSearchResult(search_type)
+        else:
+            item_list = []
+        if complete_result:
+            start = 0
+            max_items = page_planner(self.soco.ip_address).page_size()
+
+        # Get the results. For complete results, the first page tells us how
+        # many items there are, and how many the device returns at a time,
+        # and the rest are fetched concurrently. They are not cached, since
+        # they would push the small pages of a user interface out of the
+        # cache
+        try:
+            response, metadata = self._music_lib_search(
+                search, start, max_items, not complete_result)
+            responses = [response]
             if complete_result:
-                start, max_items = len(item_list), 100000
-
-            # Try and get this batch of results
-            try:
-                response, metadata = \
-                    self._music_lib_search(search, start, max_items)
-            except SoCoUPnPException as exception:
-                # 'No such object' UPnP errors
-                if exception.error_code == '701':
-                    return SearchResult([], search_type, 0, 0, None)
-                else:
-                    raise exception
-
-            # Parse the results
-            items = from_didl_string(response['Result'])
-            for item in items:
-                # Check if the album art URI should be fully qualified
-                if full_album_art_uri:
-                    self.soco._update_album_art_to_full_uri(item)
-                # Append the item to the list
-                item_list.append(item)
+                responses.extend(self._fetch_remaining_pages(
+                    search, metadata['number_returned'],
+                    metadata['total_matches']))
+        except SoCoUPnPException as exception:
+            # 'No such object' UPnP errors
+            if exception.error_code == '701':
+                if columnar:
+                    return ColumnarSearchResult(search_type)
+                return SearchResult([], search_type, 0, 0, None)
+            else:
+                raise exception
 
-            # If we are not after the complete results, the stop after 1
-            # iteration
-            if not complete_result:
-                break
+        # Parse the results
+        for response in responses:
+            if columnar:
+                item_list.add_didl_string(response['Result'])
+            else:
+                items = from_didl_string(
+                    response['Result'], lazy=config.LAZY_DIDL_RESULTS)
+                for item in items:
+                    # Check if the album art URI should be fully qualified
+                    if full_album_art_uri:
+                        self.soco._update_album_art_to_full_uri(item)
+                    # Append the item to the list
+                    item_list.append(item)
 
         metadata['search_type'] = search_type
         if complete_result:
             metadata['number_returned'] = len(item_list)
 
+        if columnar:
+            if full_album_art_uri:
+                item_list.apply('album_art_uri',
+                                self._build_album_art_full_uri)
+            item_list._metadata.update(metadata)
+            return item_list
+
         # pylint: disable=star-args
         return SearchResult(item_list, **metadata)
 
+    def iter_music_library_information(self, search_type, start=0,
+                                       max_items=None,
+                                       full_album_art_uri=False,
+                                       search_term=None, subcategories=None,
+                                       page_size=100):
+        """Generate music information objects from the music library, a page
+        at a time.
+
+        This is like `get_music_library_information`, but the items of each
+        page are yielded as soon as the page has arrived, and while they are
+        being used the next page is fetched in the background. Only about
+        two pages are held in memory at once, however many items there are.
+
+        Args:
+            search_type (str): The kind of information to retrieve. See
+                `get_music_library_information`.
+            start (int, optional): The index of the first item. Default 0.
+            max_items (int, optional): The maximum number of items to yield.
+                Default `None`, which means all of them.
+            full_album_art_uri (bool): whether the album art URI should be
+                absolute (i.e. including the IP address). Default `False`.
+            search_term (str, optional): A string for a fuzzy search. See
+                `get_music_library_information`.
+            subcategories (list, optional): A list of strings that indicate
+                one or more subcategories to dive into. See
+                `get_music_library_information`.
+            page_size (int): The number of items to ask for in each request.
+                Default 100.
+
+        Yields:
+            `DidlObject`: The items.
+
+        Raises:
+            SoCoUPnPException: upon errors, other than a search which finds
+                no such object, which yields nothing.
+        """
+        # pylint: disable=too-many-arguments
+        search = _build_search(self.SEARCH_TRANSLATION[search_type],
+                               subcategories, search_term)
+        return self._iter_search(search, start, max_items, full_album_art_uri,
+                                 page_size)
+
+    def iter_browse(self, ml_item=None, start=0, max_items=None,
+                    full_album_art_uri=False, search_term=None,
+                    subcategories=None, page_size=100):
+        """Generate the sub-elements of a music library item, a page at a
+        time.
+
+        This is like `browse`, but yields the items as they arrive, while
+        fetching the next page in the background, in the same way as
+        `iter_music_library_information`.
+
+        Args:
+            ml_item (`DidlItem`): the item to browse, if left out or
+                `None`, items at the root level will be searched.
+            start (int): the starting index of the results.
+            max_items (int, optional): The maximum number of items to yield.
+                Default `None`, which means all of them.
+            full_album_art_uri (bool): whether the album art URI should be
+                fully qualified with the relevant IP address.
+            search_term (str): A string that will be used to perform a fuzzy
+                search among the search results. See `browse`.
+            subcategories (list): A list of strings that indicate one or more
+                subcategories to descend into. See `browse`.
+            page_size (int): The number of items to ask for in each request.
+                Default 100.
+
+        Yields:
+            `DidlObject`: The items.
+
+        Raises:
+            AttributeError: if ``ml_item`` has no ``item_id`` attribute.
+        """
+        # pylint: disable=too-many-arguments
+        search = _build_search('A:' if ml_item is None else ml_item.item_id,
+                               subcategories, search_term)
+        return self._iter_search(search, start, max_items, full_album_art_uri,
+                                 page_size)
+
+    def _iter_search(self, search, start, max_items, full_album_art_uri,
+                     page_size):
+        """Generate the items of a search, fetching each page while the
+        items of the previous one are used.
+
+        The pages are not cached, so that no more than two of them are held
+        at once.
+        """
+        # pylint: disable=too-many-arguments
+        end = None if max_items is None else start + max_items
+        fetch = None
+        if end is None or start < end:
+            fetch = _Prefetch(self._music_lib_search, search, start,
+                              page_size if end is None else
+                              min(page_size, end - start), False)
+        while fetch is not None:
+            try:
+                response, metadata = fetch.result()
+            except SoCoUPnPException as exception:
+                # 'No such object' UPnP errors
+                if exception.error_code == '701':
+                    return
+                raise
+            start += metadata['number_returned']
+            limit = metadata['total_matches'] if end is None else \
+                min(end, metadata['total_matches'])
+            # Fetch the next page while this one is used
+            fetch = None
+            if metadata['number_returned'] and start < limit:
+                fetch = _Prefetch(self._music_lib_search, search, start,
+                                  min(page_size, limit - start), False)
+            items = from_didl_string(
+                response['Result'], lazy=config.LAZY_DIDL_RESULTS)
+            # Let the response go before the items are used
+            del response
+            for item in items:
+                if full_album_art_uri:
+                    self.soco._update_album_art_to_full_uri(item)
+                yield item
+
     def browse(self, ml_item=None, start=0, max_items=100,
                full_album_art_uri=False, search_term=None, subcategories=None):
         """Browse (get sub-elements from) a music library item.
@@ -318,18 +518,8 @@ class MusicLibrary(object):
             SoCoUPnPException: with ``error_code='701'`` if the item cannot be
                 browsed.
         """
-        if ml_item is None:
-            search = 'A:'
-        else:
-            search = ml_item.item_id
-
-        # Add sub categories
-        if subcategories is not None:
-            for category in subcategories:
-                search += '/' + url_escape_path(really_unicode(category))
-        # Add fuzzy search
-        if search_term is not None:
-            search += ':' + url_escape_path(really_unicode(search_term))
+        search = _build_search('A:' if ml_item is None else ml_item.item_id,
+                               subcategories, search_term)
 
         try:
             response, metadata = \
@@ -343,7 +533,8 @@ class MusicLibrary(object):
         metadata['search_type'] = 'browse'
 
         # Parse the results
-        containers = from_didl_string(response['Result'])
+        containers = from_didl_string(
+            response['Result'], lazy=config.LAZY_DIDL_RESULTS)
         item_list = []
         for container in containers:
             # Check if the album art URI should be fully qualified
@@ -400,7 +591,7 @@ class MusicLibrary(object):
         # Call the base version
         return self.browse(search_item, start, max_items, full_album_art_uri)
 
-    def _music_lib_search(self, search, start, max_items):
+    def _music_lib_search(self, search, start, max_items, cached=True):
         """Perform a music library search and extract search numbers.
 
         You can get an overview of all the relevant search prefixes (like
@@ -417,24 +608,40 @@ class MusicLibrary(object):
              ('SortCriteria', '')
          ])
 
+        Responses are kept in the device's `soco.cache.BrowseCache`. A
+        stored response is used again if the device's events say that its
+        container is unchanged, or otherwise if a request for a single item
+        returns the same ``UpdateID``.
+
         Args:
             search (str): The ID to search.
             start (int): The index of the forst item to return.
             max_items (int): The maximum number of items to return.
+            cached (bool): Whether the response may come from, and is put
+                in, the cache. Default `True`.
 
         Returns:
             tuple: (response, metadata) where response is the returned metadata
                 and metadata is a dict with the 'number_returned',
                 'total_matches' and 'update_id' integers
         """
-        response = self.contentDirectory.Browse([
-            ('ObjectID', search),
-            ('BrowseFlag', 'BrowseDirectChildren'),
-            ('Filter', '*'),
-            ('StartingIndex', start),
-            ('RequestedCount', max_items),
-            ('SortCriteria', '')
-        ])
+        cache = browse_cache(self.soco.ip_address)
+        response = None
+        if cached:
+            response = cache.get(search, start, max_items)
+            if response is None and max_items != 1:
+                stored = cache.peek(search, start, max_items)
+                if stored is not None:
+                    # Check that the container is unchanged with the
+                    # smallest request there is. It is not stored, so that
+                    # it does not push real pages out
+                    check = self._browse(search, 0, 1)
+                    if int(check['UpdateID']) == int(stored['UpdateID']):
+                        response = stored
+        if response is None:
+            response = self._browse(search, start, max_items)
+            if cached:
+                cache.put(response, search, start, max_items)
 
         # Get result information
         metadata = {}
@@ -442,6 +649,64 @@ class MusicLibrary(object):
             metadata[camel_to_underscore(tag)] = int(response[tag])
         return response, metadata
 
+    def _browse(self, search, start, max_items):
+        """Send a Browse request for the children of an object."""
+        with _browse_semaphore(self.soco.ip_address):
+            return timed_browse(self.soco, [
+                ('ObjectID', search),
+                ('BrowseFlag', 'BrowseDirectChildren'),
+                ('Filter', '*'),
+                ('StartingIndex', start),
+                ('RequestedCount', max_items),
+                ('SortCriteria', '')
+            ])
+
+    def _fetch_remaining_pages(self, search, fetched, total_matches):
+        """Fetch the rest of the results of a search, after the first page.
+
+        The remaining items are split into pages of the size of the first
+        one (which is as many as the device returns at once), which are
+        fetched concurrently, up to `config.BROWSE_WORKERS` at a time. If the
+        device returns fewer items than expected for a page, the rest of the
+        page is fetched afterwards.
+
+        The pages are not cached.
+
+        Args:
+            search (str): The ID to search.
+            fetched (int): The number of items in the first page.
+            total_matches (int): The total number of items.
+
+        Returns:
+            list: The responses, in order.
+
+        Raises:
+            SoCoUPnPException: If any of the requests fails.
+        """
+        if not fetched:
+            return []
+        starts = list(range(fetched, total_matches, fetched))
+
+        def fetch(start):
+            """Fetch the page at start."""
+            return self._music_lib_search(search, start, fetched, False)
+
+        pages, errors = run_concurrently(fetch, starts, config.BROWSE_WORKERS)
+        if errors:
+            raise errors[min(errors)]
+        responses = []
+        for start in starts:
+            response, metadata = pages[start]
+            responses.append(response)
+            end = min(start + fetched, total_matches)
+            position = start + metadata['number_returned']
+            while metadata['number_returned'] and position < end:
+                response, metadata = self._music_lib_search(
+                    search, position, end - position, False)
+                responses.append(response)
+                position += metadata['number_returned']
+        return responses
+
     @property
     def library_updating(self):
         """bool: whether the music library is in the process of being updated.
@@ -503,11 +768,8 @@ class MusicLibrary(object):
             complete_result=True)
 
         reduced = [item for item in result if item.__class__ == DidlMusicAlbum]
-        # It is necessary to update the list of items in two places, due to
-        # a bug in SearchResult
         result[:] = reduced
         result._metadata.update({
-            'item_list': reduced,
             'search_type': 'albums_for_artist',
             'number_returned': len(reduced),
             'total_matches': len(reduced)
@@ -534,6 +796,86 @@ class MusicLibrary(object):
         result._metadata['search_type'] = 'tracks_for_album'
         return result
 
+    def get_albums_and_tracks(self, keys, full_album_art_uri=False):
+        """Get the albums and tracks of many artists at once.
+
+        This does the work of `get_albums_for_artist` and
+        `get_tracks_for_album` for a list of artists and albums, with each
+        artist and each album fetched only once however often it is asked
+        for. The albums of all the artists are fetched concurrently, and
+        then the tracks of all the albums (see `config.BROWSE_WORKERS`), so
+        the time taken depends much less on the number of artists::
+
+            >>> tree = device.music_library.get_albums_and_tracks(
+            ...     ['Metallica', ('Muse', 'Drones')])
+            >>> for artist, albums in tree.items():
+            ...     for album, tracks in albums.items():
+            ...         print(artist, album.title, len(tracks))
+
+        Args:
+            keys (list): The artists and albums to fetch. An artist's name
+                (a `str`) stands for all of the artist's albums, and an
+                ``(artist, album)`` tuple for one album.
+            full_album_art_uri (bool): whether the album art URI should be
+                absolute (i.e. including the IP address). Default `False`.
+
+        Returns:
+            `OrderedDict`: The albums of each artist, in the order of the
+            keys, as an `OrderedDict` of each album (a `DidlMusicAlbum`) and
+            its tracks (a `SearchResult`). Artists and albums which are not
+            in the library are left out.
+
+        Raises:
+            SoCoUPnPException: If any of the requests fails.
+        """
+        # artist: the album titles wanted, or None for all of them
+        wanted = OrderedDict()
+        for key in keys:
+            if isinstance(key, tuple):
+                artist, album = key
+                titles = wanted.setdefault(artist, set())
+                if titles is not None:
+                    titles.add(album)
+            else:
+                wanted[key] = None
+
+        def fetch(subcategories):
+            """Fetch the complete contents of an album artist, or of one of
+            their albums."""
+            return self.get_album_artists(
+                full_album_art_uri=full_album_art_uri,
+                subcategories=list(subcategories), complete_result=True)
+
+        artists = [(artist,) for artist in wanted]
+        artist_results, errors = run_concurrently(
+            fetch, artists, config.BROWSE_WORKERS)
+        if errors:
+            raise errors[next(key for key in artists if key in errors)]
+
+        # artist: list of albums
+        albums = OrderedDict()
+        for artist, titles in wanted.items():
+            albums[artist] = [
+                item for item in artist_results[(artist,)]
+                if item.item_class == DidlMusicAlbum.item_class and
+                (titles is None or item.title in titles)]
+        album_keys = [(artist, album.title)
+                      for artist, artist_albums in albums.items()
+                      for album in artist_albums]
+        track_results, errors = run_concurrently(
+            fetch, album_keys, config.BROWSE_WORKERS)
+        if errors:
+            raise errors[next(key for key in album_keys if key in errors)]
+
+        tree = OrderedDict()
+        for artist, artist_albums in albums.items():
+            if not artist_results[(artist,)]:
+                continue
+            tree[artist] = OrderedDict(
+                (album, track_results[(artist, album.title)])
+                for album in artist_albums)
+        return tree
+
     @property
     def album_artist_display_option(self):
         """str: The current value of the album artist compilation setting.
@@ -296,8 +296,25 @@ class MusicServiceItem(MetadataDictBase):
             ~xml.etree.ElementTree.Element: The (XML) Element representation of
                 this object
         """
+        return self._to_didl_item().to_element(
+            include_namespaces=include_namespaces)
+
+    def write_xml(self, parts, include_namespaces=False):
+        """Write the XML of the element returned by `to_element`, as
+        ElementTree would serialise it.
+
+        Args:
+            parts (list): The list of strings to append the XML to.
+            include_namespaces (bool, optional): If True, include xml
+                namespace attributes on the root element
+        """
+        self._to_didl_item().write_xml(
+            parts, include_namespaces=include_namespaces)
+
+    def _to_didl_item(self):
+        """Return a `DidlItem` with the same XML representation."""
         # We piggy back on the implementation in DidlItem
-        didl_item = DidlItem(
+        return DidlItem(
             title="DUMMY",
             # This is ignored. Sonos gets the title from the item_id
             parent_id="DUMMY",  # Ditto
@@ -305,7 +322,6 @@ class MusicServiceItem(MetadataDictBase):
             desc=self.desc,
             resources=self.resources
         )
-        return didl_item.to_element(include_namespaces=include_namespaces)
 
 
 class TrackMetadata(MetadataDictBase):
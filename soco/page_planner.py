@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=not-context-manager
+
+# NOTE: The pylint not-content-manager warning is disabled pending the fix of
+# a bug in pylint: https://github.com/PyCQA/pylint/issues/782
+
+"""Page sizes for ContentDirectory Browse requests, learnt from each device.
+
+A device returns at most a certain number of items for each Browse request
+(a little under 500 for the queue of current speakers), however many are
+asked for, and the time a request takes grows with the number of items
+returned. A `PagePlanner` learns both from the requests made to a device (see
+`timed_browse`), and `PagePlanner.page_size` chooses the page size which
+returns the most items per second. This is as many as the device will return,
+unless smaller pages have been measured to be quicker. Asking for more items
+than the device returns costs nothing, so the limit is not asked for
+exactly, and a limit which has been learnt too low is put right by the next
+request.
+
+There is one planner for each device (see `page_planner`), which is shared
+by the queue, favorites, music library and snapshot code.
+"""
+
+from __future__ import unicode_literals
+
+import math
+import threading
+import time
+
+#: The page size asked for to get as many items as the device returns at
+#: once.
+MAX_PAGE_SIZE = 100000
+
+# The weight of a new measurement in the average throughput of a page size
+_SMOOTHING = 0.3
+
+# How much quicker (in items per second) a smaller page size must be, to be
+# chosen instead of a larger one
+_MARGIN = 1.1
+
+# The smallest page size which is considered
+_MIN_PAGE_SIZE = 32
+
+# One page size in this many is MAX_PAGE_SIZE even if a smaller one has been
+# chosen, so that the throughput of the largest pages is measured again
+_EXPLORE_EVERY = 10
+
+# ip address: PagePlanner
+_planners = {}
+_planners_lock = threading.Lock()
+
+
+def _bucket(size):
+    """Return the bucket of a page size: the nearest power of two."""
+    return int(round(math.log(size, 2)))
+
+
+class PagePlanner(object):
+    """Learns how many items a device returns for each Browse request, and
+    how long requests take, and plans page sizes from them.
+
+    The throughput (items per second) of pages of each size (to the nearest
+    power of two) is kept as a moving average. The candidate page sizes are
+    the powers of two below the device's limit, and the limit itself (which
+    is asked for with `MAX_PAGE_SIZE`).
+    """
+
+    def __init__(self):
+        super(PagePlanner, self).__init__()
+        self._lock = threading.Lock()
+        #: `int`: The largest number of items the device has returned when
+        #: it returned fewer than were asked for (and there were more), or
+        #: `None` if this has not happened yet.
+        self.limit = None
+        # bucket: average items per second
+        self._throughput = {}
+        self._calls = 0
+
+    def record(self, requested, returned, remaining, seconds):
+        """Record the outcome of a Browse request.
+
+        Args:
+            requested (int): The ``RequestedCount``.
+            returned (int): The ``NumberReturned``.
+            remaining (int): The number of items from the ``StartingIndex``
+                of the request to the end (``TotalMatches`` minus
+                ``StartingIndex``).
+            seconds (float): The time the request took.
+        """
+        with self._lock:
+            if returned < min(requested, remaining):
+                # The device returned as many as it could
+                if self.limit is None or returned > self.limit:
+                    self.limit = returned
+            if returned > 0 and seconds > 0:
+                bucket = _bucket(returned)
+                throughput = returned / seconds
+                average = self._throughput.get(bucket)
+                if average is not None:
+                    throughput = _SMOOTHING * throughput + \
+                        (1 - _SMOOTHING) * average
+                self._throughput[bucket] = throughput
+
+    def page_size(self):
+        """Return the page size which returns the most items per second.
+
+        Returns:
+            int: The page size, which is `MAX_PAGE_SIZE` unless a smaller
+            one has been measured to be quicker than the device's limit.
+        """
+        with self._lock:
+            self._calls += 1
+            if self.limit is None or self._calls % _EXPLORE_EVERY == 0:
+                return MAX_PAGE_SIZE
+            best = MAX_PAGE_SIZE
+            best_throughput = self._throughput.get(_bucket(self.limit))
+            if best_throughput is None:
+                return best
+            size = _MIN_PAGE_SIZE
+            while size < self.limit:
+                throughput = self._throughput.get(_bucket(size))
+                if throughput is not None and \
+                        throughput > best_throughput * _MARGIN:
+                    best, best_throughput = size, throughput
+                size *= 2
+            return best
+
+    def clear(self):
+        """Forget everything that has been learnt."""
+        with self._lock:
+            self.limit = None
+            self._throughput.clear()
+            self._calls = 0
+
+
+def page_planner(ip_address):
+    """Return the `PagePlanner` of a device.
+
+    Args:
+        ip_address (str): The IP address of the device.
+
+    Returns:
+        PagePlanner: The planner.
+    """
+    with _planners_lock:
+        planner = _planners.get(ip_address)
+        if planner is None:
+            planner = _planners[ip_address] = PagePlanner()
+        return planner
+
+
+def timed_browse(soco, args):
+    """Send a Browse request to the ContentDirectory service of a device, and
+    record how many items it returned, and how long it took, with the
+    device's `PagePlanner`.
+
+    Args:
+        soco (`SoCo`): The device.
+        args (list): The arguments of the request, which must include
+            ``StartingIndex`` and ``RequestedCount``.
+
+    Returns:
+        dict: The response.
+    """
+    started = time.time()
+    response = soco.contentDirectory.Browse(args)
+    seconds = time.time() - started
+    try:
+        arguments = dict(args)
+        start = int(arguments['StartingIndex'])
+        page_planner(soco.ip_address).record(
+            int(arguments['RequestedCount']),
+            int(response['NumberReturned']),
+            int(response['TotalMatches']) - start, seconds)
+    except (KeyError, TypeError, ValueError):
+        pass
+    return response
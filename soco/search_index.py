@@ -0,0 +1,427 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=not-context-manager
+
+# NOTE: The pylint not-content-manager warning is disabled pending the fix of
+# a bug in pylint: https://github.com/PyCQA/pylint/issues/782
+
+"""A local full text index of music library items, for search as you type.
+
+The fuzzy search of the device (the ``search_term`` of
+`MusicLibrary.get_music_library_information`) costs a request for each
+query, and only searches one category. A `SearchIndex` holds the items of
+several categories (by default the tracks, albums, artists and composers
+of a `soco.library_mirror.LibraryMirror`) and answers queries locally::
+
+    from soco.library_mirror import LibraryMirror
+    from soco.search_index import SearchIndex
+
+    mirror = LibraryMirror(device.music_library)
+    index = SearchIndex()
+    index.update_from_mirror(mirror)
+    for item in index.search('beatl abb'):
+        print(item.title)
+
+The title, artist and album of each item are split into words, which are
+lower cased and have their accents removed (see `fold`), so ``'beyonce'``
+finds ``'Beyoncé'``. Each word of a query matches the words of an item
+which start with it, so a query can be matched as it is typed, and an item
+must match every word of the query. Items are ranked by where the words
+match (a match in the title counts for more than one in the album, see
+`DEFAULT_FIELDS`) and by whether they match whole words. A word of a query
+which does not start any word in the index is matched against similar words
+instead (those with many of the same three letter sequences), so that small
+typing mistakes still find something.
+
+`update_from_mirror` only re-indexes the categories whose update id has
+changed, and within those, only the items which have been added, removed or
+changed (see `soco.data_structures.DidlObject.fingerprint`).
+"""
+
+from __future__ import unicode_literals
+
+import bisect
+import heapq
+import re
+import threading
+import unicodedata
+from operator import itemgetter
+
+#: The attributes of items which are indexed, with the weight of a match in
+#: each.
+DEFAULT_FIELDS = (('title', 4), ('creator', 2), ('artist', 2), ('album', 1))
+
+#: The search types (see `soco.music_library.MusicLibrary.SEARCH_TRANSLATION`)
+#: indexed by `SearchIndex.update_from_mirror`.
+INDEXED_SEARCH_TYPES = ('tracks', 'albums', 'artists', 'composers')
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+# The number of prefixes whose matches are kept, for search as you type
+_PREFIX_CACHE_SIZE = 256
+
+# The least proportion of its three letter sequences which a word must share
+# with a word of a query to be taken as a misspelling of it
+_SIMILARITY = 0.5
+
+# Stands in for update ids of categories which have not been indexed
+_NOT_INDEXED = object()
+
+# Removes the combining marks (accents) left by NFKD normalisation: the
+# blocks of combining diacritical marks
+_COMBINING_MARKS = dict.fromkeys(
+    list(range(0x300, 0x370)) + list(range(0x1AB0, 0x1B00)) +
+    list(range(0x1DC0, 0x1E00)) + list(range(0x20D0, 0x2100)) +
+    list(range(0xFE20, 0xFE30)))
+
+
+def fold(text):
+    """Lower case a string, and remove its accents.
+
+    Args:
+        text (str): The string.
+
+    Returns:
+        str: The folded string.
+    """
+    try:
+        text.encode('ascii')
+    except UnicodeError:
+        text = unicodedata.normalize('NFKD', text).translate(_COMBINING_MARKS)
+    return text.lower()
+
+
+def tokenize(text):
+    """Split a string into folded words.
+
+    Args:
+        text (str): The string.
+
+    Returns:
+        list: The words.
+    """
+    return _WORD.findall(fold(text))
+
+
+def trigrams(word):
+    """Return the three letter sequences of a word, including those at its
+    start, which are padded with spaces.
+
+    Args:
+        word (str): The word.
+
+    Returns:
+        set: The sequences.
+    """
+    padded = '  ' + word
+    return set(padded[index:index + 3] for index in range(len(word)))
+
+
+class _Match(object):
+    """The docs which match a word of a query."""
+
+    __slots__ = ('levels', 'size', '_scores', '_narrowed')
+
+    def __init__(self, levels):
+        """
+        Args:
+            levels (dict): The sets of docs with each score. A doc may be in
+                sets with different scores, in which case its best score is
+                the one which counts.
+        """
+        #: list: ``(score, list of sets of docs)`` tuples, best score first.
+        self.levels = sorted(levels.items(), reverse=True)
+        #: int: The number of docs, counting those in several sets more
+        #: than once.
+        self.size = sum(len(docs) for groups in levels.values()
+                        for docs in groups)
+        self._scores = None
+        # Whether scores_of has been used
+        self._narrowed = False
+
+    def scores(self):
+        """Return a dict of the score of each doc."""
+        if self._scores is None:
+            scores = {}
+            # The best scores are applied last
+            for score, groups in reversed(self.levels):
+                for docs in groups:
+                    scores.update(dict.fromkeys(docs, score))
+            self._scores = scores
+        return self._scores
+
+    def scores_of(self, docs):
+        """Return a dict of the score of each of a set of docs which is in
+        the match.
+
+        This is much quicker than `scores` when there are few docs and the
+        match is large. If it is used more than once, `scores` is used
+        instead, as the dict is then kept for next time.
+        """
+        if self._scores is not None or self._narrowed:
+            scores = self.scores()
+            return dict((doc, scores[doc]) for doc in docs if doc in scores)
+        self._narrowed = True
+        remaining = set(docs)
+        scores = {}
+        for score, groups in self.levels:
+            for group in groups:
+                # Only as many docs as are remaining are looked at
+                found = remaining.intersection(group)
+                if found:
+                    scores.update(dict.fromkeys(found, score))
+                    remaining.difference_update(found)
+                    if not remaining:
+                        return scores
+        return scores
+
+
+class SearchIndex(object):
+    """An index of music library items, for ranked prefix searches.
+
+    Items are added in categories (eg ``'tracks'``), so that a category can
+    be brought up to date with `index_items` by only changing the items
+    which differ. The index is safe to use from several threads.
+    """
+
+    def __init__(self, fields=DEFAULT_FIELDS):
+        """
+        Args:
+            fields (tuple): The attributes which are indexed, as
+                ``(name, weight)`` tuples. Default `DEFAULT_FIELDS`.
+        """
+        super(SearchIndex, self).__init__()
+        self.fields = tuple(fields)
+        self._lock = threading.Lock()
+        self._next_doc = 0
+        # doc number: item
+        self._items = {}
+        # doc number: dict of word: weight
+        self._doc_words = {}
+        # search type: dict of identity: doc number
+        self._categories = {}
+        # search type: update id of the items indexed
+        self._update_ids = {}
+        # word: dict of weight: set of doc numbers
+        self._postings = {}
+        # three letter sequence: set of words
+        self._trigrams = {}
+        # All the words, sorted, or None if they have changed
+        self._sorted_words = None
+        # prefix: _Match
+        self._prefix_cache = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    def index_items(self, search_type, items):
+        """Bring a category up to date with a list of items.
+
+        Items which have been indexed already (with the same
+        `~soco.data_structures.DidlObject.identity` and
+        `~soco.data_structures.DidlObject.fingerprint`) are left alone, and
+        items in the category which are not in the list are removed.
+
+        Args:
+            search_type (str): The category, eg ``'tracks'``.
+            items (list): All the items in the category.
+
+        Returns:
+            tuple: The numbers of items added, changed and removed.
+        """
+        added = changed = 0
+        with self._lock:
+            old_docs = self._categories.get(search_type, {})
+            new_docs = {}
+            for item in items:
+                identity = item.identity
+                doc = old_docs.pop(identity, None)
+                if doc is not None:
+                    old_item = self._items[doc]
+                    if old_item is item or \
+                            old_item.fingerprint == item.fingerprint:
+                        new_docs[identity] = doc
+                        continue
+                    self._remove_doc(doc)
+                    changed += 1
+                elif identity in new_docs:
+                    # A duplicate
+                    continue
+                else:
+                    added += 1
+                new_docs[identity] = self._add_doc(item)
+            for doc in old_docs.values():
+                self._remove_doc(doc)
+            self._categories[search_type] = new_docs
+        return added, changed, len(old_docs)
+
+    def update_from_mirror(self, mirror, search_types=INDEXED_SEARCH_TYPES):
+        """Bring the index up to date with the categories of a library
+        mirror, re-indexing only those whose update id has changed.
+
+        Args:
+            mirror (`soco.library_mirror.LibraryMirror`): The mirror. Its
+                categories are fetched if they are not up to date.
+            search_types (tuple): The categories to index. Default
+                `INDEXED_SEARCH_TYPES`.
+
+        Returns:
+            list: The categories which were re-indexed.
+        """
+        updated = []
+        for search_type in search_types:
+            update_id, items = mirror.sync(search_type)
+            if self._update_ids.get(search_type, _NOT_INDEXED) != update_id:
+                self.index_items(search_type, items)
+                self._update_ids[search_type] = update_id
+                updated.append(search_type)
+        return updated
+
+    def search(self, query, limit=20, item_class=None):
+        """Find the items which best match a query.
+
+        Args:
+            query (str): The words to look for. Each must start a word of an
+                item (or be similar to one).
+            limit (int): The maximum number of items to return. Default 20.
+            item_class (str, optional): Only return items whose DIDL class
+                starts with this, eg ``'object.container.album'``.
+
+        Returns:
+            list: The items, best match first.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+        with self._lock:
+            matches = [self._matches(word) for word in set(words)]
+            items = self._items
+            if len(matches) == 1:
+                # Take the docs from the best scoring groups, until there are
+                # enough
+                best = []
+                seen = set()
+                for _, groups in matches[0].levels:
+                    for docs in groups:
+                        for doc in docs:
+                            if doc in seen:
+                                continue
+                            seen.add(doc)
+                            if item_class is None or items[doc].item_class.\
+                                    startswith(item_class):
+                                best.append(items[doc])
+                                if len(best) == limit:
+                                    return best
+                return best
+            # Start with the rarest word, so that the set of candidates
+            # shrinks as quickly as possible
+            matches.sort(key=lambda match: match.size)
+            scores = matches[0].scores()
+            for match in matches[1:]:
+                other_scores = match.scores_of(scores)
+                scores = dict((doc, score + other_scores[doc])
+                              for doc, score in scores.items()
+                              if doc in other_scores)
+                if not scores:
+                    return []
+            if item_class is not None:
+                scores = dict(
+                    (doc, score) for doc, score in scores.items()
+                    if items[doc].item_class.startswith(item_class))
+            best = heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+            return [items[doc] for doc, _ in best]
+
+    def _matches(self, word):
+        """Return the `_Match` of the docs which match a word of a query."""
+        match = self._prefix_cache.get(word)
+        if match is not None:
+            return match
+        if self._sorted_words is None:
+            self._sorted_words = sorted(self._postings)
+        sorted_words = self._sorted_words
+        index = bisect.bisect_left(sorted_words, word)
+        postings = self._postings
+        # score: list of sets of docs
+        levels = {}
+        while index < len(sorted_words):
+            other = sorted_words[index]
+            if not other.startswith(word):
+                break
+            # Whole words count for twice as much as prefixes
+            bonus = 2 if other == word else 1
+            for weight, docs in postings[other].items():
+                levels.setdefault(weight * bonus, []).append(docs)
+            index += 1
+        if not levels:
+            levels = self._similar_matches(word)
+        match = _Match(levels)
+        if len(self._prefix_cache) >= _PREFIX_CACHE_SIZE:
+            self._prefix_cache.clear()
+        self._prefix_cache[word] = match
+        return match
+
+    def _similar_matches(self, word):
+        """Return the docs which contain words similar to a word of a query
+        which matches nothing itself, as a dict of score: list of sets of
+        docs."""
+        counts = {}
+        word_trigrams = trigrams(word)
+        for trigram in word_trigrams:
+            for other in self._trigrams.get(trigram, ()):
+                counts[other] = counts.get(other, 0) + 1
+        levels = {}
+        for other, count in counts.items():
+            similarity = count / float(max(len(word_trigrams), len(other)))
+            if similarity < _SIMILARITY:
+                continue
+            for weight, docs in self._postings[other].items():
+                levels.setdefault(weight * similarity / 2, []).append(docs)
+        return levels
+
+    def _add_doc(self, item):
+        """Index an item, and return its doc number."""
+        doc = self._next_doc
+        self._next_doc += 1
+        weights = {}
+        for name, weight in self.fields:
+            value = getattr(item, name, None)
+            if not value:
+                continue
+            for word in tokenize(value):
+                if weight > weights.get(word, 0):
+                    weights[word] = weight
+        postings = self._postings
+        for word, weight in weights.items():
+            posting = postings.get(word)
+            if posting is None:
+                posting = postings[word] = {}
+                for trigram in trigrams(word):
+                    self._trigrams.setdefault(trigram, set()).add(word)
+                self._sorted_words = None
+            docs = posting.get(weight)
+            if docs is None:
+                docs = posting[weight] = set()
+            docs.add(doc)
+        self._items[doc] = item
+        self._doc_words[doc] = weights
+        self._prefix_cache.clear()
+        return doc
+
+    def _remove_doc(self, doc):
+        """Remove an item from the index."""
+        postings = self._postings
+        for word, weight in self._doc_words.pop(doc).items():
+            posting = postings[word]
+            docs = posting[weight]
+            docs.discard(doc)
+            if not docs:
+                del posting[weight]
+            if not posting:
+                del postings[word]
+                for trigram in trigrams(word):
+                    words = self._trigrams[trigram]
+                    words.discard(word)
+                    if not words:
+                        del self._trigrams[trigram]
+                self._sorted_words = None
+        del self._items[doc]
+        self._prefix_cache.clear()
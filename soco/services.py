@@ -39,8 +39,8 @@ from xml.sax.saxutils import escape
 
 import requests
 
-from .cache import Cache
-from .events import Subscription
+from .cache import Cache, browse_cache
+from .events import LazyDidlMetadata, Subscription
 from .exceptions import (
     SoCoUPnPException, UnknownSoCoException
 )
@@ -474,7 +474,8 @@ class Service(object):
             raise UnknownSoCoException(xml_error)
 
     def subscribe(
-            self, requested_timeout=None, auto_renew=False, event_queue=None):
+            self, requested_timeout=None, auto_renew=False, event_queue=None,
+            callback=None):
         """Subscribe to the service's events.
 
         Args:
@@ -489,7 +490,12 @@ class Service(object):
 
             event_queue (:class:`~queue.Queue`): a thread-safe queue object on
                 which received events will be put. If not specified,
-                a (:class:`~queue.Queue`) will be created and used.
+                a (:class:`~queue.Queue`) will be created and used, unless a
+                ``callback`` is given.
+            callback (callable): a function which will be called with each
+                received event. Further queues and callbacks can be added
+                with `Subscription.add_queue` and
+                `Subscription.add_callback`.
 
         Returns:
             `Subscription`: an insance of `Subscription`, representing
@@ -498,7 +504,7 @@ class Service(object):
         To unsubscribe, call the `unsubscribe` method on the returned object.
         """
         subscription = Subscription(
-            self, event_queue)
+            self, event_queue, callback)
         subscription.subscribe(
             requested_timeout=requested_timeout, auto_renew=auto_renew)
         return subscription
@@ -521,6 +527,40 @@ class Service(object):
         """
         pass
 
+    def _on_events_lost(self, sid):
+        """Forget any state taken from events, when events may have been
+        missed or will no longer be received.
+
+        This will be called when a gap is found in the sequence numbers of a
+        subscription's events, when the subscription is replaced or restored
+        (see `soco.events.ResyncEvent`), when an automatic renewal fails,
+        when it expires, and when it is unsubscribed.
+
+        ..  warning:: Like `_update_cache_on_event`, this method will not be
+            called from the main thread.
+
+        Args:
+            sid (str): The subscription id.
+        """
+        pass
+
+    def _refresh_evented_variables(self):
+        """Fetch the current values of the most important evented variables.
+
+        This is called when a gap in an event subscription's sequence numbers
+        shows that events have been lost. The values returned are put on the
+        subscription's event queue as an `Event`, so that consumers can bring
+        their state up to date without polling the device themselves.
+
+        Returns:
+            dict: A dict in the same form as the ``variables`` of an `Event`,
+            or `None` (the default) if this service does not support
+            refreshing.
+
+        ..  warning:: This method will not be called from the main thread.
+        """
+        return None
+
     def iter_actions(self):
         """Yield the service's actions with their arguments.
 
@@ -659,6 +699,11 @@ class ContentDirectory(Service):
     """UPnP standard Content Directory service, for functions relating to
     browsing, searching and listing available music."""
 
+    # The containers whose update ids are fetched after events have been
+    # missed: the music library, the shares, the Sonos playlists and the
+    # queue
+    _REFRESHED_CONTAINERS = ('A:', 'S:', 'SQ:', 'Q:0')
+
     def __init__(self, soco):
         super(ContentDirectory, self).__init__(soco)
         self.control_url = "/MediaServer/ContentDirectory/Control"
@@ -687,6 +732,40 @@ class ContentDirectory(Service):
             720: 'Cannot process the request',
         })
 
+    def _update_cache_on_event(self, event):
+        """Pass the update ids of changed containers to the device's
+        `soco.cache.BrowseCache`."""
+        browse_cache(self.soco.ip_address).update_from_event(event)
+
+    def _on_events_lost(self, sid):
+        """Stop trusting the update ids which the device's
+        `soco.cache.BrowseCache` has taken from events."""
+        browse_cache(self.soco.ip_address).forget_update_ids()
+
+    def _refresh_evented_variables(self):
+        """Fetch the current update ids of the top level containers.
+
+        Returns:
+            dict: the values, in the same form as they are evented.
+        """
+        values = []
+        for container in self._REFRESHED_CONTAINERS:
+            try:
+                response = self.Browse([
+                    ('ObjectID', container),
+                    ('BrowseFlag', 'BrowseMetadata'),
+                    ('Filter', '*'),
+                    ('StartingIndex', 0),
+                    ('RequestedCount', 1),
+                    ('SortCriteria', '')
+                ])
+            except SoCoUPnPException:
+                # Not every device has every container
+                log.debug("Unable to fetch the update id of %s", container)
+                continue
+            values.extend((container, response['UpdateID']))
+        return {'container_update_i_ds': ','.join(values)}
+
 
 class MS_ConnectionManager(Service):  # pylint: disable=invalid-name
 
@@ -709,6 +788,18 @@ class RenderingControl(Service):
         self.control_url = "/MediaRenderer/RenderingControl/Control"
         self.event_subscription_url = "/MediaRenderer/RenderingControl/Event"
 
+    def _refresh_evented_variables(self):
+        """Fetch the current master volume and mute state.
+
+        Returns:
+            dict: the values, in the same form as they are evented.
+        """
+        args = [('InstanceID', 0), ('Channel', 'Master')]
+        return {
+            'volume': {'Master': self.GetVolume(args)['CurrentVolume']},
+            'mute': {'Master': self.GetMute(args)['CurrentMute']},
+        }
+
 
 class MR_ConnectionManager(Service):  # pylint: disable=invalid-name
 
@@ -756,6 +847,26 @@ class AVTransport(Service):
             739: 'Server Error',
         })
 
+    def _refresh_evented_variables(self):
+        """Fetch the current transport state and track.
+
+        Returns:
+            dict: the values, in the same form as they are evented.
+        """
+        transport = self.GetTransportInfo([('InstanceID', 0)])
+        position = self.GetPositionInfo([('InstanceID', 0)])
+        metadata = position['TrackMetaData']
+        # As in events, the metadata is only parsed when it is used
+        if metadata.startswith('<DIDL-Lite'):
+            metadata = LazyDidlMetadata(metadata)
+        return {
+            'transport_state': transport['CurrentTransportState'],
+            'current_track': position['Track'],
+            'current_track_uri': position['TrackURI'],
+            'current_track_duration': position['TrackDuration'],
+            'current_track_meta_data': metadata,
+        }
+
 
 class Queue(Service):
 
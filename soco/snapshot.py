@@ -12,6 +12,8 @@ Warning:
     one use.
 """
 
+from .page_planner import page_planner
+
 
 class Snapshot(object):
     """A snapshot of the current state.
@@ -227,23 +229,27 @@ class Snapshot(object):
     def _save_queue(self):
         """Save the current state of the queue."""
         if self.queue is not None:
-            # Maximum batch is 486, anything larger will still only
-            # return 486
-            batch_size = 400
+            # The device returns at most a certain number of items at once
+            # (486 for the queue of current speakers), so the page size
+            # comes from what has been learnt about it
+            batch_size = page_planner(self.device.ip_address).page_size()
             total = 0
-            num_return = batch_size
 
-            # Need to get all the tracks in batches, but Only get the next
-            # batch if all the items requested were in the last batch
-            while num_return == batch_size:
+            # Need to get all the tracks in batches, until the queue has been
+            # read to the end, or the device returns nothing
+            while True:
                 queue_items = self.device.get_queue(total, batch_size)
                 # Check how many entries were returned
                 num_return = len(queue_items)
-                # Make sure the queue is not empty
-                if num_return > 0:
-                    self.queue.append(queue_items)
+                # Stop if the queue is empty
+                if num_return == 0:
+                    break
+                self.queue.append(queue_items)
                 # Update the total that have been processed
                 total = total + num_return
+                if total >= queue_items.total_matches:
+                    break
+                batch_size = page_planner(self.device.ip_address).page_size()
 
     def _restore_queue(self):
         """Restore the previous state of the queue.
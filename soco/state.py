@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=not-context-manager
+
+# NOTE: The pylint not-content-manager warning is disabled pending the fix of
+# a bug in pylint: https://github.com/PyCQA/pylint/issues/782
+
+"""An in-memory record of the state of Sonos devices, kept up to date by
+events.
+
+Reading a property such as `SoCo.volume` always makes a network request. If
+the same values are needed many times a second, for example to drive a user
+interface, a `DeviceStateStore` can be used instead. It subscribes to the
+events of the relevant services on each device, and folds the evented
+variables into a record for each device, which can be read without any
+network access::
+
+    from soco.state import DeviceStateStore
+
+    store = DeviceStateStore()
+    for device in soco.discover():
+        store.add(device)
+    ...
+    state = store.get(device)
+    print(state['volume'], state['transport_state'])
+
+The record for a device is a dict with some or all of these keys:
+
+* ``volume`` (int): the master volume.
+* ``mute`` (bool): whether the device is muted.
+* ``transport_state`` (str): eg ``'PLAYING'`` or ``'STOPPED'``.
+* ``play_mode`` (str): eg ``'NORMAL'`` or ``'SHUFFLE'``.
+* ``current_track`` (`DidlObject`): the metadata of the current track.
+* ``current_track_uri`` (str): the uri of the current track.
+* ``queue_update_id`` (int): the update id of the queue, which changes
+  whenever the queue does.
+"""
+
+from __future__ import unicode_literals
+
+import logging
+import threading
+import time
+
+from . import config
+from .events import ResyncEvent
+from .utils import parse_container_update_ids
+
+_LOG = logging.getLogger(__name__)
+
+#: The names of the services whose events are used to build the state.
+STATE_SERVICES = ('renderingControl', 'avTransport', 'contentDirectory')
+
+
+# evented variable name: (state key, conversion function)
+_FOLDERS = {
+    'volume': ('volume', lambda value: int(value['Master'])),
+    'mute': ('mute', lambda value: value['Master'] == '1'),
+    'transport_state': ('transport_state', None),
+    'current_play_mode': ('play_mode', None),
+    'current_track_meta_data': ('current_track', None),
+    'current_track_uri': ('current_track_uri', None),
+    'container_update_i_ds': (
+        'queue_update_id',
+        lambda value: parse_container_update_ids(value).get('Q:0')),
+}
+
+
+def fold_variables(variables):
+    """Convert evented variables to state values.
+
+    Args:
+        variables (dict): The variables of an `Event`.
+
+    Returns:
+        dict: the state values which can be derived from the variables.
+    """
+    changes = {}
+    for name, value in variables.items():
+        try:
+            key, convert = _FOLDERS[name]
+        except KeyError:
+            continue
+        if convert is not None:
+            try:
+                value = convert(value)
+            except (KeyError, TypeError, ValueError):
+                continue
+            if value is None:
+                continue
+        changes[key] = value
+    return changes
+
+
+class DeviceStateStore(object):
+    """Keeps an up to date record of the state of a number of devices.
+
+    The store subscribes to the `STATE_SERVICES` of each device added to it,
+    and updates the device's record from the events it receives. Records are
+    never modified in place: each change replaces the record with a new dict,
+    so a record returned by `get` is a consistent snapshot, which must be
+    treated as read-only.
+
+    If a device's subscriptions lapse, `get` keeps returning the last record,
+    and fetches the state over the network in the background, at most once
+    every `config.STATE_REFRESH_INTERVAL` seconds.
+    """
+
+    def __init__(self, requested_timeout=None):
+        """
+        Args:
+            requested_timeout (int, optional): The subscription timeout to
+                request. The subscriptions are renewed automatically.
+        """
+        super(DeviceStateStore, self).__init__()
+        self.requested_timeout = requested_timeout
+        self._lock = threading.Lock()
+        # device -> current record
+        self._states = {}
+        # device -> list of subscriptions
+        self._subscriptions = {}
+        self._callbacks = []
+        # device -> time at which the last background refresh was started
+        self._refresh_times = {}
+        # devices being refreshed in the background
+        self._refreshing = set()
+
+    def add(self, device):
+        """Start keeping track of a device's state.
+
+        If any of the subscriptions cannot be made, those which have been
+        made are unsubscribed, and the exception is raised.
+
+        Args:
+            device (SoCo): The device.
+        """
+        with self._lock:
+            if device in self._subscriptions:
+                return
+            self._states[device] = {}
+            self._subscriptions[device] = []
+        subscriptions = []
+        subscribed = False
+        try:
+            for name in STATE_SERVICES:
+                subscriptions.append(getattr(device, name).subscribe(
+                    requested_timeout=self.requested_timeout,
+                    auto_renew=True, callback=self._handle_event))
+            subscribed = True
+        finally:
+            if not subscribed:
+                # Undo what has been done, so that the device can be added
+                # again
+                with self._lock:
+                    self._subscriptions.pop(device, None)
+                    self._states.pop(device, None)
+                for subscription in subscriptions:
+                    try:
+                        subscription.unsubscribe()
+                    except Exception:  # pylint: disable=broad-except
+                        _LOG.exception("Unable to unsubscribe %s",
+                                       subscription.sid)
+        with self._lock:
+            self._subscriptions[device] = subscriptions
+
+    def remove(self, device):
+        """Stop keeping track of a device's state.
+
+        Args:
+            device (SoCo): The device.
+        """
+        with self._lock:
+            subscriptions = self._subscriptions.pop(device, [])
+            self._states.pop(device, None)
+            self._refresh_times.pop(device, None)
+        for subscription in subscriptions:
+            subscription.unsubscribe()
+
+    def close(self):
+        """Stop keeping track of all devices."""
+        for device in list(self._subscriptions):
+            self.remove(device)
+
+    @property
+    def devices(self):
+        """list: the devices whose state is being kept."""
+        with self._lock:
+            return list(self._states)
+
+    def is_healthy(self, device):
+        """Check whether a device's record is being kept up to date.
+
+        Args:
+            device (SoCo): The device.
+
+        Returns:
+            bool: `True` if all the device's subscriptions are live.
+        """
+        subscriptions = self._subscriptions.get(device)
+        if not subscriptions:
+            return False
+        return all(sub.is_subscribed and (
+            sub.timeout is None or sub.time_left > 0)
+                   for sub in subscriptions)
+
+    def get(self, device):
+        """Return the state of a device.
+
+        This never waits for the network. If the device's subscriptions have
+        lapsed, the last record is returned, and a refresh is started in the
+        background (see `refresh_in_background`).
+
+        Args:
+            device (SoCo): The device.
+
+        Returns:
+            dict: The device's record. It must not be modified.
+
+        Raises:
+            KeyError: if the device has not been added to the store.
+        """
+        state = self._states[device]
+        if not self.is_healthy(device):
+            self.refresh_in_background(device)
+        return state
+
+    def refresh_in_background(self, device):
+        """Start fetching the state of a device over the network in a
+        background thread.
+
+        Nothing is done if a refresh of the device is already in progress,
+        or if one was started less than `config.STATE_REFRESH_INTERVAL`
+        seconds ago.
+
+        Args:
+            device (SoCo): The device.
+
+        Returns:
+            `threading.Thread`: The thread, which has been started, or `None`
+            if no refresh was started.
+        """
+        now = time.time()
+        with self._lock:
+            last = self._refresh_times.get(device)
+            if device in self._refreshing or (
+                    last is not None and
+                    now - last < config.STATE_REFRESH_INTERVAL):
+                return None
+            self._refreshing.add(device)
+            self._refresh_times[device] = now
+
+        def run():
+            """Refresh the device, and log any error."""
+            try:
+                self.refresh(device)
+            except Exception:  # pylint: disable=broad-except
+                _LOG.exception("Unable to refresh the state of %s", device)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(device)
+
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def refresh(self, device):
+        """Fetch the state of a device over the network.
+
+        Args:
+            device (SoCo): The device.
+
+        Returns:
+            dict: The device's updated record.
+        """
+        changes = {}
+        for name in STATE_SERVICES:
+            # pylint: disable=protected-access
+            variables = getattr(device, name)._refresh_evented_variables()
+            changes.update(fold_variables(variables))
+        return self._update(device, changes)
+
+    def add_callback(self, callback):
+        """Register a function to be called when a device's state changes.
+
+        The function is called with three arguments: the device, a dict of
+        the values which have changed, and the device's new record. It is not
+        called from the main thread.
+
+        Args:
+            callback (callable): The function.
+        """
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        """Unregister a function registered with `add_callback`.
+
+        Args:
+            callback (callable): The function.
+        """
+        with self._lock:
+            self._callbacks.remove(callback)
+
+    def _update(self, device, changes):
+        """Fold changes into a device's record, and notify the callbacks."""
+        with self._lock:
+            state = self._states.get(device)
+            if state is None:
+                return {}
+            changes = dict((key, value) for key, value in changes.items()
+                           if key not in state or state[key] != value)
+            if not changes:
+                return state
+            state = dict(state)
+            state.update(changes)
+            self._states[device] = state
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback(device, changes, state)
+            except Exception:  # pylint: disable=broad-except
+                _LOG.exception("Error in state change callback %s", callback)
+        return state
+
+    def _handle_event(self, event):
+        """Update the state from an event. Called for each event received."""
+        device = event.service.soco
+        if isinstance(event, ResyncEvent):
+            # Events may have been missed, so start again from the device
+            self.refresh(device)
+        else:
+            self._update(device, fold_variables(event.variables))
@@ -8,6 +8,7 @@ from __future__ import (
 
 import functools
 import re
+import threading
 import warnings
 
 from .compat import (
@@ -186,3 +187,86 @@ def url_escape_path(path):
     """
     # Using 'safe' arg does not seem to work for python 2.6
     return quote_url(path.encode('utf-8')).replace('/', '%2F')
+
+
+def run_concurrently(function, items, max_workers):
+    """Call a function with each of a number of items, using a bounded number
+    of threads.
+
+    Args:
+        function (callable): The function, which takes a single argument.
+        items (iterable): The items to call it with. They must be hashable.
+        max_workers (int): The maximum number of calls in progress at once.
+
+    Returns:
+        tuple: A tuple of two dicts. The first maps each item for which the
+        call succeeded to its return value, and the second maps each item for
+        which the call raised an exception to that exception.
+    """
+    items = list(items)
+    results = {}
+    errors = {}
+    lock = threading.Lock()
+    # The workers share an iterator over the items, so that each item is
+    # taken by exactly one of them
+    item_iter = iter(items)
+
+    def worker():
+        """Call the function with items until there are none left."""
+        while True:
+            with lock:
+                try:
+                    item = next(item_iter)
+                except StopIteration:
+                    return
+            try:
+                result = function(item)
+            except Exception as error:  # pylint: disable=broad-except
+                with lock:
+                    errors[item] = error
+            else:
+                with lock:
+                    results[item] = result
+
+    threads = [threading.Thread(target=worker)
+               for _ in range(min(max_workers, len(items)))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def parse_container_update_ids(value):
+    """Parse the value of a ``ContainerUpdateIDs`` evented variable.
+
+    Args:
+        value (str): A comma separated list of container ids and update ids,
+            eg ``'A:,12,S:,3'``.
+
+    Returns:
+        dict: The update id (an `int`) of each container id. Update ids
+        which are not numbers are left out.
+    """
+    parts = value.split(',')
+    update_ids = {}
+    for container, update_id in zip(parts[::2], parts[1::2]):
+        try:
+            update_ids[container] = int(update_id)
+        except ValueError:
+            pass
+    return update_ids
+
+
+def container_of(object_id):
+    """Return the id of the top level container of an object.
+
+    Args:
+        object_id (str): The id of an object, eg ``'A:ALBUM/Black'``.
+
+    Returns:
+        str: The id of the container whose update id changes when the object
+        does, eg ``'A:'``.
+    """
+    return object_id.split(':', 1)[0] + ':'
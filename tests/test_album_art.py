@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""Tests for the album_art module."""
+
+from __future__ import unicode_literals
+
+import os
+import threading
+import time
+
+import mock
+import pytest
+import requests
+
+from soco.album_art import AlbumArtService, DiskLRU, normalize_uri
+from soco.data_structures import DidlMusicTrack
+from soco.music_library import MusicLibrary
+
+
+def test_normalize_uri():
+    # The speaker does not matter for /getaa URIs
+    assert normalize_uri('http://192.168.1.10:1400/getaa?u=x&s=1') == \
+        normalize_uri('http://192.168.1.11:1400/getaa?s=1&u=x') == \
+        normalize_uri('/getaa?s=1&u=x') == '/getaa?s=1&u=x'
+    assert normalize_uri('HTTPS://Art.Example.COM/a.jpg?b=2&a=1') == \
+        'https://art.example.com/a.jpg?a=1&b=2'
+    assert normalize_uri('http://example.com/a.jpg') != \
+        normalize_uri('http://example.org/a.jpg')
+
+
+def test_disk_lru(tmpdir):
+    directory = str(tmpdir.join('art'))
+    store = DiskLRU(directory, max_bytes=10)
+    store.put('a', b'1234')
+    store.put('b', b'5678')
+    assert store.get('a') == b'1234'
+    assert (len(store), store.total_bytes) == (2, 8)
+    # The least recently used value goes first
+    store.put('c', b'90')
+    store.put('d', b'xy')
+    assert 'b' not in store
+    assert store.get('b') is None
+    assert [store.get(key) for key in 'acd'] == [b'1234', b'90', b'xy']
+    assert store.total_bytes == 8
+    store.put('a', b'1')
+    assert store.total_bytes == 5
+    assert len(os.listdir(directory)) == 3
+
+    # The order is kept when the store is opened again
+    for age, key in enumerate('dac'):
+        path = os.path.join(directory, store._file_name(key))
+        os.utime(path, (1000 + age, 1000 + age))
+    with open(os.path.join(directory, 'left.1.tmp'), 'wb') as temp_file:
+        temp_file.write(b'partial')
+    store = DiskLRU(directory, max_bytes=3)
+    assert 'd' not in store
+    assert store.get('a') == b'1'
+    assert store.get('c') == b'90'
+    assert len(os.listdir(directory)) == 2
+
+    store.clear()
+    assert (len(store), store.total_bytes) == (0, 0)
+    assert os.listdir(directory) == []
+
+
+class FakeResponse(object):
+
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code != 200:
+            raise requests.exceptions.HTTPError(self.status_code)
+
+
+@pytest.fixture()
+def device():
+    device = mock.Mock()
+    device.ip_address = '192.168.1.10'
+    device.music_library = MusicLibrary(device)
+    return device
+
+
+def make_track(number, art=True):
+    return DidlMusicTrack(
+        title='Track {0}'.format(number), parent_id='Q:0',
+        item_id='Q:0/{0}'.format(number),
+        album_art_uri='/getaa?u=art{0}'.format(number) if art else '')
+
+
+def test_get_art(device, tmpdir):
+    art = AlbumArtService(device, str(tmpdir))
+    with mock.patch('soco.album_art.requests.get') as get:
+        get.return_value = FakeResponse(b'image 1')
+        assert art.get_art(make_track(1)) == b'image 1'
+        get.assert_called_once_with(
+            'http://192.168.1.10:1400/getaa?u=art1', timeout=10)
+        # From the cache, whichever speaker the URI is for
+        assert art.get_art(make_track(1)) == b'image 1'
+        assert art.get_art(
+            'http://192.168.1.11:1400/getaa?u=art1') == b'image 1'
+        assert get.call_count == 1
+        assert art.get_art(make_track(2, art=False)) is None
+
+        get.return_value = FakeResponse(b'', 404)
+        with pytest.raises(requests.exceptions.HTTPError):
+            art.get_art(make_track(3))
+        assert art.store.get('/getaa?u=art3') is None
+
+
+def test_prefetch(device, tmpdir):
+    art = AlbumArtService(device, str(tmpdir), max_workers=2)
+    lock = threading.Lock()
+    fetching = []
+    calls = []
+    most = [0]
+
+    def get(uri, timeout):
+        with lock:
+            calls.append(uri)
+            fetching.append(uri)
+            most[0] = max(most[0], len(fetching))
+        time.sleep(0.02)
+        with lock:
+            fetching.remove(uri)
+        if uri.endswith('art4'):
+            return FakeResponse(b'', 500)
+        return FakeResponse(uri[-4:].encode('ascii'), 200)
+
+    tracks = [make_track(number) for number in range(8)]
+    art.store.put('/getaa?u=art0', b'art0')
+    with mock.patch('soco.album_art.requests.get', side_effect=get):
+        # Two threads fetching the same image fetch it once
+        threads = [threading.Thread(target=art.get_art, args=(tracks[1],))
+                   for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert calls == ['http://192.168.1.10:1400/getaa?u=art1']
+
+        art.prefetch(tracks + tracks[:3] + [make_track(8, art=False)]).join()
+    assert most[0] == 2
+    assert sorted(calls[1:]) == [
+        'http://192.168.1.10:1400/getaa?u=art{0}'.format(number)
+        for number in range(2, 8)]
+    for number in range(8):
+        if number != 4:
+            assert art.get_art(tracks[number]) == \
+                'art{0}'.format(number).encode('ascii')
+
+
+def test_prefetch_queue(device, tmpdir):
+    art = AlbumArtService(device, str(tmpdir))
+    device.get_current_track_info.return_value = {'playlist_position': '3'}
+    device.get_queue.return_value = [make_track(4), make_track(5)]
+    with mock.patch('soco.album_art.requests.get',
+                    return_value=FakeResponse(b'image')) as get:
+        art.prefetch_queue(2).join()
+    device.get_queue.assert_called_once_with(3, 2)
+    assert get.call_count == 2
+    assert '/getaa?u=art5' in art.store
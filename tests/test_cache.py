@@ -4,8 +4,9 @@
 from __future__ import unicode_literals
 
 from soco.cache import (
-    Cache, NullCache, TimedCache
+    BrowseCache, Cache, NullCache, TimedCache, browse_cache
 )
+from soco.events import Event
 
 
 def test_instance_creation():
@@ -73,3 +74,54 @@ def test_cache_disable():
     assert cache.get('args') == None
     # Check it's there
     assert cache.get('some', kw='args') is None
+
+
+def test_browse_cache():
+    cache = BrowseCache(max_entries=2)
+    albums = {'Result': 'albums', 'UpdateID': '3'}
+    share = {'Result': 'share', 'UpdateID': '8'}
+    cache.put(albums, 'A:ALBUM', 0, 100)
+    cache.put(share, 'S://server/music', 0, 100)
+    # Nothing is known to be current without events
+    assert cache.get('A:ALBUM', 0, 100) is None
+    assert cache.peek('A:ALBUM', 0, 100) is albums
+    assert cache.peek('A:ALBUM', 0, 50) is None
+    assert cache.peek('A:ALBUM', 0, 100, sort_criteria='+dc:title') is None
+
+    cache.update_from_event(Event('sid', '0', None, 0, {
+        'container_update_i_ds': 'A:,3,S:,8'}))
+    assert cache.get('A:ALBUM', 0, 100) is albums
+    assert cache.get('S://server/music', 0, 100) is share
+    # Responses from changed containers are dropped
+    cache.update_from_event(Event('sid', '1', None, 0, {
+        'container_update_i_ds': 'S:,9'}))
+    assert cache.get('A:ALBUM', 0, 100) is albums
+    assert cache.peek('S://server/music', 0, 100) is None
+
+    # The least recently used response goes first
+    cache.put(share, 'S://server/music', 0, 100)
+    cache.peek('A:ALBUM', 0, 100)
+    cache.put(albums, 'A:ALBUM', 100, 100)
+    assert cache.peek('S://server/music', 0, 100) is None
+    assert cache.get('A:ALBUM', 100, 100) is albums
+
+    # Update ids are no longer trusted once events may have been missed
+    cache.forget_update_ids()
+    assert cache.get('A:ALBUM', 0, 100) is None
+    assert cache.peek('A:ALBUM', 0, 100) is albums
+    cache.update_from_event(Event('sid', '5', None, 0, {
+        'container_update_i_ds': 'A:,3'}))
+    assert cache.get('A:ALBUM', 0, 100) is albums
+
+    cache.delete('A:ALBUM', 100, 100)
+    assert cache.peek('A:ALBUM', 100, 100) is None
+    cache.clear()
+    assert cache.peek('A:ALBUM', 0, 100) is None
+    cache.put(albums, 'A:ALBUM', 0, 100)
+    assert cache.get('A:ALBUM', 0, 100) is None
+
+    cache.enabled = False
+    assert cache.peek('A:ALBUM', 0, 100) is None
+
+    assert browse_cache('192.168.1.1') is browse_cache('192.168.1.1')
+    assert browse_cache('192.168.1.1') is not browse_cache('192.168.1.2')
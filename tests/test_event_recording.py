@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Tests for the event_recording module."""
+
+from __future__ import unicode_literals
+
+import gzip
+
+import pytest
+
+from soco.event_recording import EventRecorder, read_recording
+
+
+def test_record_and_read(tmpdir):
+    path = str(tmpdir.join('events.rec'))
+    recorder = EventRecorder(path)
+    recorder.record(
+        1234.5, [('SID', 'uuid:123'), ('SEQ', '0')], b'<e:propertyset/>')
+    recorder.record(1235.25, [], b'')
+    recorder.close()
+    # Ignored once closed
+    recorder.record(1236, [], b'')
+    assert recorder.count == 2
+
+    assert list(read_recording(path)) == [
+        (1234.5, [('SID', 'uuid:123'), ('SEQ', '0')], b'<e:propertyset/>'),
+        (1235.25, [], b''),
+    ]
+
+
+def test_read_bad_recording(tmpdir):
+    path = str(tmpdir.join('events.rec'))
+    with gzip.open(path, 'wb') as recording:
+        recording.write(b'not a recording')
+    with pytest.raises(ValueError):
+        list(read_recording(path))
+
+    recorder = EventRecorder(path)
+    recorder.record(1234.5, [('SID', 'uuid:123')], b'<e:propertyset/>')
+    recorder.close()
+    with gzip.open(path, 'rb') as recording:
+        data = recording.read()
+    with gzip.open(path, 'wb') as recording:
+        recording.write(data[:-3])
+    with pytest.raises(ValueError):
+        list(read_recording(path))
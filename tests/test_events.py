@@ -3,10 +3,23 @@
 
 from __future__ import unicode_literals
 
+import pickle
+import socket
+import threading
+import time
+from io import BytesIO
+
+import mock
 import pytest
+import requests
 
+from soco import events
+from soco.data_structures import DidlMusicTrack
 from soco.events import (
-    Event, parse_event_xml
+    Event, EventNotifyHandler, EventQueue, EventSequenceTracker,
+    LazyDidlMetadata, RenewalScheduler, ResyncEvent, Subscription,
+    SubscriptionJournal, OVERFLOW_COALESCE,
+    OVERFLOW_DROP_OLDEST, SEQ_DUPLICATE, SEQ_GAP, SEQ_OK, parse_event_xml
 )
 
 
@@ -93,3 +106,548 @@ def test_event_parsing():
     assert event_dict['zone_group_state']
     assert event_dict['alarm_run_sequence'] == 'RINCON_000EXXXXXX0:56:0'
     assert event_dict['zone_group_id'] == "RINCON_000XXXX01400:57"
+
+
+AVT_EVENT = """
+<e:propertyset xmlns:e="urn:schemas-upnp-org:event-1-0">
+    <e:property>
+        <LastChange>&lt;Event xmlns=&quot;urn:schemas-upnp-org:metadata-1-0/AVT/&quot;
+            xmlns:r=&quot;urn:schemas-rinconnetworks-com:metadata-1-0/&quot;&gt;
+            &lt;InstanceID val=&quot;0&quot;&gt;
+            &lt;TransportState val=&quot;PLAYING&quot;/&gt;
+            &lt;CurrentTrackMetaData val=&quot;&amp;lt;DIDL-Lite
+            xmlns:dc=&amp;quot;http://purl.org/dc/elements/1.1/&amp;quot;
+            xmlns:upnp=&amp;quot;urn:schemas-upnp-org:metadata-1-0/upnp/&amp;quot;
+            xmlns=&amp;quot;urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/&amp;quot;&amp;gt;
+            &amp;lt;item id=&amp;quot;-1&amp;quot; parentID=&amp;quot;-1&amp;quot;
+            restricted=&amp;quot;true&amp;quot;&amp;gt;
+            &amp;lt;dc:title&amp;gt;Track One&amp;lt;/dc:title&amp;gt;
+            &amp;lt;upnp:class&amp;gt;object.item.audioItem.musicTrack&amp;lt;/upnp:class&amp;gt;
+            &amp;lt;/item&amp;gt;&amp;lt;/DIDL-Lite&amp;gt;&quot;/&gt;
+            &lt;r:NextTrackURI val=&quot;x-file-cifs://server/02.mp3&quot;/&gt;
+            &lt;CurrentSection&gt;3&lt;/CurrentSection&gt;
+            &lt;r:EnqueuedTransportURIMetaData/&gt;
+            &lt;/InstanceID&gt;&lt;/Event&gt;</LastChange>
+    </e:property>
+</e:propertyset>
+"""
+
+RCS_EVENT = """
+<e:propertyset xmlns:e="urn:schemas-upnp-org:event-1-0">
+    <e:property>
+        <LastChange>&lt;Event xmlns=&quot;urn:schemas-upnp-org:metadata-1-0/RCS/&quot;&gt;
+            &lt;InstanceID val=&quot;0&quot;&gt;
+            &lt;Volume channel=&quot;Master&quot; val=&quot;36&quot;/&gt;
+            &lt;Volume channel=&quot;LF&quot; val=&quot;100&quot;/&gt;
+            &lt;Mute channel=&quot;Master&quot; val=&quot;0&quot;/&gt;
+            &lt;Bass val=&quot;2&quot;/&gt;
+            &lt;/InstanceID&gt;&lt;/Event&gt;</LastChange>
+    </e:property>
+</e:propertyset>
+"""
+
+
+def test_last_change_parsing():
+    variables = parse_event_xml(RCS_EVENT.encode('utf-8'))
+    assert variables == {
+        'volume': {'Master': '36', 'LF': '100'},
+        'mute': {'Master': '0'},
+        'bass': '2',
+    }
+
+    variables = parse_event_xml(AVT_EVENT.encode('utf-8'))
+    assert variables['transport_state'] == 'PLAYING'
+    assert variables['next_track_uri'] == 'x-file-cifs://server/02.mp3'
+    # Sonos sometimes sends the value as text
+    assert variables['current_section'] == '3'
+    # and sometimes no value at all
+    assert variables['enqueued_transport_uri_meta_data'] is None
+
+
+def test_last_change_metadata_is_lazy():
+    variables = parse_event_xml(AVT_EVENT.encode('utf-8'))
+    metadata = variables['current_track_meta_data']
+    assert isinstance(metadata, LazyDidlMetadata)
+    assert not metadata.is_parsed
+    # Comparing two proxies does not parse them
+    again = parse_event_xml(AVT_EVENT.encode('utf-8'))
+    assert metadata == again['current_track_meta_data']
+    assert not metadata.is_parsed
+    # Using it does
+    assert metadata.title == 'Track One'
+    assert metadata.is_parsed
+    assert metadata.item.item_class == 'object.item.audioItem.musicTrack'
+    assert metadata == metadata.item
+    with pytest.raises(AttributeError):
+        metadata.non_existent
+
+
+def test_lazy_didl_metadata_stands_in_for_the_item():
+    variables = parse_event_xml(AVT_EVENT.encode('utf-8'))
+    metadata = variables['current_track_meta_data']
+    # Checking for the proxy does not parse it, but checking for the class
+    # of the item does
+    assert isinstance(metadata, LazyDidlMetadata)
+    assert not metadata.is_parsed
+    assert isinstance(metadata, DidlMusicTrack)
+    assert metadata.is_parsed
+    assert hash(metadata) == hash(metadata.item)
+    assert metadata.item in set([metadata])
+    # Pickling keeps the parsed item
+    copied = pickle.loads(pickle.dumps(metadata))
+    assert type(copied) is LazyDidlMetadata
+    assert copied.is_parsed
+    assert copied == metadata
+
+    # Metadata which cannot be parsed has no attributes
+    broken = LazyDidlMetadata('<DIDL-Lite><item>')
+    assert not isinstance(broken, DidlMusicTrack)
+    assert not hasattr(broken, 'title')
+    with pytest.raises(AttributeError):
+        broken.title
+
+
+def test_renewal_scheduler():
+    scheduler = RenewalScheduler()
+    calls = []
+    done = threading.Event()
+
+    def callback():
+        calls.append('renewed')
+        if len(calls) == 3:
+            done.set()
+            return None
+        return 0.01
+
+    scheduler.schedule('sub', 0.01, callback)
+    assert done.wait(5)
+    assert calls == ['renewed'] * 3
+
+    # A cancelled call is never made
+    cancelled = threading.Event()
+    scheduler.schedule('other', 0.05, cancelled.set)
+    scheduler.cancel('other')
+    assert not cancelled.wait(0.2)
+
+
+def test_renewal_scheduler_reschedule_replaces():
+    scheduler = RenewalScheduler()
+    calls = []
+    done = threading.Event()
+
+    def first():
+        calls.append('first')
+
+    def second():
+        calls.append('second')
+        done.set()
+
+    scheduler.schedule('sub', 0.05, first)
+    scheduler.schedule('sub', 0.01, second)
+    assert done.wait(5)
+    assert not threading.Event().wait(0.1)
+    assert calls == ['second']
+
+
+@pytest.yield_fixture()
+def listening_subscription():
+    """A subscription to a dummy service, with no network access."""
+    service = mock.Mock()
+    service.soco.ip_address = '192.168.1.101'
+    service.base_url = 'http://192.168.1.101:1400'
+    service.service_type = 'AVTransport'
+    service.event_subscription_url = '/MediaRenderer/AVTransport/Event'
+    with mock.patch('soco.events.event_listener') as listener:
+        listener.is_running = True
+        listener.address = ('192.168.1.2', 1400)
+        with mock.patch('soco.events.requests.request') as request:
+            request.return_value.headers = {
+                'sid': 'uuid:old', 'timeout': 'Second-100'}
+            sub = Subscription(service)
+            sub.subscribe()
+            yield sub, request
+            request.return_value.headers = {}
+            sub.unsubscribe()
+
+
+def test_auto_renew_resubscribes_on_failure(listening_subscription):
+    sub, request = listening_subscription
+    assert events._sid_to_event_queue['uuid:old'] is sub._dispatcher
+
+    # The speaker no longer recognises the sid
+    request.return_value.raise_for_status.side_effect = \
+        requests.exceptions.HTTPError('412 Precondition Failed')
+    delay = sub._auto_renew()
+    assert delay == events.config.EVENT_RESUBSCRIBE_BACKOFF_MIN
+    # Back off while it keeps failing
+    assert sub._auto_renew() == 2 * delay
+    assert sub.sid == 'uuid:old'
+
+    # And resubscribe when it is reachable again
+    request.return_value.raise_for_status.side_effect = None
+    request.return_value.headers = {
+        'sid': 'uuid:new', 'timeout': 'Second-100'}
+    assert 0 < sub._auto_renew() <= 85
+    assert sub.sid == 'uuid:new'
+    assert 'Callback' in request.call_args[1]['headers']
+    assert 'uuid:old' not in events._sid_to_event_queue
+    assert events._sid_to_event_queue['uuid:new'] is sub._dispatcher
+    assert events._sid_to_service['uuid:new'] is sub.service
+
+    # Events were lost from the failed renewal until the resubscription
+    assert sub.service._on_events_lost.call_args_list == [
+        mock.call('uuid:old')] * 3
+
+    event = sub.events.get_nowait()
+    assert isinstance(event, ResyncEvent)
+    assert event.resynced
+    assert event.old_sid == 'uuid:old'
+    assert event.sid == 'uuid:new'
+    assert sub.events.empty()
+
+
+def test_subscription_expiry_and_unsubscribe(listening_subscription):
+    sub, request = listening_subscription
+    # A subscription which is not renewed tells its service when it expires
+    assert 99 < sub._check_expiry() <= 100
+    assert not sub.service._on_events_lost.called
+    with mock.patch('soco.events.time.time', return_value=time.time() + 101):
+        assert sub._check_expiry() is None
+    sub.service._on_events_lost.assert_called_once_with('uuid:old')
+    sub.service._on_events_lost.reset_mock()
+    request.return_value.headers = {}
+    sub.unsubscribe()
+    sub.service._on_events_lost.assert_called_once_with('uuid:old')
+
+
+def test_sequence_tracker():
+    tracker = EventSequenceTracker()
+    assert tracker.check('sid1', '0') == SEQ_OK
+    assert tracker.check('sid1', '1') == SEQ_OK
+    assert tracker.check('sid1', '1') == SEQ_DUPLICATE
+    assert tracker.check('sid1', '0') == SEQ_DUPLICATE
+    assert tracker.check('sid1', '4') == SEQ_GAP
+    assert tracker.check('sid1', '5') == SEQ_OK
+    # Sequence numbers wrap from 4294967295 to 1
+    assert tracker.check('sid2', '4294967295') == SEQ_GAP
+    assert tracker.check('sid2', '1') == SEQ_OK
+    assert tracker.check('sid2', '4294967295') == SEQ_DUPLICATE
+    assert tracker.stats('sid1') == {'gaps': 1, 'duplicates': 2}
+    assert tracker.stats('sid2') == {'gaps': 1, 'duplicates': 1}
+    assert tracker.gaps == 2
+    assert tracker.duplicates == 3
+    tracker.forget('sid1')
+    assert tracker.stats('sid1') == {'gaps': 0, 'duplicates': 0}
+    # A new subscription starts again at 0
+    assert tracker.check('sid1', '0') == SEQ_OK
+
+
+def test_sequence_tracker_out_of_order():
+    tracker = EventSequenceTracker()
+    assert tracker.check('sid', '0') == SEQ_OK
+    # Event 2 overtakes event 1, which is still accepted when it arrives
+    assert tracker.check('sid', '2') == SEQ_GAP
+    assert tracker.check('sid', '1') == SEQ_OK
+    assert tracker.check('sid', '1') == SEQ_DUPLICATE
+    assert tracker.check('sid', '3') == SEQ_OK
+    # Events too old to tell are dropped
+    assert tracker.check('sid', '100') == SEQ_GAP
+    assert tracker.check('sid', '10') == SEQ_DUPLICATE
+    assert tracker.check('sid', '99') == SEQ_OK
+    assert tracker.stats('sid') == {'gaps': 2, 'duplicates': 2}
+
+
+def notify(sid, seq, body=DUMMY_EVENT):
+    """Simulate the receipt of a NOTIFY request by the event listener."""
+    body = body.encode('utf-8')
+    handler = EventNotifyHandler.__new__(EventNotifyHandler)
+    handler.headers = {
+        'SID': sid, 'SEQ': seq, 'Content-Length': str(len(body))}
+    handler.rfile = BytesIO(body)
+    handler.send_response = mock.Mock()
+    handler.end_headers = mock.Mock()
+    handler.do_NOTIFY()
+    handler.send_response.assert_called_once_with(200)
+
+
+def test_notify_drops_duplicates_and_refreshes_on_gaps():
+    service = mock.Mock()
+    service._refresh_evented_variables.return_value = {'volume': '10'}
+    queue = events.Queue()
+    with mock.patch.dict(events._sid_to_service, {'uuid:1': service}):
+        with mock.patch.dict(events._sid_to_event_queue, {'uuid:1': queue}):
+            notify('uuid:1', '0')
+            notify('uuid:1', '0')
+            assert queue.qsize() == 1
+            assert not service._refresh_evented_variables.called
+            assert not service._on_events_lost.called
+            notify('uuid:1', '3')
+            assert queue.qsize() == 3
+            service._on_events_lost.assert_called_once_with('uuid:1')
+    events.sequence_tracker.forget('uuid:1')
+    assert queue.get().seq == '0'
+    assert queue.get().zone_group_name == 'Kitchen'
+    refresh = queue.get()
+    assert refresh.seq is None
+    assert refresh.variables == {'volume': '10'}
+
+
+def test_notify_handler_recorder():
+    recorder = mock.Mock()
+    with mock.patch.object(EventNotifyHandler, 'recorder', recorder):
+        notify('uuid:unknown', '0')
+    timestamp, headers, body = recorder.record.call_args[0]
+    assert dict(headers)['SID'] == 'uuid:unknown'
+    assert body == DUMMY_EVENT.encode('utf-8')
+
+
+def test_event_queue_overflow():
+    with pytest.raises(ValueError):
+        EventQueue(1, 'explode')
+
+    queue = EventQueue(2, OVERFLOW_DROP_OLDEST)
+    for seq in '123':
+        queue.put(Event('sid', seq, None, 0, {'volume': seq}))
+    assert queue.overflowed == 1
+    assert [queue.get().seq for _ in range(2)] == ['2', '3']
+
+    queue = EventQueue(2, OVERFLOW_COALESCE)
+    queue.put(Event('sid1', '1', None, 0, {'volume': '1', 'mute': '0'}))
+    queue.put(Event('sid2', '1', None, 0, {'bass': '1'}))
+    queue.put(Event('sid1', '2', None, 0, {'volume': '2'}))
+    assert queue.qsize() == 2
+    first = queue.get()
+    assert first.seq == '2'
+    assert first.variables == {'volume': '2', 'mute': '0'}
+    assert queue.get().sid == 'sid2'
+    assert queue.overflowed == 1
+
+
+def test_subscription_fan_out(listening_subscription):
+    sub, _ = listening_subscription
+    received = []
+    sub.add_callback(received.append)
+    bounded = sub.add_queue(maxsize=1, overflow=OVERFLOW_DROP_OLDEST)
+    with mock.patch.object(sub.service, '_refresh_evented_variables'):
+        notify('uuid:old', '0')
+        notify('uuid:old', '1')
+    events.sequence_tracker.forget('uuid:old')
+    # Every consumer gets the same event objects
+    assert len(received) == 2
+    assert sub.events.get() is received[0]
+    assert sub.events.get() is received[1]
+    assert bounded.get() is received[1]
+    assert bounded.empty()
+
+    sub.remove_callback(received.append)
+    sub.remove_queue(bounded)
+    notify('uuid:old', '2')
+    events.sequence_tracker.forget('uuid:old')
+    assert len(received) == 2
+    assert bounded.empty()
+    assert sub.events.get().seq == '2'
+
+
+def test_subscription_with_callback_only():
+    callback = mock.Mock()
+    sub = Subscription(mock.Mock(), callback=callback)
+    assert sub.events is None
+    sub._dispatcher.put('event')
+    callback.assert_called_once_with('event')
+
+
+def test_subscribe_many():
+    services = [mock.Mock(), mock.Mock(), mock.Mock()]
+    for service in services:
+        service.base_url = 'http://192.168.1.101:1400'
+        service.event_subscription_url = '/MediaRenderer/AVTransport/Event'
+    services[1].subscribe.side_effect = requests.exceptions.ConnectionError
+    queue = EventQueue()
+    with mock.patch('soco.events.event_listener') as listener:
+        listener.is_running = False
+        subscriptions, errors = events.subscribe_many(
+            services, requested_timeout=60, event_queue=queue)
+    # The listener is started once, up front
+    listener.start.assert_called_once_with(services[0].soco)
+    assert set(subscriptions) == set([services[0], services[2]])
+    assert subscriptions[services[0]] is services[0].subscribe.return_value
+    assert list(errors) == [services[1]]
+    for service in services:
+        service.subscribe.assert_called_once_with(
+            requested_timeout=60, auto_renew=False, event_queue=queue,
+            callback=None)
+
+
+def test_unsubscribe_all(listening_subscription):
+    sub, request = listening_subscription
+    assert sub in events._live_subscriptions
+    request.return_value.headers = {}
+    assert events.unsubscribe_all() == {}
+    assert not sub.is_subscribed
+    assert sub not in events._live_subscriptions
+    request.assert_called_with(
+        'UNSUBSCRIBE',
+        'http://192.168.1.101:1400/MediaRenderer/AVTransport/Event',
+        headers={'SID': 'uuid:old'})
+
+
+@pytest.yield_fixture()
+def journal_path(tmpdir):
+    """Enable the subscription journal, in a temporary file."""
+    path = str(tmpdir.join('journal.json'))
+    with mock.patch('soco.events.config.EVENT_JOURNAL_PATH', path):
+        with mock.patch('soco.events.subscription_journal',
+                        SubscriptionJournal()):
+            yield path
+
+
+def test_subscription_journal(journal_path, listening_subscription):
+    sub, request = listening_subscription
+    journal = events.subscription_journal
+    # Written to disk, and readable by a new journal
+    entries = SubscriptionJournal(journal_path).entries()
+    assert len(entries) == 1
+    entry = entries[0]
+    assert entry['sid'] == 'uuid:old'
+    assert entry['event_subscription_url'] == sub.service.event_subscription_url
+    assert entry['timeout'] == 100
+    assert entry['callback'] == ['192.168.1.2', 1400]
+    assert entry['auto_renew'] is False
+
+    # A renewal updates the entry
+    request.return_value.headers = {'timeout': 'Second-200'}
+    sub.renew()
+    assert SubscriptionJournal(journal_path).entries()[0]['timeout'] == 200
+
+    request.return_value.headers = {}
+    sub.unsubscribe()
+    assert journal.entries() == []
+    assert SubscriptionJournal(journal_path).entries() == []
+
+
+class DummyDevice(object):
+    """A device with a single service."""
+
+    def __init__(self, ip_address):
+        self.ip_address = ip_address
+        self.avTransport = mock.Mock()
+        self.avTransport.soco = self
+        self.avTransport.base_url = 'http://{0}:1400'.format(ip_address)
+        self.avTransport.service_type = 'AVTransport'
+        self.avTransport.event_subscription_url = \
+            '/MediaRenderer/AVTransport/Event'
+
+
+@pytest.mark.parametrize('renew_fails', [False, True])
+def test_restore_subscriptions(journal_path, renew_fails):
+    device = DummyDevice('192.168.1.101')
+    service = device.avTransport
+    with mock.patch('soco.events.event_listener') as listener:
+        listener.is_running = True
+        listener.address = ('192.168.1.2', 1400)
+        with mock.patch('soco.events.requests.request') as request:
+            request.return_value.headers = {
+                'sid': 'uuid:old', 'timeout': 'Second-100'}
+            Subscription(service).subscribe()
+            # The program exits without unsubscribing, and restarts
+            events._live_subscriptions.clear()
+            events.subscription_journal = SubscriptionJournal()
+
+            request.reset_mock()
+            if renew_fails:
+                request.side_effect = [
+                    requests.exceptions.HTTPError('412'), request.return_value]
+                request.return_value.headers = {
+                    'sid': 'uuid:new', 'timeout': 'Second-100'}
+            with mock.patch('soco.core.SoCo', return_value=device):
+                subscriptions, errors = events.restore_subscriptions()
+            assert errors == {}
+            sub = subscriptions[service]
+            headers = request.call_args_list[0][1]['headers']
+            assert headers['SID'] == 'uuid:old'
+            if renew_fails:
+                # A new subscription is made instead
+                assert sub.sid == 'uuid:new'
+                assert sub.events.empty()
+            else:
+                assert sub.sid == 'uuid:old'
+                assert isinstance(sub.events.get_nowait(), ResyncEvent)
+                # The sequence numbers carry on from before
+                assert events.sequence_tracker.check(sub.sid, 7) == SEQ_OK
+            assert events._sid_to_event_queue[sub.sid] is sub._dispatcher
+            assert [entry['sid'] for entry in
+                    SubscriptionJournal(journal_path).entries()] == [sub.sid]
+            request.side_effect = None
+            request.return_value.headers = {}
+            sub.unsubscribe()
+
+
+def test_event_reorderer():
+    reorderer = events._EventReorderer(delay=1)
+
+    def add(sid, seq, now=0):
+        return [(event[0], event[1]) for event in reorderer.add(
+            (sid, str(seq), now, {}), now)]
+
+    assert add('a', 0) == [('a', '0')]
+    # Events which overtake earlier ones are held back until they arrive
+    assert add('a', 2) == []
+    assert add('a', 3) == []
+    assert add('b', 0) == [('b', '0')]
+    assert reorderer.next_deadline() == 1
+    assert add('a', 1) == [('a', '1'), ('a', '2'), ('a', '3')]
+    assert reorderer.next_deadline() is None
+    # Or until they are given up on
+    assert add('a', 6, now=5) == []
+    assert add('a', 5, now=5.5) == []
+    assert reorderer.expire(5.9) == []
+    assert [event[1] for event in reorderer.expire(6)] == ['5', '6']
+    assert add('a', 7, now=6) == [('a', '7')]
+    # Late and repeated events are passed on
+    assert add('a', 4, now=6) == [('a', '4')]
+    assert add('a', 9, now=6) == []
+    assert [event[1] for event in reorderer.flush()] == ['9']
+
+
+@pytest.mark.skipif(not hasattr(socket, 'SO_REUSEPORT'),
+                    reason='SO_REUSEPORT is not supported')
+def test_sharded_event_listener():
+    # Find a free port
+    probe = socket.socket()
+    probe.bind(('127.0.0.1', 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    service = mock.Mock()
+    service._refresh_evented_variables.return_value = None
+    listener = events.EventListener()
+    with mock.patch.multiple(
+            'soco.events.config', EVENT_LISTENER_IP='127.0.0.1',
+            EVENT_LISTENER_PORT=port, EVENT_LISTENER_PROCESSES=2):
+        listener.start(None)
+    try:
+        sub = Subscription(service)
+        sub.sid = 'uuid:sharded'
+        with mock.patch.object(events, 'event_listener', listener):
+            sub._register(auto_renew=False)
+        url = 'http://127.0.0.1:{0}/'.format(port)
+        for seq in range(2):
+            for sid in ('uuid:sharded', 'uuid:unknown'):
+                # The shards may not have started listening yet
+                for _ in range(50):
+                    try:
+                        response = requests.request(
+                            'NOTIFY', url, data=RCS_EVENT.encode('utf-8'),
+                            headers={'SID': sid, 'SEQ': str(seq)})
+                        break
+                    except requests.exceptions.ConnectionError:
+                        time.sleep(0.1)
+                assert response.status_code == 200
+        for seq in range(2):
+            event = sub.events.get(timeout=5)
+            assert event.sid == 'uuid:sharded'
+            assert event.seq == str(seq)
+            assert event.volume['Master'] == '36'
+        assert sub.events.empty()
+    finally:
+        listener.stop()
+        events._live_subscriptions.discard(sub)
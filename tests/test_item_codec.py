@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Tests for the item_codec module."""
+
+from __future__ import unicode_literals
+
+import io
+import mmap
+import pickle
+
+import pytest
+
+from soco import item_codec
+from soco.data_structures import (
+    DidlMusicAlbum, DidlMusicTrack, DidlPlaylistContainer, DidlResource
+)
+from soco.music_services.data_structures import get_class
+
+
+def make_items():
+    resource = DidlResource(
+        uri='x-file-cifs://server/track.mp3',
+        protocol_info='x-file-cifs:*:audio/mpeg:*', size=1234,
+        duration='0:03:21')
+    track = DidlMusicTrack(
+        title='Fjögur píanó', parent_id='A:TRACKS', item_id='S://track.mp3',
+        resources=[resource], creator='Sigur Rós', album='Valtari',
+        original_track_number=8, desc='RINCON_AssociatedZPUDN')
+    track.extra = {'rating': -3, 'score': 0.5, 'tags': ['a', 'b']}
+    album = DidlMusicAlbum(
+        title='Valtari', parent_id='A:ALBUM', item_id='A:ALBUM/Valtari',
+        creator='Sigur Rós')
+    playlist = DidlPlaylistContainer(
+        title='Mine', parent_id='SQ:', item_id='SQ:1', restricted=False)
+    ms_track = get_class('MediaMetadataTrack')(
+        item_id='0fffffffid', desc='SA_RINCON5127_X', resources=[resource],
+        uri='x-sonos-http:id.mp3', metadata_dict={
+            'id': 'id', 'title': 'A stream',
+            'trackMetadata': {'artist': 'An artist', 'duration': '123'}})
+    return [track, album, playlist, ms_track, None, 12345678901234, 'text']
+
+
+def assert_items_equal(decoded, items):
+    assert len(decoded) == len(items)
+    for got, expected in zip(decoded, items):
+        assert type(got) is type(expected)
+        if hasattr(expected, 'metadata'):
+            assert got.item_id == expected.item_id
+            assert got.resources == expected.resources
+            assert got.music_service is None
+            assert got.title == expected.title
+            assert got.track_metadata.metadata == \
+                expected.track_metadata.metadata
+        else:
+            assert got == expected
+            if hasattr(expected, '__dict__'):
+                assert got.__dict__ == expected.__dict__
+
+
+def test_encode_and_decode():
+    items = make_items()
+    data = item_codec.encode(items)
+    assert data.startswith(item_codec.MAGIC)
+    assert_items_equal(list(item_codec.decode(data)), items)
+    # Repeated values are only written once
+    assert data.count('Sigur Rós'.encode('utf-8')) == 1
+    assert len(item_codec.encode(items * 2)) < 1.5 * len(data)
+    # For more than a few items, it is smaller than a pickle (which cannot
+    # handle the music service item at all)
+    tracks = [DidlMusicTrack(
+        title='Track {0}'.format(index), parent_id='A:TRACKS',
+        item_id='S://{0}.mp3'.format(index), creator='Artist',
+        album='Album', original_track_number=index) for index in range(100)]
+    assert len(item_codec.encode(tracks)) < len(
+        pickle.dumps(tracks, pickle.HIGHEST_PROTOCOL))
+
+
+def test_stream_and_mmap(tmpdir):
+    items = make_items()
+    path = str(tmpdir.join('items.bin'))
+    with io.open(path, 'wb') as items_file:
+        encoder = item_codec.ItemEncoder(items_file)
+        for item in items:
+            encoder.write(item)
+    with io.open(path, 'rb') as items_file:
+        data = mmap.mmap(items_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            decoded = list(item_codec.ItemDecoder(data))
+        finally:
+            data.close()
+    assert_items_equal(decoded, items)
+
+
+def test_bad_encodings():
+    with pytest.raises(ValueError):
+        item_codec.ItemDecoder(b'not an encoding')
+    with pytest.raises(ValueError):
+        item_codec.ItemDecoder(item_codec.MAGIC[:-1] + b'\x63')
+    with pytest.raises(TypeError):
+        item_codec.encode([object()])
+    with pytest.raises(TypeError):
+        item_codec.encode([{1: 2}])
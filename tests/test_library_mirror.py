@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""Tests for the library_mirror module."""
+
+from __future__ import unicode_literals
+
+import time
+
+import mock
+import pytest
+
+from soco.data_structures import DidlMusicAlbum, SearchResult
+from soco.events import Event, ResyncEvent
+from soco.exceptions import SoCoUPnPException
+from soco.library_mirror import (
+    LibraryMirror, container_of, parse_container_update_ids
+)
+from soco.music_library import MusicLibrary
+
+
+def make_albums(count):
+    return [DidlMusicAlbum(
+        title='Album {0}'.format(index), parent_id='A:ALBUM',
+        item_id='A:ALBUM/Album%20{0}'.format(index),
+        album_art_uri='/getaa?u=art{0}'.format(index))
+            for index in range(count)]
+
+
+@pytest.fixture()
+def music_library():
+    """A mock music library with 5 albums, at update id 3."""
+    music_library = mock.Mock()
+    music_library.SEARCH_TRANSLATION = MusicLibrary.SEARCH_TRANSLATION
+    music_library.albums = make_albums(5)
+    music_library.update_id = 3
+
+    def get_music_library_information(search_type, **kwargs):
+        if search_type != 'albums':
+            return SearchResult([], search_type, 0, 0, None)
+        albums = music_library.albums
+        return SearchResult(list(albums), 'albums', len(albums), len(albums),
+                            music_library.update_id)
+
+    def music_lib_search(search, start, max_items, cached=True):
+        if search != 'A:ALBUM':
+            raise SoCoUPnPException('No such object', '701', '')
+        return {}, {'update_id': music_library.update_id}
+
+    music_library.get_music_library_information.side_effect = \
+        get_music_library_information
+    music_library._music_lib_search.side_effect = music_lib_search
+    music_library.soco._update_album_art_to_full_uri.side_effect = \
+        lambda item: setattr(item, 'album_art_uri',
+                             'http://host' + item.album_art_uri)
+    return music_library
+
+
+def test_parse_container_update_ids():
+    assert parse_container_update_ids('A:,12,S:,3,Q:0,x') == {
+        'A:': 12, 'S:': 3}
+    assert parse_container_update_ids('') == {}
+    assert container_of('A:ALBUM/Black') == 'A:'
+    assert container_of('S://server/music') == 'S:'
+    assert container_of('SQ:') == 'SQ:'
+
+
+def test_mirror_answers_queries(music_library):
+    mirror = LibraryMirror(music_library)
+    assert not mirror.is_current('albums')
+    result = mirror.get_albums(start=1, max_items=2)
+    assert [item.title for item in result] == ['Album 1', 'Album 2']
+    assert (result.number_returned, result.total_matches,
+            result.update_id, result.search_type) == (2, 5, 3, 'albums')
+    assert mirror.is_current('albums')
+
+    result = mirror.get_music_library_information(
+        'albums', search_term='UM 4', complete_result=True)
+    assert [item.title for item in result] == ['Album 4']
+    # Album art uris are made absolute on copies of the items
+    result = mirror.get_albums(max_items=1, full_album_art_uri=True)
+    assert result[0].album_art_uri == 'http://host/getaa?u=art0'
+    assert mirror.get_albums()[0].album_art_uri == '/getaa?u=art0'
+    # The category was only fetched once
+    assert music_library.get_music_library_information.call_count == 1
+
+    # Queries of subcategories go to the device
+    mirror.get_albums(subcategories=['Album 1'])
+    assert music_library.get_music_library_information.call_args == \
+        mock.call('albums', start=0, max_items=100, full_album_art_uri=False,
+                  search_term=None, subcategories=['Album 1'],
+                  complete_result=False)
+
+
+def test_mirror_follows_events(music_library):
+    mirror = LibraryMirror(music_library)
+    mirror.subscribe()
+    assert music_library.contentDirectory.subscribe.call_args[1][
+        'auto_renew']
+    mirror.sync()
+    assert music_library.get_music_library_information.call_count == len(
+        ('tracks', 'albums', 'artists', 'album_artists', 'genres',
+         'composers', 'playlists', 'share', 'sonos_playlists', 'categories'))
+
+    service = music_library.contentDirectory
+    # Other containers, and the same update id, leave the mirror alone
+    mirror._handle_event(Event('sid', '0', service, 0, {
+        'container_update_i_ds': 'A:,3,Q:0,7'}))
+    mirror._handle_event(Event('sid', '1', service, 0, {
+        'container_update_i_ds': 'S:,9'}))
+    assert mirror.is_current('albums')
+    assert not mirror.is_current('share')
+    assert mirror.is_current('sonos_playlists')
+
+    music_library.update_id = 4
+    music_library.albums = make_albums(6)
+    mirror._handle_event(Event('sid', '2', service, 0, {
+        'container_update_i_ds': 'A:,4'}))
+    assert not mirror.is_current('albums')
+    assert not mirror.is_current('tracks')
+    assert mirror.get_albums().total_matches == 6
+
+    # After a resync, the update ids are checked with the device, in a
+    # thread
+    music_library.update_id = 5
+    mirror._handle_event(ResyncEvent('sid', service, 0, 'old-sid'))
+    for _ in range(100):
+        if not mirror._checking:
+            break
+        time.sleep(0.01)
+    assert not mirror.is_current('albums')
+    assert mirror.is_current('sonos_playlists')
+
+    mirror.unsubscribe()
+    assert music_library.contentDirectory.subscribe.return_value.\
+        unsubscribe.called
+
+
+def test_mirror_fetch_during_events(music_library):
+    mirror = LibraryMirror(music_library)
+    service = music_library.contentDirectory
+    fetch = music_library.get_music_library_information.side_effect
+    events = [
+        Event('sid', '0', service, 0, {'container_update_i_ds': 'A:,4'}),
+        Event('sid', '1', service, 0, {'container_update_i_ds': 'A:,4'}),
+    ]
+
+    def fetch_during_event(search_type, **kwargs):
+        # The albums change part way through the first fetch
+        result = fetch(search_type, **kwargs)
+        if events:
+            music_library.update_id = 4
+            mirror._handle_event(events.pop(0))
+        return result
+
+    music_library.get_music_library_information.side_effect = \
+        fetch_during_event
+    assert mirror.sync('albums')[0] == 4
+    assert music_library.get_music_library_information.call_count == 2
+    assert mirror.is_current('albums')
+
+    # A category which keeps changing is not kept
+    mirror.invalidate()
+    music_library.get_music_library_information.reset_mock()
+    events.extend(ResyncEvent('sid', service, 0, 'old') for _ in range(3))
+    with mock.patch.object(mirror, '_check_later'):
+        assert mirror.sync('albums')[0] == 4
+    assert music_library.get_music_library_information.call_count == 3
+    assert not mirror.is_current('albums')
+
+
+def test_mirror_check_for_changes(music_library):
+    mirror = LibraryMirror(music_library)
+    mirror.sync('albums')
+    mirror.sync('tracks')
+    assert mirror.check_for_changes() == []
+    music_library.update_id = 4
+    assert mirror.check_for_changes() == ['albums']
+    assert not mirror.is_current('albums')
+    assert mirror.is_current('tracks')
+
+
+def test_mirror_save_and_load(music_library, tmpdir):
+    path = str(tmpdir.join('mirror.bin'))
+    mirror = LibraryMirror(music_library)
+    mirror.sync('albums')
+    mirror.sync('tracks')
+    mirror.save(path)
+
+    loaded = LibraryMirror(music_library)
+    loaded.load(path)
+    assert loaded.is_current('albums')
+    assert loaded.is_current('tracks')
+    assert list(loaded.get_albums()) == music_library.albums
+    assert music_library.get_music_library_information.call_count == 2
+
+    with open(path, 'wb') as mirror_file:
+        mirror_file.write(b'not a mirror')
+    with pytest.raises(ValueError):
+        loaded.load(path)
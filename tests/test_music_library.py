@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""Tests for the music_library module."""
+
+from __future__ import unicode_literals
+
+import threading
+import time
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+import mock
+import pytest
+
+from soco import config
+from soco.cache import browse_cache
+from soco.data_structures import (
+    DidlContainer, DidlMusicAlbum, DidlMusicTrack, to_didl_string
+)
+from soco.events import Event
+from soco.exceptions import SoCoUPnPException
+from soco.music_library import MusicLibrary
+from soco.utils import url_escape_path
+
+
+class FakeContentDirectory(object):
+    """Answers Browse requests for a list of tracks, returning at most
+    page_limit at a time, and records the requests."""
+
+    def __init__(self, count, page_limit=3, delay=0):
+        self.tracks = [DidlMusicTrack(
+            title='Track {0}'.format(index), parent_id='A:TRACKS',
+            item_id='S://server/{0}.mp3'.format(index))
+                       for index in range(count)]
+        self.page_limit = page_limit
+        self.update_id = 7
+        self.delay = delay
+        self.requests = []
+        self.in_progress = 0
+        self.max_in_progress = 0
+        self.lock = threading.Lock()
+
+    def Browse(self, args):  # pylint: disable=invalid-name
+        args = dict(args)
+        with self.lock:
+            self.requests.append((args['StartingIndex'],
+                                  args['RequestedCount']))
+            self.in_progress += 1
+            self.max_in_progress = max(self.max_in_progress,
+                                       self.in_progress)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_progress -= 1
+        if args['ObjectID'] != 'A:TRACKS':
+            raise SoCoUPnPException('No such object', '701', '')
+        start = args['StartingIndex']
+        count = min(args['RequestedCount'], self.page_limit)
+        tracks = self.tracks[start:start + count]
+        return {
+            'Result': to_didl_string(*tracks),
+            'NumberReturned': str(len(tracks)),
+            'TotalMatches': str(len(self.tracks)),
+            'UpdateID': str(self.update_id),
+        }
+
+
+def make_library(content_directory):
+    soco = mock.Mock()
+    soco.ip_address = '192.168.1.{0}'.format(id(content_directory) % 250)
+    soco.contentDirectory = content_directory
+    browse_cache(soco.ip_address).clear()
+    return MusicLibrary(soco)
+
+
+@pytest.mark.parametrize('count', [0, 1, 3, 10, 12])
+def test_complete_result_is_fetched_concurrently(count):
+    content_directory = FakeContentDirectory(count, delay=0.01)
+    library = make_library(content_directory)
+    result = library.get_tracks(complete_result=True)
+    assert result == content_directory.tracks
+    assert (result.number_returned, result.total_matches,
+            result.update_id) == (count, count, 7)
+    # Pages after the first are the size of the first
+    assert content_directory.requests[0] == (0, 100000)
+    assert sorted(content_directory.requests[1:]) == [
+        (start, 3) for start in range(3, count, 3)]
+    if count > 6:
+        assert content_directory.max_in_progress > 1
+    assert content_directory.max_in_progress <= config.BROWSE_WORKERS
+
+    columnar = library.get_tracks(complete_result=True, columnar=True)
+    assert [row.title for row in columnar] == [
+        track.title for track in content_directory.tracks]
+
+
+def test_complete_result_refetches_short_pages():
+    content_directory = FakeContentDirectory(10)
+    library = make_library(content_directory)
+    browse = content_directory.Browse
+
+    def short_pages(args):
+        # The page at 3 comes back with one item
+        response = browse(args)
+        if dict(args)['StartingIndex'] == 3:
+            response = browse([('ObjectID', 'A:TRACKS'),
+                               ('StartingIndex', 3), ('RequestedCount', 1)])
+        return response
+
+    content_directory.Browse = short_pages
+    result = library.get_tracks(complete_result=True)
+    assert result == content_directory.tracks
+    assert (4, 2) in content_directory.requests
+
+
+def test_complete_result_errors():
+    library = make_library(FakeContentDirectory(10))
+    result = library.get_music_library_information(
+        'albums', complete_result=True)
+    assert (len(result), result.total_matches) == (0, 0)
+
+    content_directory = FakeContentDirectory(10)
+    browse = content_directory.Browse
+
+    def failing(args):
+        if dict(args)['StartingIndex'] == 6:
+            raise SoCoUPnPException('Failed', '501', '')
+        return browse(args)
+
+    content_directory.Browse = failing
+    with pytest.raises(SoCoUPnPException):
+        make_library(content_directory).get_tracks(complete_result=True)
+
+
+def test_paged_result():
+    content_directory = FakeContentDirectory(10)
+    library = make_library(content_directory)
+    result = library.get_tracks(start=2, max_items=2)
+    assert result == content_directory.tracks[2:4]
+    assert (result.number_returned, result.total_matches) == (2, 10)
+    assert content_directory.requests == [(2, 2)]
+
+
+def test_iter_music_library_information():
+    content_directory = FakeContentDirectory(10, page_limit=4)
+    library = make_library(content_directory)
+    items = library.iter_music_library_information('tracks', page_size=3)
+    # Nothing is fetched until the first item is asked for
+    assert content_directory.requests == []
+    assert next(items) == content_directory.tracks[0]
+    # The next page is fetched while the first one is used
+    deadline = time.time() + 5
+    while len(content_directory.requests) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert content_directory.requests == [(0, 3), (3, 3)]
+    assert [next(items)] + list(items) == content_directory.tracks[1:]
+    assert content_directory.requests == [(0, 3), (3, 3), (6, 3), (9, 1)]
+
+    # Start and max_items, and pages shorter than requested
+    content_directory.requests = []
+    browse_cache(library.soco.ip_address).clear()
+    items = list(library.iter_music_library_information(
+        'tracks', start=2, max_items=7, page_size=5))
+    assert items == content_directory.tracks[2:9]
+    assert content_directory.requests == [(2, 5), (6, 3)]
+    assert list(library.iter_music_library_information(
+        'tracks', max_items=0)) == []
+
+    # No such object
+    assert list(library.iter_music_library_information('albums')) == []
+
+
+def test_iter_music_library_information_does_not_grow_cache():
+    content_directory = FakeContentDirectory(30)
+    library = make_library(content_directory)
+    cache = browse_cache(library.soco.ip_address)
+    assert library.get_tracks(max_items=3) == content_directory.tracks[:3]
+    assert len(cache) == 1
+    items = library.iter_music_library_information('tracks', page_size=3)
+    for index, item in enumerate(items):
+        assert item == content_directory.tracks[index]
+        assert len(cache) == 1
+    assert len(content_directory.requests) == 11
+    # The page of the user interface is still there
+    content_directory.requests = []
+    library.get_tracks(max_items=3)
+    assert content_directory.requests == [(0, 1)]
+    assert len(cache) == 1
+
+
+def test_iter_browse():
+    content_directory = FakeContentDirectory(5)
+    library = make_library(content_directory)
+    track = content_directory.tracks[0]
+    track.item_id = 'A:TRACKS'
+    assert list(library.iter_browse(track)) == content_directory.tracks
+
+    def failing(args):
+        raise SoCoUPnPException('Failed', '501', '')
+
+    content_directory.Browse = failing
+    with pytest.raises(SoCoUPnPException):
+        list(library.iter_browse(track))
+
+
+def test_browse_responses_are_cached():
+    content_directory = FakeContentDirectory(5)
+    library = make_library(content_directory)
+    assert library.get_tracks(max_items=3) == content_directory.tracks[:3]
+    assert content_directory.requests == [(0, 3)]
+    # Without events, a single item is fetched to check the update id
+    assert library.get_tracks(max_items=3) == content_directory.tracks[:3]
+    assert content_directory.requests == [(0, 3), (0, 1)]
+    content_directory.update_id = 8
+    content_directory.tracks.reverse()
+    assert library.get_tracks(max_items=3) == content_directory.tracks[:3]
+    assert content_directory.requests == [(0, 3), (0, 1), (0, 1), (0, 3)]
+
+    # With events, nothing is fetched until the container changes
+    cache = browse_cache(library.soco.ip_address)
+    cache.update_from_event(Event('sid', '0', None, 0, {
+        'container_update_i_ds': 'A:,8'}))
+    content_directory.requests = []
+    assert library.get_tracks(max_items=3) == content_directory.tracks[:3]
+    assert content_directory.requests == []
+    content_directory.update_id = 9
+    cache.update_from_event(Event('sid', '1', None, 0, {
+        'container_update_i_ds': 'A:,9'}))
+    assert library.get_tracks(max_items=3).update_id == 9
+    assert content_directory.requests == [(0, 3)]
+
+    # Requests which need the current update id skip the cache
+    library._music_lib_search('A:TRACKS', 0, 3, cached=False)
+    assert content_directory.requests == [(0, 3), (0, 3)]
+
+
+class FakeAlbumArtists(FakeContentDirectory):
+    """Answers Browse requests for the albums of album artists, and the
+    tracks of albums."""
+
+    def __init__(self, artists, delay=0):
+        super(FakeAlbumArtists, self).__init__(0, page_limit=2, delay=delay)
+        # object id: list of items
+        self.objects = {}
+        for artist, albums in artists.items():
+            artist_id = 'A:ALBUMARTIST/' + url_escape_path(artist)
+            self.objects[artist_id] = [DidlContainer(
+                title='All', parent_id=artist_id, item_id=artist_id + '/')]
+            for album in albums:
+                album_id = artist_id + '/' + url_escape_path(album)
+                self.objects[artist_id].append(DidlMusicAlbum(
+                    title=album, parent_id=artist_id, item_id=album_id))
+                self.objects[album_id] = [DidlMusicTrack(
+                    title='{0} {1}'.format(album, index),
+                    parent_id=album_id,
+                    item_id='S://server/{0}/{1}.mp3'.format(album, index))
+                                          for index in range(3)]
+
+    def Browse(self, args):  # pylint: disable=invalid-name
+        args = dict(args)
+        with self.lock:
+            self.requests.append(args['ObjectID'])
+            self.in_progress += 1
+            self.max_in_progress = max(self.max_in_progress,
+                                       self.in_progress)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_progress -= 1
+        if args['ObjectID'] not in self.objects:
+            raise SoCoUPnPException('No such object', '701', '')
+        items = self.objects[args['ObjectID']]
+        start = args['StartingIndex']
+        page = items[start:start + min(args['RequestedCount'],
+                                       self.page_limit)]
+        return {
+            'Result': to_didl_string(*page),
+            'NumberReturned': str(len(page)),
+            'TotalMatches': str(len(items)),
+            'UpdateID': '7',
+        }
+
+
+def test_get_albums_and_tracks():
+    content_directory = FakeAlbumArtists(OrderedDict([
+        ('Muse', ['Drones', 'Origin of Symmetry']),
+        ('Metallica', ['Black', 'Load', 'Reload']),
+        ('Björk', ['Homogenic']),
+    ]), delay=0.01)
+    library = make_library(content_directory)
+    tree = library.get_albums_and_tracks([
+        ('Metallica', 'Load'), 'Muse', 'Nobody', ('Björk', 'Homogenic'),
+        'Muse', ('Muse', 'Drones'), ('Metallica', 'Black'),
+        ('Metallica', 'Missing')])
+    assert list(tree) == ['Metallica', 'Muse', 'Björk']
+    assert [album.title for album in tree['Metallica']] == ['Black', 'Load']
+    assert [album.title for album in tree['Muse']] == [
+        'Drones', 'Origin of Symmetry']
+    for artist, albums in tree.items():
+        for album, tracks in albums.items():
+            assert isinstance(album, DidlMusicAlbum)
+            assert tracks == content_directory.objects[album.item_id]
+            assert tracks.total_matches == 3
+    # Each artist and album was fetched once (in pages of 2)
+    objects = content_directory.objects
+    assert sorted(content_directory.requests) == sorted(
+        ['A:ALBUMARTIST/Nobody'] +
+        [object_id for object_id in objects
+         if not object_id.endswith('Reload')
+         for _ in range(0, len(objects[object_id]), 2)])
+    # A few at a time
+    assert content_directory.max_in_progress > 1
+    assert content_directory.max_in_progress <= config.BROWSE_WORKERS
+
+    assert library.get_albums_and_tracks([]) == OrderedDict()
+
+
+def test_get_albums_for_artist():
+    content_directory = FakeAlbumArtists({'Muse': ['Drones', 'Absolution']})
+    library = make_library(content_directory)
+    result = library.get_albums_for_artist('Muse')
+    assert [album.title for album in result] == ['Drones', 'Absolution']
+    assert (result.search_type, result.number_returned,
+            result.total_matches) == ('albums_for_artist', 2, 2)
+    # The items are only kept once
+    assert 'item_list' not in result._metadata
@@ -272,3 +272,13 @@ class TestMusicServiceItem(object):
         assert item.to_element() == didl_item_to_element.return_value
         
         
+
+    @patch('soco.music_services.data_structures.DidlItem.write_xml')
+    def test_write_xml(self, didl_item_write_xml):
+        """Test the write_xml method"""
+        content_dict = {'title': 'fake title'}
+        item = data_structures.MusicServiceItem('fake_id', 'desc', 'ressources', 'uri', content_dict)
+        parts = []
+        item.write_xml(parts, include_namespaces=True)
+        didl_item_write_xml.assert_called_once_with(
+            parts, include_namespaces=True)
@@ -3,9 +3,13 @@
 
 from __future__ import unicode_literals
 
+import pickle
+import sys
+
 import pytest
 
 from soco import data_structures
+from soco.data_structures_entry import LazyDidlObject, from_didl_string
 from soco.exceptions import DIDLMetadataError
 from soco.xml import XML
 
@@ -108,6 +112,13 @@ class TestResource():
         assert res is not None
         assert res == res
 
+    def test_didl_resource_is_compact(self):
+        res = data_structures.DidlResource('a%20uri', 'a:protocol:info:xx')
+        assert not hasattr(res, '__dict__')
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            copy = pickle.loads(pickle.dumps(res, protocol))
+            assert copy == res
+
 
 class TestDidlObject():
     """Testing the DidlObject base class."""
@@ -279,6 +290,36 @@ class TestDidlObject():
             item_id='iid',
             creator='a__different_creator')
         assert didl_object_3 != didl_object_1
+        # Items of different classes are never equal
+        didl_item = data_structures.DidlItem(
+            title='a_title', parent_id='pid', item_id='iid', creator='a_creator')
+        assert didl_item != didl_object_1
+        assert not didl_object_1 == didl_item
+
+    def test_didl_object_hash(self):
+        track = data_structures.DidlMusicTrack(
+            title='a_title', parent_id='pid', item_id='iid', album='an_album',
+            resources=[data_structures.DidlResource('a%20uri', 'a:b:c:d')])
+        same = data_structures.DidlMusicTrack.from_dict(track.to_dict())
+        changed = data_structures.DidlMusicTrack.from_dict(track.to_dict())
+        changed.resources[0].duration = '0:03:00'
+        other = data_structures.DidlMusicTrack(
+            title='a_title', parent_id='pid', item_id='iid2', album='an_album')
+        assert track.identity == ('object.item.audioItem.musicTrack', 'iid')
+        assert hash(track) == hash(same) == hash(changed)
+        assert len(set([track, same, changed, other])) == 3
+        assert changed != track
+        assert {track: 1}[same] == 1
+        assert track.fingerprint == same.fingerprint
+        assert track.fingerprint != changed.fingerprint
+        # The fingerprint is computed once, and not pickled
+        fingerprint = changed.fingerprint
+        changed.resources[0].duration = None
+        assert changed == track
+        assert changed.fingerprint == fingerprint
+        assert '_fingerprint' not in changed.__getstate__()
+        with pytest.raises(TypeError):
+            hash(track.resources[0])
 
     def test_didl_object_to_dict(self):
         didl_object = data_structures.DidlObject(
@@ -355,3 +396,361 @@ class TestDidlObject():
             'nameSpace="urn:schemas-rinconnetworks-com:metadata-1-0/">' +
             'RINCON_AssociatedZPUDN</desc></item></dummy>')[0]
         assert_xml_equal(elt2, elt)
+
+    def test_didl_object_is_compact(self):
+        didl_object = data_structures.DidlObject.from_element(
+            XML.fromstring(self.didl_xml))
+        # The metadata is held in slots
+        assert 'creator' in data_structures.DidlObject.__slots__
+        assert 'artist' in data_structures.DidlMusicTrack.__slots__
+        assert not hasattr(didl_object, 'write_status')
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            copy = pickle.loads(pickle.dumps(didl_object, protocol))
+            assert copy == didl_object
+        didl_object.other = 'other'
+        assert pickle.loads(pickle.dumps(didl_object)).other == 'other'
+
+    def test_didl_object_shares_strings(self):
+        first, second = [
+            data_structures.DidlObject.from_element(
+                XML.fromstring(self.didl_xml))
+            for _ in range(2)]
+        assert first.desc is second.desc
+        assert first.parent_id is second.parent_id
+        assert first.creator is second.creator
+
+    def test_didl_object_from_element_decoding(self):
+        # As with findtext, the first of repeated children is used, and empty
+        # children give empty strings
+        elt = XML.fromstring(
+            self.didl_xml.replace(
+                '<dc:creator>a_creator</dc:creator>',
+                '<dc:creator>a_creator</dc:creator>'
+                '<dc:creator>another_creator</dc:creator>'
+                '<dc:title>another_title</dc:title>'
+            ).replace('>DUMMY</desc>', '/>').replace(
+                '</item>', '<upnp:writeStatus></upnp:writeStatus></item>'))
+        didl_object = data_structures.DidlObject.from_element(elt)
+        assert didl_object.title == 'the_title'
+        assert didl_object.creator == 'a_creator'
+        assert didl_object.desc == ''
+        assert didl_object.write_status == ''
+
+    def test_didl_object_from_element_without_class(self):
+        elt = XML.fromstring(
+            self.didl_xml.replace('<upnp:class>object</upnp:class>', ''))
+        with pytest.raises(DIDLMetadataError) as excinfo:
+            data_structures.DidlObject.from_element(elt)
+        assert 'Missing upnp:class element' in str(excinfo.value)
+
+
+
+def didl_string_from_elements(*items):
+    """The DIDL-Lite string which to_didl_string used to build, by
+    serialising an ElementTree."""
+    didl = XML.Element(
+        'DIDL-Lite',
+        {
+            'xmlns': "urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/",
+            'xmlns:dc': "http://purl.org/dc/elements/1.1/",
+            'xmlns:upnp': "urn:schemas-upnp-org:metadata-1-0/upnp/",
+        })
+    for item in items:
+        didl.append(item.to_element())
+    if sys.version_info[0] == 2:
+        return XML.tostring(didl)
+    return XML.tostring(didl, encoding='unicode')
+
+
+class TestToDidlString():
+    """Testing the serialisation of items to DIDL-Lite."""
+
+    @pytest.mark.parametrize('title', [
+        'the_title', '', None, 'Fish & Chips <"live">\n', 'Ce\u0301line',
+    ])
+    def test_to_didl_string(self, title):
+        resources = [
+            data_structures.DidlResource(
+                uri='x-file-cifs://server/a&b.mp3',
+                protocol_info='x-file-cifs:*:audio/mpeg:*', size=1234,
+                duration='0:03:21', bitrate=320, nr_audio_channels=2,
+                protection='"none"'),
+            data_structures.DidlResource(
+                uri=None, protocol_info='http-get:*:audio/mpeg:*'),
+        ]
+        track = data_structures.DidlMusicTrack(
+            title=title, parent_id='A:TRACKS', item_id='S://a&b.mp3',
+            resources=resources, creator='Artist <1>', album='',
+            original_track_number=3, desc='RINCON_AssociatedZPUDN')
+        container = data_structures.DidlPlaylistContainer(
+            title=title, parent_id='SQ:', item_id='SQ:1', restricted=False)
+        for items in ([track], [container], [track, container]):
+            assert data_structures.to_didl_string(*items) == \
+                didl_string_from_elements(*items)
+        assert data_structures.to_didl_string() == \
+            didl_string_from_elements()
+
+        parts = []
+        data_structures.write_didl_fragment(
+            parts, track, include_namespaces=True)
+        element = track.to_element(include_namespaces=True)
+        if sys.version_info[0] == 2:
+            assert ''.join(parts) == XML.tostring(element).decode('ascii')
+        else:
+            assert ''.join(parts) == XML.tostring(element, encoding='unicode')
+
+    def test_to_didl_string_attributes(self):
+        track = data_structures.DidlMusicTrack(
+            title='Tab\tand\nnewline', parent_id='A:"TRACKS"\n\t',
+            item_id='S://a&b<c>.mp3', desc='RINCON_AssociatedZPUDN')
+        string = data_structures.to_didl_string(track)
+        if sys.version_info[0] == 2:
+            string = string.decode('ascii')
+        # The attributes are in a fixed order, whatever the version of Python
+        assert string.startswith(
+            '<DIDL-Lite xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/" '
+            'xmlns:dc="http://purl.org/dc/elements/1.1/" '
+            'xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/">'
+            '<item parentID="A:&quot;TRACKS&quot;&#10;&#09;" '
+            'restricted="true" id="S://a&amp;b&lt;c&gt;.mp3">'
+            '<dc:title>Tab\tand\nnewline</dc:title>')
+        # and whitespace in attributes survives parsing
+        assert from_didl_string(string)[0] == track
+
+    def test_to_didl_string_memo(self):
+        track = data_structures.DidlMusicTrack(
+            title='the_title', parent_id='A:TRACKS', item_id='iid')
+        memo = {}
+        first = data_structures.to_didl_string(track, memo=memo)
+        assert memo[id(track)][0] is track
+        track.title = 'changed'
+        # The memo is used, and the change is not seen
+        assert data_structures.to_didl_string(track, memo=memo) == first
+        assert data_structures.to_didl_string(track) != first
+        with pytest.raises(TypeError):
+            data_structures.to_didl_string(track, bad=1)
+
+    def test_to_didl_string_other_objects(self):
+        resource = data_structures.DidlResource(
+            uri='x-file-cifs://server/a&b.mp3',
+            protocol_info='x-file-cifs:*:audio/mpeg:*', duration='0:03:21')
+        assert data_structures.to_didl_string(resource) == \
+            didl_string_from_elements(resource)
+
+        # Objects without write_xml, whose to_element takes no arguments
+        class Element(object):
+            def to_element(self):
+                return resource.to_element()
+
+        assert data_structures.to_didl_string(Element()) == \
+            didl_string_from_elements(resource)
+
+
+class TestLazyDidlObject():
+    """Testing the handles made by from_didl_string in lazy mode."""
+
+    didl_string = (
+        '<DIDL-Lite xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/" '
+        'xmlns:dc="http://purl.org/dc/elements/1.1/" '
+        'xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/">'
+        '<item id="iid" parentID="pid" restricted="true">'
+        '<res protocolInfo="x-file-cifs:*:audio/mpeg:*">{uri}</res>'
+        '<upnp:albumArtURI>/getaa?u=art</upnp:albumArtURI>'
+        '<dc:title>the_title</dc:title>'
+        '<upnp:class>object.item.audioItem.musicTrack</upnp:class>'
+        '<dc:creator>a_creator</dc:creator>'
+        '<upnp:album>an_album</upnp:album>'
+        '<upnp:originalTrackNumber>3</upnp:originalTrackNumber>'
+        '</item></DIDL-Lite>')
+    uri = 'x-file-cifs://server/music/track.mp3'
+
+    def test_lazy_object_indexed_attributes(self):
+        string = self.didl_string.format(uri=self.uri)
+        handle = from_didl_string(string, lazy=True)[0]
+        item = from_didl_string(string)[0]
+        assert type(handle) is LazyDidlObject
+        assert isinstance(handle, data_structures.DidlMusicTrack)
+        for name in ('title', 'item_id', 'parent_id', 'item_class',
+                     'resources', 'album_art_uri'):
+            assert getattr(handle, name) == getattr(item, name)
+        assert repr(handle).startswith('<DidlMusicTrack ')
+        assert 'the_title' in repr(handle)
+        assert not handle.is_parsed
+
+    def test_lazy_object_materialises(self):
+        string = self.didl_string.format(uri=self.uri)
+        handle = from_didl_string(string, lazy=True)[0]
+        item = from_didl_string(string)[0]
+        # Changes made to the handle are kept
+        handle.album_art_uri = 'http://host/getaa?u=art'
+        handle.resources[0].uri = 'x-file-cifs://other.mp3'
+        assert handle.original_track_number == 3
+        assert handle.is_parsed
+        assert handle.album == 'an_album'
+        assert handle.album_art_uri == 'http://host/getaa?u=art'
+        assert handle.resources[0].uri == 'x-file-cifs://other.mp3'
+        item.album_art_uri = 'http://host/getaa?u=art'
+        item.resources[0].uri = 'x-file-cifs://other.mp3'
+        assert handle == item
+        assert item == handle
+        assert hash(handle) == hash(item)
+        assert len(set([handle, item])) == 1
+        assert handle.to_dict() == item.to_dict()
+        assert pickle.loads(pickle.dumps(handle)) == item
+
+    def test_lazy_object_not_used_for_upgrades(self):
+        # Items which would be upgraded to music service items are built
+        # straight away, as are invalid items
+        elt = XML.fromstring(self.didl_string.format(uri=self.uri))[0]
+        texts, res_elements = data_structures.decode_didl_element(elt)
+        assert LazyDidlObject.can_defer(
+            data_structures.DidlMusicTrack, elt, texts, res_elements)
+        res_elements[0].text = 'x-sonos-http:track%3a123.mp3?sid=2'
+        assert not LazyDidlObject.can_defer(
+            data_structures.DidlMusicTrack, elt, texts, res_elements)
+        elt = XML.fromstring(
+            self.didl_string.format(uri=self.uri).replace(' id="iid"', ''))[0]
+        texts, res_elements = data_structures.decode_didl_element(elt)
+        assert not LazyDidlObject.can_defer(
+            data_structures.DidlMusicTrack, elt, texts, res_elements)
+        with pytest.raises(DIDLMetadataError):
+            from_didl_string(
+                self.didl_string.replace('<dc:title>the_title</dc:title>', ''),
+                lazy=True)
+
+    @pytest.mark.parametrize('old, new', [
+        # A resource without protocolInfo, or with a bad number
+        ('<res protocolInfo="x-file-cifs:*:audio/mpeg:*">', '<res>'),
+        ('<res protocolInfo', '<res size="big" protocolInfo'),
+        # A bad track number
+        ('>3</upnp:originalTrackNumber>', '>three</upnp:originalTrackNumber>'),
+        ('>3</upnp:originalTrackNumber>', '></upnp:originalTrackNumber>'),
+    ])
+    def test_lazy_object_errors_are_not_deferred(self, old, new):
+        string = self.didl_string.format(uri=self.uri).replace(old, new)
+        assert string != self.didl_string.format(uri=self.uri)
+        with pytest.raises(Exception) as error:
+            from_didl_string(string)
+        with pytest.raises(error.type):
+            from_didl_string(string, lazy=True)
+
+
+class TestColumnarSearchResult():
+    """Testing the columnar search result."""
+
+    track = (
+        '<item id="S://server/{index}.mp3" parentID="A:TRACKS" '
+        'restricted="true">'
+        '<res protocolInfo="x-file-cifs:*:audio/mpeg:*">'
+        'x-file-cifs://server/{index}.mp3</res>'
+        '<upnp:albumArtURI>/getaa?u={index}</upnp:albumArtURI>'
+        '<dc:title>Track {index}</dc:title>'
+        '<upnp:class>object.item.audioItem.musicTrack</upnp:class>'
+        '<dc:creator>Artist {artist}</dc:creator>'
+        '<upnp:album>Album {album}</upnp:album>'
+        '<upnp:originalTrackNumber>{track}</upnp:originalTrackNumber>'
+        '<desc id="cdudn" nameSpace="urn:schemas-rinconnetworks-com:'
+        'metadata-1-0/">RINCON_AssociatedZPUDN</desc>'
+        '</item>'
+    )
+    album = (
+        '<container id="A:ALBUM/Album%20X" parentID="A:ALBUM" '
+        'restricted="true"><dc:title>Album X</dc:title>'
+        '<upnp:class>object.container.album.musicAlbum</upnp:class>'
+        '</container>'
+    )
+
+    def didl_string(self, items):
+        return (
+            '<DIDL-Lite xmlns:dc="http://purl.org/dc/elements/1.1/" '
+            'xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/" '
+            'xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/">' +
+            ''.join(items) + '</DIDL-Lite>')
+
+    @pytest.fixture()
+    def result(self):
+        result = data_structures.ColumnarSearchResult('tracks', 6, 6, 1)
+        # Tracks 0-5, with three tracks (numbered 3, 2, 1) on each album
+        for page in ((0, 1, 2), (3, 4, 5)):
+            result.add_didl_string(self.didl_string(
+                self.track.format(index=index, track=3 - index % 3,
+                                  album=index // 3, artist=index // 3)
+                for index in page))
+        return result
+
+    def test_columnar_rows(self, result):
+        assert len(result) == 6
+        assert result.number_returned == 6
+        assert result.total_matches == 6
+        assert result.update_id == 1
+        assert result.search_type == 'tracks'
+        row = result[4]
+        assert row.title == 'Track 4'
+        assert row.item_id == 'S://server/4.mp3'
+        assert row.uri == 'x-file-cifs://server/4.mp3'
+        assert row.album == 'Album 1'
+        assert row.original_track_number == 2
+        assert row.restricted is True
+        assert [r.title for r in result[1:3]] == ['Track 1', 'Track 2']
+        # Shared values are stored once
+        assert result[3].album is result[5].album
+        assert result[0].desc is result[5].desc
+
+    def test_columnar_didl_object(self, result):
+        item = result.didl_object(4)
+        expected = from_didl_string(self.didl_string([
+            self.track.format(index=4, track=2, album=1, artist=1)]))[0]
+        assert item == expected
+        result.add_didl_string(self.didl_string([self.album]))
+        album = result.didl_object(6)
+        assert isinstance(album, data_structures.DidlMusicAlbum)
+        assert album.resources == []
+        assert result[6].original_track_number is None
+
+    def test_columnar_filter_sort_group(self, result):
+        assert result.filter(album='Album 0').column('title') == [
+            'Track 0', 'Track 1', 'Track 2']
+        assert result.filter(
+            title=lambda title: title.endswith(('1', '4')),
+            original_track_number=2).column('title') == [
+                'Track 1', 'Track 4']
+        assert len(result.filter(lambda row: row.title == 'Track 5')) == 1
+        assert result.sort('album', 'original_track_number').column(
+            'title') == ['Track 2', 'Track 1', 'Track 0',
+                         'Track 5', 'Track 4', 'Track 3']
+        assert result.sort('title', reverse=True)[0].title == 'Track 5'
+        groups = result.group_by('creator')
+        assert list(groups) == ['Artist 0', 'Artist 1']
+        assert groups['Artist 1'].column('original_track_number') == [
+            3, 2, 1]
+        result.apply('album_art_uri', lambda uri: 'http://host' + uri)
+        assert result[0].album_art_uri == 'http://host/getaa?u=0'
+        # Shared values stay shared
+        result.apply('album', lambda album: album.upper())
+        assert result[0].album == 'ALBUM 0'
+        assert result[0].album is result[2].album
+        with pytest.raises(ValueError):
+            result.column('bad')
+        with pytest.raises(ValueError):
+            result.apply('bad', str)
+
+    def test_columnar_restricted(self, result):
+        # The restricted attribute is read as it is by from_didl_string
+        result.add_didl_string(self.didl_string([self.album.replace(
+            'restricted="true"', 'restricted="1"')]))
+        result.add_didl_string(self.didl_string([self.album.replace(
+            'restricted="true"', 'restricted="false"')]))
+        assert result.column('restricted')[-2:] == [True, False]
+        missing = self.didl_string([self.album.replace(
+            'restricted="true"', '')])
+        with pytest.raises(DIDLMetadataError):
+            result.add_didl_string(missing)
+        with pytest.raises(DIDLMetadataError):
+            from_didl_string(missing)
+
+    def test_search_result_does_not_copy_items(self):
+        items = [object(), object()]
+        result = data_structures.SearchResult(items, 'tracks', 2, 2, 1)
+        assert 'item_list' not in result._metadata
+        with pytest.warns(UserWarning):
+            assert result['item_list'] == items
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Tests for the page_planner module."""
+
+from __future__ import unicode_literals
+
+import mock
+
+from soco.data_structures import Queue
+from soco.page_planner import (
+    MAX_PAGE_SIZE, PagePlanner, page_planner, timed_browse
+)
+from soco.snapshot import Snapshot
+
+
+def test_page_planner_learns_limit():
+    planner = PagePlanner()
+    assert planner.page_size() == MAX_PAGE_SIZE
+    # Fewer returned than asked for, but only because there were no more,
+    # and as many as were asked for
+    planner.record(100, 10, 10, 0.1)
+    planner.record(100, 100, 300, 0.1)
+    assert planner.limit is None
+    planner.record(100000, 5, 300, 0.1)
+    assert planner.limit == 5
+    # A limit learnt too low is put right, since the most is asked for
+    assert planner.page_size() == MAX_PAGE_SIZE
+    planner.record(100000, 486, 1000, 0.5)
+    assert planner.limit == 486
+    planner.clear()
+    assert planner.limit is None
+
+
+def test_page_planner_prefers_quicker_pages():
+    planner = PagePlanner()
+    planner.record(100000, 486, 1000, 1.0)
+    assert planner.page_size() == MAX_PAGE_SIZE
+    # 128 item pages return 128 items per second, 486 item pages 486
+    planner.record(128, 128, 1000, 1.0)
+    assert planner.page_size() == MAX_PAGE_SIZE
+    # 256 item pages are quicker. The average moves towards them
+    for _ in range(5):
+        planner.record(256, 256, 1000, 0.2)
+    sizes = [planner.page_size() for _ in range(20)]
+    assert sizes.count(256) == 18
+    assert sizes.count(MAX_PAGE_SIZE) == 2
+    # Until the largest pages are quicker again
+    for _ in range(10):
+        planner.record(100000, 486, 1000, 0.1)
+    assert set(planner.page_size() for _ in range(5)) == set([MAX_PAGE_SIZE])
+
+
+def test_timed_browse():
+    device = mock.Mock()
+    device.ip_address = '192.168.1.201'
+    page_planner(device.ip_address).clear()
+    device.contentDirectory.Browse.return_value = {
+        'NumberReturned': '486', 'TotalMatches': '1000'}
+    args = [('ObjectID', 'Q:0'), ('StartingIndex', 100),
+            ('RequestedCount', 100000)]
+    assert timed_browse(device, args) == \
+        device.contentDirectory.Browse.return_value
+    device.contentDirectory.Browse.assert_called_once_with(args)
+    assert page_planner(device.ip_address).limit == 486
+    assert page_planner(device.ip_address) is not page_planner('192.168.1.2')
+    # Responses without the numbers are not recorded
+    device.contentDirectory.Browse.return_value = {'UpdateID': '3'}
+    assert timed_browse(device, args) == {'UpdateID': '3'}
+
+
+def test_snapshot_saves_queue_in_pages():
+    device = mock.Mock()
+    device.ip_address = '192.168.1.202'
+    page_planner(device.ip_address).clear()
+    items = list(range(1000))
+
+    def get_queue(start, max_items):
+        page = items[start:start + min(max_items, 486)]
+        return Queue(page, len(page), len(items), 1)
+
+    device.get_queue.side_effect = get_queue
+    snapshot = Snapshot(device, snapshot_queue=True)
+    snapshot._save_queue()
+    assert [list(page) for page in snapshot.queue] == [
+        items[:486], items[486:972], items[972:]]
+    assert device.get_queue.call_args_list == [
+        mock.call(0, MAX_PAGE_SIZE), mock.call(486, MAX_PAGE_SIZE),
+        mock.call(972, MAX_PAGE_SIZE)]
+
+    items = []
+    snapshot = Snapshot(device, snapshot_queue=True)
+    snapshot._save_queue()
+    assert snapshot.queue == []
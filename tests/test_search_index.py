@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""Tests for the search_index module."""
+
+from __future__ import unicode_literals
+
+import mock
+
+from soco.data_structures import DidlMusicAlbum, DidlMusicTrack
+from soco.search_index import SearchIndex, fold, tokenize, trigrams
+
+
+def track(number, title, creator, album):
+    return DidlMusicTrack(
+        title=title, parent_id='A:TRACKS',
+        item_id='S://server/{0}.mp3'.format(number), creator=creator,
+        album=album)
+
+
+TRACKS = [
+    track(1, 'Come Together', 'The Beatles', 'Abbey Road'),
+    track(2, 'Something', 'The Beatles', 'Abbey Road'),
+    track(3, 'Halo', 'Beyoncé', 'I Am... Sasha Fierce'),
+    track(4, 'Abbey', 'Someone Else', 'Roadside'),
+    track(5, 'Road Trip', 'Beatlemania', 'Tribute'),
+]
+ALBUMS = [DidlMusicAlbum(title='Abbey Road', parent_id='A:ALBUM',
+                         item_id='A:ALBUM/Abbey%20Road',
+                         creator='The Beatles')]
+
+
+def titles(items):
+    return [item.title for item in items]
+
+
+def test_fold_and_tokenize():
+    assert fold('Beyoncé Ærø ÀÉÎÕÜ') == 'beyonce ærø aeiou'
+    assert tokenize('I Am... Sasha Fierce') == ['i', 'am', 'sasha', 'fierce']
+    assert tokenize('Björk – Jóga') == ['bjork', 'joga']
+    assert trigrams('abba') == set(['  a', ' ab', 'abb', 'bba'])
+
+
+def test_search():
+    index = SearchIndex()
+    assert index.index_items('tracks', TRACKS) == (5, 0, 0)
+    assert index.index_items('albums', ALBUMS) == (1, 0, 0)
+    assert len(index) == 6
+    # Matches in titles, then whole words, rank highest
+    result = titles(index.search('abbey'))
+    assert set(result[:2]) == set(['Abbey', 'Abbey Road'])
+    assert set(result[2:]) == set(['Come Together', 'Something'])
+    assert titles(index.search('road abb')) == [
+        'Abbey Road', 'Abbey', 'Come Together', 'Something']
+    # Prefixes of every word must match
+    assert set(titles(index.search('beatl'))) == set([
+        'Come Together', 'Something', 'Abbey Road', 'Road Trip'])
+    assert titles(index.search('beatles abb s')) == ['Something']
+    assert index.search('beatles halo') == []
+    assert index.search('  ') == []
+    # Accents and case are ignored
+    assert titles(index.search('BEYONCE')) == ['Halo']
+    assert titles(index.search('fierc sash')) == ['Halo']
+    # Small mistakes are forgiven
+    assert titles(index.search('beyonse')) == ['Halo']
+    assert set(titles(index.search('abbey', limit=2))) == set(result[:2])
+    assert titles(index.search(
+        'abbey', item_class='object.container')) == ['Abbey Road']
+    assert set(titles(index.search(
+        'beatles road', item_class='object.item'))) == set([
+            'Come Together', 'Something'])
+
+
+def test_index_items_updates_incrementally():
+    index = SearchIndex()
+    index.index_items('tracks', TRACKS)
+    assert index.search('halo')
+    changed = track(2, 'Something (Remastered)', 'The Beatles', 'Abbey Road')
+    new = track(6, 'Here Comes the Sun', 'The Beatles', 'Abbey Road')
+    unchanged = track(1, 'Come Together', 'The Beatles', 'Abbey Road')
+    items = [unchanged, changed, TRACKS[3], TRACKS[4], new]
+    assert index.index_items('tracks', items) == (1, 1, 1)
+    assert index.index_items('tracks', items) == (0, 0, 0)
+    assert len(index) == 5
+    assert index.search('halo') == []
+    assert titles(index.search('remaster')) == ['Something (Remastered)']
+    assert titles(index.search('sun')) == ['Here Comes the Sun']
+    # The unchanged item was not replaced
+    assert index.search('together')[0] is TRACKS[0]
+    assert index.index_items('tracks', []) == (0, 0, 5)
+    assert len(index) == 0
+    assert index.search('abbey') == []
+
+
+def test_update_from_mirror():
+    mirror = mock.Mock()
+    categories = {'tracks': (3, TRACKS), 'albums': (3, ALBUMS),
+                  'artists': (3, []), 'composers': (None, [])}
+    mirror.sync.side_effect = lambda search_type: categories[search_type]
+    index = SearchIndex()
+    assert index.update_from_mirror(mirror) == [
+        'tracks', 'albums', 'artists', 'composers']
+    assert len(index) == 6
+    assert index.update_from_mirror(mirror) == []
+    categories['albums'] = (4, [])
+    assert index.update_from_mirror(mirror) == ['albums']
+    assert len(index) == 5
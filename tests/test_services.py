@@ -9,7 +9,8 @@ from __future__ import unicode_literals
 import pytest
 
 from soco.exceptions import SoCoUPnPException
-from soco.services import Service
+from soco.events import LazyDidlMetadata
+from soco.services import AVTransport, ContentDirectory, Service
 
 try:
     from unittest import mock
@@ -222,4 +223,49 @@ def test_handle_upnp_error(service):
     assert E.value.error_description == 'Signature Failure'
     # TODO: Try this with a None Error Code
 
+
+def test_content_directory_refresh():
+    """Check that the update ids of all top level containers are fetched
+    after events have been missed."""
+    mock_soco = mock.MagicMock()
+    mock_soco.ip_address = "192.168.1.101"
+    content_directory = ContentDirectory(mock_soco)
+    update_ids = {'A:': '3', 'SQ:': '5', 'Q:0': '7'}
+
+    def browse(args):
+        object_id = dict(args)['ObjectID']
+        if object_id not in update_ids:
+            raise SoCoUPnPException('No such object', '701', '')
+        return {'UpdateID': update_ids[object_id]}
+
+    with mock.patch.object(content_directory, 'Browse', side_effect=browse):
+        assert content_directory._refresh_evented_variables() == {
+            'container_update_i_ds': 'A:,3,SQ:,5,Q:0,7'}
+
 # TODO: test iter_actions
+
+
+def test_av_transport_refresh():
+    """Check that refreshed track metadata is lazy, as it is in events, so
+    that the two compare equal."""
+    mock_soco = mock.MagicMock()
+    mock_soco.ip_address = "192.168.1.101"
+    av_transport = AVTransport(mock_soco)
+    didl = ('<DIDL-Lite xmlns="urn:schemas-upnp-org:metadata-1-0/DIDL-Lite/"'
+            ' xmlns:dc="http://purl.org/dc/elements/1.1/"'
+            ' xmlns:upnp="urn:schemas-upnp-org:metadata-1-0/upnp/">'
+            '<item id="-1" parentID="-1" restricted="true">'
+            '<dc:title>Song</dc:title>'
+            '<upnp:class>object.item.audioItem.musicTrack</upnp:class>'
+            '</item></DIDL-Lite>')
+    with mock.patch.object(av_transport, 'GetTransportInfo', return_value={
+            'CurrentTransportState': 'PLAYING'}), \
+            mock.patch.object(av_transport, 'GetPositionInfo', return_value={
+                'Track': '1', 'TrackURI': 'x-file-cifs://a.mp3',
+                'TrackDuration': '0:03:00', 'TrackMetaData': didl}):
+        variables = av_transport._refresh_evented_variables()
+    metadata = variables['current_track_meta_data']
+    assert isinstance(metadata, LazyDidlMetadata)
+    assert not metadata.is_parsed
+    assert metadata == LazyDidlMetadata(didl)
+    assert metadata.title == 'Song'
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""Tests for the state module."""
+
+from __future__ import unicode_literals
+
+import mock
+import pytest
+
+from soco import config
+from soco.events import Event, ResyncEvent
+from soco.state import DeviceStateStore, STATE_SERVICES, fold_variables
+
+
+@pytest.fixture()
+def device():
+    """A mock device whose services return mock subscriptions."""
+    device = mock.Mock()
+    for name in STATE_SERVICES:
+        service = getattr(device, name)
+        service.soco = device
+        subscription = service.subscribe.return_value
+        subscription.is_subscribed = True
+        subscription.timeout = 100
+        subscription.time_left = 50
+    device.renderingControl._refresh_evented_variables.return_value = {
+        'volume': {'Master': '20'}, 'mute': {'Master': '0'}}
+    device.avTransport._refresh_evented_variables.return_value = {
+        'transport_state': 'STOPPED'}
+    device.contentDirectory._refresh_evented_variables.return_value = {
+        'container_update_i_ds': 'Q:0,7'}
+    return device
+
+
+def test_fold_variables():
+    assert fold_variables({
+        'volume': {'Master': '36', 'LF': '100', 'RF': '100'},
+        'mute': {'Master': '1'},
+        'transport_state': 'PLAYING',
+        'current_play_mode': 'SHUFFLE',
+        'container_update_i_ds': 'A:,3,Q:0,12',
+        'some_other_variable': 'ignored',
+    }) == {
+        'volume': 36,
+        'mute': True,
+        'transport_state': 'PLAYING',
+        'play_mode': 'SHUFFLE',
+        'queue_update_id': 12,
+    }
+    # Channels other than Master and other containers are ignored
+    assert fold_variables({
+        'volume': {'LF': '100'}, 'container_update_i_ds': 'A:,3'}) == {}
+
+
+def test_state_store_folds_events(device):
+    store = DeviceStateStore()
+    store.add(device)
+    for name in STATE_SERVICES:
+        assert getattr(device, name).subscribe.call_args[1]['auto_renew']
+    changes = []
+    store.add_callback(lambda *args: changes.append(args))
+
+    store._handle_event(Event('sid', '1', device.renderingControl, 0, {
+        'volume': {'Master': '36'}, 'mute': {'Master': '0'}}))
+    store._handle_event(Event('sid', '2', device.avTransport, 0, {
+        'transport_state': 'PLAYING'}))
+    state = store.get(device)
+    assert state == {'volume': 36, 'mute': False, 'transport_state': 'PLAYING'}
+    # Reading does not touch the network
+    for name in STATE_SERVICES:
+        assert not getattr(device, name)._refresh_evented_variables.called
+
+    # Callbacks only hear about real changes
+    store._handle_event(Event('sid', '3', device.renderingControl, 0, {
+        'volume': {'Master': '36'}}))
+    assert changes == [
+        (device, {'volume': 36, 'mute': False},
+         {'volume': 36, 'mute': False}),
+        (device, {'transport_state': 'PLAYING'}, state),
+    ]
+    # Earlier snapshots are not modified
+    assert changes[0][2] == {'volume': 36, 'mute': False}
+
+
+def test_state_store_refreshes(device):
+    store = DeviceStateStore()
+    store.add(device)
+    # A resync event means that events have been missed
+    store._handle_event(ResyncEvent('sid', device.avTransport, 0, 'old'))
+    assert store.get(device) == {
+        'volume': 20, 'mute': False, 'transport_state': 'STOPPED',
+        'queue_update_id': 7}
+
+    # If a subscription lapses, the last record is returned, and the state
+    # is fetched from the device in the background
+    device.renderingControl._refresh_evented_variables.return_value = {
+        'volume': {'Master': '25'}, 'mute': {'Master': '0'}}
+    device.avTransport.subscribe.return_value.time_left = 0
+    assert not store.is_healthy(device)
+    calls = device.renderingControl._refresh_evented_variables.call_count
+    with mock.patch('soco.state.threading.Thread') as thread:
+        assert store.get(device)['volume'] == 20
+        # but no more than once in config.STATE_REFRESH_INTERVAL
+        assert store.get(device)['volume'] == 20
+    assert thread.call_count == 1
+    thread.call_args[1]['target']()
+    assert store.get(device)['volume'] == 25
+    assert device.renderingControl._refresh_evented_variables.call_count \
+        == calls + 1
+    store._refresh_times[device] -= config.STATE_REFRESH_INTERVAL
+    thread = store.refresh_in_background(device)
+    thread.join(5)
+    assert device.renderingControl._refresh_evented_variables.call_count \
+        == calls + 2
+
+    store.remove(device)
+    for name in STATE_SERVICES:
+        assert getattr(device, name).subscribe.return_value.unsubscribe.called
+    with pytest.raises(KeyError):
+        store.get(device)
+
+
+def test_state_store_add_failure(device):
+    store = DeviceStateStore()
+    device.contentDirectory.subscribe.side_effect = IOError('unreachable')
+    with pytest.raises(IOError):
+        store.add(device)
+    # The subscriptions which were made are not leaked
+    for name in ('renderingControl', 'avTransport'):
+        assert getattr(device, name).subscribe.return_value.unsubscribe.called
+    assert store.devices == []
+    with pytest.raises(KeyError):
+        store.get(device)
+    # And the device can be added again
+    device.contentDirectory.subscribe.side_effect = None
+    store.add(device)
+    assert store.is_healthy(device)
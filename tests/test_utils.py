@@ -3,7 +3,9 @@
 
 from __future__ import unicode_literals
 
-from soco.utils import deprecated
+import threading
+
+from soco.utils import deprecated, run_concurrently
 
 
 # Deprecation decorator
@@ -35,3 +37,31 @@ def test_deprecation(recwarn):
                              "better_function instead."
     assert w.filename
     assert w.lineno
+
+
+# Concurrency
+
+
+def test_run_concurrently():
+    lock = threading.Lock()
+    in_progress = [0]
+    most_in_progress = [0]
+
+    def square(number):
+        with lock:
+            in_progress[0] += 1
+            most_in_progress[0] = max(most_in_progress[0], in_progress[0])
+        try:
+            if number == 3:
+                raise ValueError(number)
+            return number * number
+        finally:
+            with lock:
+                in_progress[0] -= 1
+
+    results, errors = run_concurrently(square, range(10), 4)
+    assert results == dict((n, n * n) for n in range(10) if n != 3)
+    assert list(errors) == [3]
+    assert isinstance(errors[3], ValueError)
+    assert most_in_progress[0] <= 4
+    assert run_concurrently(square, [], 4) == ({}, {})